@@ -0,0 +1,64 @@
+import logging
+import os
+
+
+class ArmazemConteudo:
+    """Armazém endereçado por conteúdo (SHA-256): cada arquivo é guardado uma vez
+    e as pastas banca/orgao_ano recebem hardlinks para ele"""
+
+    def __init__(self, raiz='.blobs'):
+        self.raiz = os.path.abspath(raiz)
+        os.makedirs(self.raiz, exist_ok=True)
+
+    def caminho_blob(self, sha256):
+        return os.path.join(self.raiz, sha256[:2], sha256[2:4], sha256)
+
+    def contem(self, sha256):
+        return bool(sha256) and os.path.exists(self.caminho_blob(sha256))
+
+    def incorporar(self, filepath, sha256):
+        """Guarda o conteúdo de filepath no armazém e deixa filepath como hardlink do blob.
+
+        Retorna False quando o sistema de arquivos não suporta hardlinks
+        entre os dois caminhos; nesse caso o arquivo fica como está.
+        """
+        blob = self.caminho_blob(sha256)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                # O blob passa a ser um segundo nome para o mesmo inode
+                os.link(filepath, blob)
+                return True
+            except FileExistsError:
+                # Outra thread guardou o mesmo conteúdo ao mesmo tempo
+                pass
+            except OSError as e:
+                logging.warning(f"Não foi possível criar hardlink no armazém para {filepath}: {str(e)}")
+                return False
+
+        if os.path.samefile(blob, filepath):
+            return True
+        return self.vincular(sha256, filepath)
+
+    def vincular(self, sha256, destino):
+        """Cria (ou substitui) destino como hardlink do blob já armazenado"""
+        blob = self.caminho_blob(sha256)
+        temporario = destino + '.link'
+        try:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            os.link(blob, temporario)
+            os.replace(temporario, destino)
+            return True
+        except OSError as e:
+            logging.warning(f"Não foi possível vincular {destino} ao armazém: {str(e)}")
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return False
+
+    def descartar(self, sha256):
+        """Remove o blob (conteúdo inválido); as pastas que o vinculam continuam com seus próprios nomes"""
+        try:
+            os.remove(self.caminho_blob(sha256))
+        except FileNotFoundError:
+            pass
@@ -1,45 +1,139 @@
-import requests
+"""Baixa os arquivos listados em um CSV (url, banca, cargo) para arquivos_baixados/banca/cargo.
+
+Uso:
+    python baixar.py [links.csv] [--workers 8] [--destino arquivos_baixados]
+
+As linhas são lidas sob demanda e entregues a um número fixo de workers por
+uma fila limitada, então CSVs com dezenas de milhares de linhas não ocupam
+memória. Todos os workers usam a mesma sessão (conexões reaproveitadas) e
+cada arquivo é gravado em um .part renomeado ao final (ver escrita.py);
+arquivos que já existem são pulados.
+"""
+import argparse
 import csv
 import os
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
 
-def criar_pasta(banca, cargo):
-    # Cria a estrutura de pastas: arquivos_baixados/banca/cargo
-    caminho = os.path.join("arquivos_baixados", banca, cargo)
-    os.makedirs(caminho, exist_ok=True)
-    return caminho
-
-# Caminho para o arquivo CSV
-csv_file = 'links.csv'
-
-# Lê os links do arquivo CSV
-with open(csv_file, mode='r') as file:
-    csv_reader = csv.reader(file)
-    
-    # Pula o cabeçalho se existir
-    next(csv_reader, None)
-    
-    # Itera sobre cada linha do CSV
-    for row in csv_reader:
-        # Assume formato: url, banca, cargo
-        url = row[0]
-        banca = row[1]
-        cargo = row[2]
-        
-        try:
-            print(f"Baixando: {url}")
-            response = requests.get(url)
-            response.raise_for_status()
+from escrita import GravadorAtomico
+from transporte import ControleAIMD, Requisitor, criar_sessao
+
+
+def ler_links(csv_file):
+    """Gera (url, banca, cargo) linha a linha, sem carregar o CSV inteiro"""
+    with open(csv_file, mode='r', newline='', encoding='utf-8') as file:
+        csv_reader = csv.reader(file)
+
+        # Pula o cabeçalho se existir
+        next(csv_reader, None)
+
+        for row in csv_reader:
+            # Assume formato: url, banca, cargo
+            if len(row) < 3 or not row[0].strip():
+                continue
+            yield row[0].strip(), row[1].strip(), row[2].strip()
+
+
+class Baixador:
+    """Pool de workers que baixa as linhas do CSV com uma sessão compartilhada"""
+
+    def __init__(self, workers=8, raiz="arquivos_baixados", sincronizar='lote'):
+        self.workers = workers
+        self.raiz = raiz
+        self.escrita = GravadorAtomico(sincronizar)
+        self.session = criar_sessao(
+            pool=workers, headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        )
+        self.http = Requisitor(self.session, ControleAIMD(inicial=workers, maximo=workers))
+        self._lock = threading.Lock()
+        self.contagem = {'baixados': 0, 'existentes': 0, 'erros': 0}
+
+    def _pasta(self, banca, cargo):
+        # makedirs uma única vez por banca/cargo
+        return self.escrita.garantir_pasta(os.path.join(self.raiz, banca, cargo))
+
+    def _contar(self, chave):
+        with self._lock:
+            self.contagem[chave] += 1
 
-            # Cria pasta específica para banca/cargo
-            pasta_destino = criar_pasta(banca, cargo)
+    def baixar(self, url, banca, cargo):
+        # Extrai o nome do arquivo da URL
+        nome_arquivo = url.split("?")[0].rstrip("/").split("/")[-1]
+        pasta_destino = self._pasta(banca, cargo)
+        caminho_completo = os.path.join(pasta_destino, nome_arquivo)
 
-            # Extrai o nome do arquivo da URL
-            nome_arquivo = url.split("/")[-1]
-            caminho_completo = os.path.join(pasta_destino, nome_arquivo)
+        if os.path.exists(caminho_completo):
+            self._contar('existentes')
+            return
 
-            # Salva o arquivo
-            with open(caminho_completo, "wb") as file_out:
-                file_out.write(response.content)
+        # .part por thread: a mesma URL repetida no CSV não disputa o mesmo arquivo
+        parcial = f"{caminho_completo}.{threading.get_ident()}.part"
+        host = urlsplit(url).netloc
+        try:
+            with self.http.vaga() as vaga:
+                response = self.http.get(url, vaga=vaga, stream=True)
+                with response:
+                    response.raise_for_status()
+                    tamanho = response.headers.get('Content-Length', '')
+                    total = int(tamanho) if tamanho.isdigit() and 'Content-Encoding' not in response.headers else None
+                    inicio = time.monotonic()
+                    # Grava em blocos, sem segurar o arquivo inteiro em memória
+                    with self.escrita.abrir(caminho_completo, total=total, parcial=parcial) as file_out:
+                        for chunk in response.iter_content(chunk_size=self.escrita.bloco(host, total)):
+                            file_out.write(chunk)
+                        self.escrita.registrar_vazao(host, file_out.posicao, time.monotonic() - inicio)
+                        file_out.concluir()
+            self._contar('baixados')
             print(f"Arquivo salvo em: {caminho_completo}")
         except Exception as e:
+            self._contar('erros')
+            if os.path.exists(parcial):
+                os.remove(parcial)
             print(f"Erro ao baixar {url}: {e}")
+
+    def executar(self, links):
+        """Consome os links com um número fixo de workers e uma fila limitada"""
+        fila = queue.Queue(maxsize=self.workers * 2)
+        fim = object()
+
+        def consumir():
+            while True:
+                link = fila.get()
+                if link is fim:
+                    return
+                self.baixar(*link)
+
+        threads = [threading.Thread(target=consumir, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for link in links:
+                fila.put(link)
+        finally:
+            for _ in threads:
+                fila.put(fim)
+            for thread in threads:
+                thread.join()
+            self.escrita.descarregar()
+
+        return self.contagem
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Baixa os arquivos listados em um CSV (url, banca, cargo)")
+    # Caminho para o arquivo CSV
+    parser.add_argument('csv_file', nargs='?', default='links.csv')
+    parser.add_argument('--workers', type=int, default=8, help="downloads simultâneos")
+    parser.add_argument('--destino', default='arquivos_baixados')
+    args = parser.parse_args()
+
+    contagem = Baixador(args.workers, args.destino).executar(ler_links(args.csv_file))
+    print(f"\nConcluído: {contagem['baixados']} baixados, {contagem['existentes']} já existiam, "
+          f"{contagem['erros']} erros")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Compara o tempo de parsing das listagens entre os backends disponíveis.
+
+Uso: python benchmarks/bench_parsers.py [--linhas 200] [--repeticoes 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pcileecher import PCILeecher  # noqa: E402
+from parsers import criar_parser, HAS_LXML, HAS_SELECTOLAX  # noqa: E402
+
+
+def pagina_provas(linhas):
+    """Gera uma página de /provas com a mesma estrutura do site e ruído ao redor da tabela"""
+    partes = ['<html><head><title>Provas</title>',
+              '<script>var x = "<tr><td>nao e linha</td></tr>";</script></head><body>',
+              '<div id="menu">' + ''.join(f'<a href="/m/{i}">Menu {i}</a>' for i in range(200)) + '</div>',
+              '<table id="lista"><tr><th>Prova</th><th>Ano</th><th>Órgão</th><th>Banca</th><th>Nível</th></tr>']
+    for i in range(linhas):
+        partes.append(
+            f'<tr><td><a href="/provas/download/prova-{i}">Analista &amp; Técnico {i}</a></td>'
+            f'<td>{1990 + i % 35}</td><td>Prefeitura de Cidade {i % 50}</td>'
+            f'<td>BANCA {i % 12}</td><td>Superior</td></tr>'
+        )
+        if i % 25 == 0:
+            partes.append('<tr><td colspan="5">publicidade</td></tr>')
+    partes.append('</table>')
+    partes.append('<div id="rodape">' + '<p>texto</p>' * 300 + '</div></body></html>')
+    return ''.join(partes)
+
+
+def pagina_gabaritos(itens):
+    """Gera uma página de /gabaritos com itens ga-list-item"""
+    partes = ['<html><body><div class="ga-list">']
+    for i in range(itens):
+        partes.append(
+            f'<div class="ga-list-item"><a href="/gabaritos/g-{i}">Gabarito {i} - Cargo</a>'
+            f'<div class="ga-list-info"><div class="ga-list-date">{1 + i % 28:02d}/03/{2000 + i % 25}</div>'
+            f'<div class="ga-list-org">BANCA {i % 12}</div></div></div>'
+        )
+    partes.append('</div>' + '<p>texto</p>' * 300 + '</body></html>')
+    return ''.join(partes)
+
+
+def medir(funcao, html, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao(html)
+    return (time.perf_counter() - inicio) / repeticoes, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=200)
+    parser.add_argument('--repeticoes', type=int, default=50)
+    args = parser.parse_args()
+
+    html_provas = pagina_provas(args.linhas)
+    html_gabaritos = pagina_gabaritos(args.linhas)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        leecher = PCILeecher(usar_cache=False, catalogo_path=os.path.join(tmp, 'catalogo.db'),
+                             armazem_dir=os.path.join(tmp, 'blobs'), parser='bs4')
+
+        # Referência: árvore completa com html.parser, como o código original fazia
+        from bs4 import BeautifulSoup
+
+        def referencia_provas(html):
+            soup = BeautifulSoup(html, 'html.parser')
+            return [p for p in (leecher._extract_prova_info(tr) for tr in soup.find_all('tr')) if p]
+
+        def referencia_gabaritos(html):
+            return leecher._extract_gabaritos(BeautifulSoup(html, 'html.parser'))
+
+        backends = ['bs4'] + (['lxml'] if HAS_LXML else []) + (['selectolax'] if HAS_SELECTOLAX else [])
+
+        t_ref_p, esperado_p = medir(referencia_provas, html_provas, args.repeticoes)
+        t_ref_g, esperado_g = medir(referencia_gabaritos, html_gabaritos, args.repeticoes)
+        print(f"{'backend':<14}{'provas (ms)':>12}{'speedup':>9}{'gabaritos (ms)':>16}{'speedup':>9}  iguais")
+        print(f"{'original':<14}{t_ref_p * 1000:>12.2f}{1:>8.1f}x{t_ref_g * 1000:>16.2f}{1:>8.1f}x")
+
+        for nome in backends:
+            backend = criar_parser(leecher, nome)
+            t_p, provas = medir(backend.extrair_provas, html_provas, args.repeticoes)
+            t_g, gabaritos = medir(backend.extrair_gabaritos, html_gabaritos, args.repeticoes)
+            iguais = provas == esperado_p and gabaritos == esperado_g
+            print(f"{backend.nome:<14}{t_p * 1000:>12.2f}{t_ref_p / t_p:>8.1f}x"
+                  f"{t_g * 1000:>16.2f}{t_ref_g / t_g:>8.1f}x  {'sim' if iguais else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Grava páginas reais de /provas e /gabaritos como fixtures dos benchmarks.
+
+Uso: python benchmarks/gravar_fixtures.py cesgranrio --paginas 2
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from servidor_local import FIXTURES_DIR  # noqa: E402
+
+BASE_URL = "https://www.pciconcursos.com.br"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('termo')
+    parser.add_argument('--paginas', type=int, default=2)
+    args = parser.parse_args()
+
+    session = requests.Session()
+    for tipo in ('provas', 'gabaritos'):
+        for pagina in range(1, args.paginas + 1):
+            response = session.get(f"{BASE_URL}/{tipo}/{args.termo}/{pagina}/", headers=HEADERS)
+            response.raise_for_status()
+            caminho = os.path.join(FIXTURES_DIR, f"{tipo}_{pagina}.html")
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            print(f"Gravado: {caminho}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Benchmarks offline do PCILeecher contra o servidor local.
+
+Mede páginas/s de search_provas e search_gabaritos, itens/s do parser e
+MB/s e arquivos/s de download_items. O resultado sai em JSON para ser
+comparado entre commits:
+
+    python benchmarks/run_benchmarks.py --saida resultado.json
+    python benchmarks/run_benchmarks.py --comparar resultado.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pcileecher import PCILeecher  # noqa: E402
+from servidor_local import ServidorLocal, FIXTURES_DIR  # noqa: E402
+
+
+def commit_atual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def criar_leecher(servidor, tmp, args):
+    leecher = PCILeecher(
+        max_workers=args.workers,
+        intervalo_host=0,
+        usar_cache=False,
+        catalogo_path=os.path.join(tmp, 'catalogo.db'),
+        armazem_dir=os.path.join(tmp, 'blobs'),
+        parser=args.parser
+    )
+    leecher.base_url = servidor.url
+    leecher.gabaritos_url = f"{servidor.url}/gabaritos"
+    return leecher
+
+
+def bench_busca(leecher, servidor, args):
+    resultados = {}
+    for tipo, busca in (('provas', leecher.search_provas), ('gabaritos', leecher.search_gabaritos)):
+        antes = servidor.contadores[tipo]
+        inicio = time.perf_counter()
+        items = busca('bench', max_pages=args.paginas)
+        duracao = time.perf_counter() - inicio
+        paginas = servidor.contadores[tipo] - antes
+        resultados[tipo] = {
+            'paginas': paginas,
+            'itens': len(items),
+            'segundos': round(duracao, 4),
+            'paginas_por_s': round(paginas / duracao, 2)
+        }
+    return resultados
+
+
+def bench_parser(leecher, args):
+    resultados = {'backend': leecher.parser.nome}
+    for tipo, extrair in (('provas', leecher.parser.extrair_provas),
+                          ('gabaritos', leecher.parser.extrair_gabaritos)):
+        paginas = [open(caminho, encoding='utf-8').read()
+                   for caminho in sorted(glob.glob(os.path.join(FIXTURES_DIR, f"{tipo}_*.html")))]
+        itens = 0
+        inicio = time.perf_counter()
+        for _ in range(args.repeticoes):
+            for html in paginas:
+                itens += len(extrair(html))
+        duracao = time.perf_counter() - inicio
+        resultados[tipo] = {
+            'itens': itens,
+            'segundos': round(duracao, 4),
+            'itens_por_s': round(itens / duracao, 1)
+        }
+    return resultados
+
+
+def bench_download(leecher, servidor, tmp, args):
+    items = [{
+        'url': f"{servidor.url}/provas/download/bench-{i:05d}",
+        'nome': f"Prova Bench {i:05d}",
+        'ano': '2024',
+        'orgao': f"Orgao {i % 20}",
+        'banca': f"Banca {i % 5}",
+        'nivel': 'Superior',
+        'tipo': 'prova'
+    } for i in range(args.arquivos)]
+
+    antes = servidor.contadores['bytes']
+    inicio = time.perf_counter()
+    sucessos = leecher.download_items(items, os.path.join(tmp, 'downloads'))
+    duracao = time.perf_counter() - inicio
+    megabytes = (servidor.contadores['bytes'] - antes) / (1024 * 1024)
+    return {
+        'arquivos': args.arquivos,
+        'sucessos': sucessos,
+        'workers': args.workers,
+        'segundos': round(duracao, 4),
+        'mb_por_s': round(megabytes / duracao, 2),
+        'arquivos_por_s': round(sucessos / duracao, 2)
+    }
+
+
+def comparar(anterior, atual):
+    """Imprime a variação percentual de cada métrica de vazão"""
+    def metricas(resultado):
+        valores = {}
+        for fase, dados in resultado['resultados'].items():
+            for chave, valor in dados.items():
+                if isinstance(valor, dict):
+                    for sub, v in valor.items():
+                        if sub.endswith('_por_s'):
+                            valores[f"{fase}.{chave}.{sub}"] = v
+                elif chave.endswith('_por_s'):
+                    valores[f"{fase}.{chave}"] = valor
+        return valores
+
+    antes, depois = metricas(anterior), metricas(atual)
+    print(f"\nComparação {anterior.get('commit')} -> {atual.get('commit')}")
+    for chave in sorted(set(antes) & set(depois)):
+        variacao = (depois[chave] - antes[chave]) / antes[chave] * 100 if antes[chave] else 0.0
+        print(f"  {chave:<40}{antes[chave]:>12}{depois[chave]:>12}{variacao:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paginas', type=int, default=20, help="páginas de listagem por busca")
+    parser.add_argument('--arquivos', type=int, default=100, help="PDFs sintéticos para baixar")
+    parser.add_argument('--tamanho-pdf', type=int, default=200 * 1024)
+    parser.add_argument('--latencia', type=float, default=0.02, help="latência do servidor em segundos")
+    parser.add_argument('--banda', type=int, default=None, help="bytes/s por conexão")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--parser', default='auto')
+    parser.add_argument('--repeticoes', type=int, default=20, help="repetições do benchmark de parsing")
+    parser.add_argument('--saida', help="grava o JSON neste arquivo")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k not in ('saida', 'comparar')}
+    with tempfile.TemporaryDirectory() as tmp, \
+            ServidorLocal(paginas=args.paginas, latencia=args.latencia, banda=args.banda,
+                          tamanho_pdf=args.tamanho_pdf) as servidor:
+        leecher = criar_leecher(servidor, tmp, args)
+        resultados = {
+            'busca': bench_busca(leecher, servidor, args),
+            'parser': bench_parser(leecher, args),
+            'download': bench_download(leecher, servidor, tmp, args)
+        }
+        fases = leecher.metricas.resumo()['fases']
+
+    resultado = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'config': config,
+        'resultados': resultados,
+        'fases': fases
+    }
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            comparar(json.load(f), resultado)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Servidor HTTP local que imita o PCI Concursos para benchmarks offline.
+
+Serve as fixtures de /provas e /gabaritos, índices de categorias em
+/provas/ e /gabaritos/ e PDFs sintéticos em /provas/download/<id> e
+/gabaritos/download/<id>, com latência e banda configuráveis. Uso avulso:
+
+    python benchmarks/servidor_local.py --porta 8000 --latencia 0.05 --banda 2000000
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+PAGINA_VAZIA = '<html><body><table></table><p>Nenhum gabarito encontrado</p></body></html>'
+
+CATEGORIAS = ('cesgranrio', 'fgv', 'cebraspe', 'vunesp', 'fcc', 'banco-do-brasil', 'trt-2-regiao')
+
+
+class ServidorLocal:
+    """Stand-in do site em uma thread, com contadores de requisições por tipo"""
+
+    def __init__(self, porta=0, paginas=5, latencia=0.0, banda=None, tamanho_pdf=200 * 1024,
+                 fixtures_dir=FIXTURES_DIR, categorias=CATEGORIAS):
+        self.paginas = paginas
+        self.categorias = categorias
+        self.latencia = latencia
+        self.banda = banda
+        self.tamanho_pdf = tamanho_pdf
+        self.fixtures = {
+            tipo: [open(caminho, encoding='utf-8').read()
+                   for caminho in sorted(glob.glob(os.path.join(fixtures_dir, f"{tipo}_*.html")))]
+            for tipo in ('provas', 'gabaritos')
+        }
+        self.contadores = {'provas': 0, 'gabaritos': 0, 'indices': 0, 'pdf': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', porta), self._criar_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _contar(self, chave, quantidade=1):
+        with self._lock:
+            self.contadores[chave] += quantidade
+
+    def pdf_sintetico(self, identificador):
+        """PDF válido de uma página, determinístico por id e com cerca de tamanho_pdf bytes.
+
+        O enchimento vai num stream que nenhuma página referencia, então o
+        arquivo passa na validação do leecher sem ser baixado de novo.
+        """
+        semente = hashlib.sha256(identificador.encode('utf-8')).digest()
+        texto = f"BT /F1 12 Tf 72 720 Td (Prova {identificador}) Tj ET".encode('latin-1', 'replace')
+        objetos = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+            b'/Resources << /Font << /F1 5 0 R >> >> >>',
+            b'<< /Length %d >>\nstream\n' % len(texto) + texto + b'\nendstream',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        ]
+        # Cabeçalho, objetos acima, xref e trailer ficam abaixo de 1 KB
+        miolo = max(self.tamanho_pdf - 1024, 0)
+        enchimento = (semente * (miolo // len(semente) + 1))[:miolo]
+        objetos.append(b'<< /Length %d >>\nstream\n' % len(enchimento) + enchimento + b'\nendstream')
+
+        pdf = bytearray(b'%PDF-1.4\n')
+        posicoes = []
+        for numero, objeto in enumerate(objetos, 1):
+            posicoes.append(len(pdf))
+            pdf += b'%d 0 obj\n' % numero + objeto + b'\nendobj\n'
+        inicio_xref = len(pdf)
+        pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+        pdf += b''.join(b'%010d 00000 n \n' % posicao for posicao in posicoes)
+        pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref)
+        return bytes(pdf)
+
+    def indice(self, tipo):
+        """Página de índice com um link por categoria, como a lista de bancas do site"""
+        links = ''.join(f'<li><a href="/{tipo}/{slug}/">{slug}</a></li>' for slug in self.categorias)
+        return f'<html><body><ul class="categorias">{links}</ul></body></html>'
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+
+                download = re.match(r'^/(provas|gabaritos)/download/([^/?]+)', self.path)
+                if download:
+                    self._enviar_pdf(f"{download.group(1)}-{download.group(2)}")
+                    return
+
+                indice = re.match(r'^/(provas|gabaritos)/?$', self.path)
+                if indice:
+                    servidor._contar('indices')
+                    self._enviar(200, servidor.indice(indice.group(1)).encode('utf-8'), 'text/html; charset=utf-8')
+                    return
+
+                listagem = re.match(r'^/(provas|gabaritos)/[^/]+/(\d+)/?$', self.path)
+                if listagem:
+                    tipo, pagina = listagem.group(1), int(listagem.group(2))
+                    servidor._contar(tipo)
+                    fixtures = servidor.fixtures[tipo]
+                    if 1 <= pagina <= servidor.paginas and fixtures:
+                        html = fixtures[(pagina - 1) % len(fixtures)]
+                    else:
+                        html = PAGINA_VAZIA
+                    self._enviar(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+                    return
+
+                self._enviar(404, b'not found', 'text/plain')
+
+            def _enviar(self, status, corpo, content_type, extras=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(corpo)))
+                for chave, valor in (extras or {}).items():
+                    self.send_header(chave, valor)
+                self.end_headers()
+                self._escrever(corpo)
+
+            def _enviar_pdf(self, identificador):
+                servidor._contar('pdf')
+                corpo = servidor.pdf_sintetico(identificador)
+                etag = '"' + hashlib.sha1(corpo).hexdigest() + '"'
+                inicio = 0
+                intervalo = re.match(r'bytes=(\d+)-', self.headers.get('Range', ''))
+                if intervalo and self.headers.get('If-Range', etag) == etag:
+                    inicio = int(intervalo.group(1))
+                    if inicio >= len(corpo):
+                        self._enviar(416, b'', 'application/pdf',
+                                     {'Content-Range': f"bytes */{len(corpo)}"})
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {inicio}-{len(corpo) - 1}/{len(corpo)}")
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', 'application/pdf')
+                self.send_header('Content-Length', str(len(corpo) - inicio))
+                self.send_header('ETag', etag)
+                self.send_header('Accept-Ranges', 'bytes')
+                self.end_headers()
+                self._escrever(corpo[inicio:])
+
+            def _escrever(self, corpo):
+                servidor._contar('bytes', len(corpo))
+                if not servidor.banda:
+                    self.wfile.write(corpo)
+                    return
+                # Limita a banda enviando blocos de ~50 ms
+                bloco = max(1024, int(servidor.banda * 0.05))
+                for i in range(0, len(corpo), bloco):
+                    self.wfile.write(corpo[i:i + bloco])
+                    time.sleep(len(corpo[i:i + bloco]) / servidor.banda)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local com fixtures do PCI Concursos")
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--paginas', type=int, default=5, help="páginas de listagem por termo")
+    parser.add_argument('--latencia', type=float, default=0.0, help="segundos antes de cada resposta")
+    parser.add_argument('--banda', type=int, default=None, help="bytes/s por conexão")
+    parser.add_argument('--tamanho-pdf', type=int, default=200 * 1024)
+    args = parser.parse_args()
+
+    servidor = ServidorLocal(args.porta, args.paginas, args.latencia, args.banda, args.tamanho_pdf)
+    print(f"Servindo em {servidor.url} (Ctrl+C para sair)")
+    try:
+        servidor._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
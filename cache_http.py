@@ -0,0 +1,156 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class CacheHTTP:
+    """Cache em disco de respostas HTTP com revalidação condicional e despejo LRU"""
+
+    def __init__(self, diretorio='.cache_http', ttl=3600, max_bytes=200 * 1024 * 1024):
+        self.diretorio = diretorio
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(diretorio, 'indice.db'), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                url TEXT PRIMARY KEY,
+                arquivo TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                tamanho INTEGER NOT NULL,
+                salvo_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+        self._db.commit()
+        # Tamanho total mantido em memória para não somar a tabela a cada gravação
+        self._total = self._db.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+
+    def get(self, session, url, headers=None, **kwargs):
+        """Retorna o texto da URL, usando o disco enquanto válido e GET condicional depois do TTL"""
+        headers = dict(headers or {})
+        entrada = self._buscar(url)
+        agora = time.time()
+
+        if entrada and agora - entrada['salvo_em'] < self.ttl:
+            texto = self._ler(entrada)
+            if texto is not None:
+                self._tocar(url, agora)
+                return texto
+
+        if entrada:
+            if entrada['etag']:
+                headers['If-None-Match'] = entrada['etag']
+            if entrada['last_modified']:
+                headers['If-Modified-Since'] = entrada['last_modified']
+
+        response = session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entrada:
+            texto = self._ler(entrada)
+            if texto is not None:
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE respostas SET salvo_em = ?, acessado_em = ? WHERE url = ?",
+                        (agora, agora, url)
+                    )
+                    self._db.commit()
+                return texto
+            # Arquivo sumiu do disco: refaz a requisição sem cabeçalhos condicionais
+            headers.pop('If-None-Match', None)
+            headers.pop('If-Modified-Since', None)
+            response = session.get(url, headers=headers, **kwargs)
+
+        response.raise_for_status()
+        encoding = response.encoding or response.apparent_encoding or 'utf-8'
+        self._salvar(url, response.content, encoding, response.headers, agora)
+        return response.content.decode(encoding, errors='replace')
+
+    def _buscar(self, url):
+        with self._lock:
+            linha = self._db.execute(
+                "SELECT arquivo, etag, last_modified, encoding, salvo_em FROM respostas WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if not linha:
+            return None
+        return {
+            'arquivo': linha[0],
+            'etag': linha[1],
+            'last_modified': linha[2],
+            'encoding': linha[3],
+            'salvo_em': linha[4]
+        }
+
+    def _ler(self, entrada):
+        try:
+            with open(os.path.join(self.diretorio, entrada['arquivo']), 'rb') as f:
+                conteudo = f.read()
+        except OSError:
+            return None
+        return conteudo.decode(entrada['encoding'] or 'utf-8', errors='replace')
+
+    def _tocar(self, url, agora):
+        with self._lock:
+            self._db.execute("UPDATE respostas SET acessado_em = ? WHERE url = ?", (agora, url))
+            self._db.commit()
+
+    def _salvar(self, url, conteudo, encoding, headers, agora):
+        arquivo = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        caminho = os.path.join(self.diretorio, arquivo)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+
+        with self._lock:
+            anterior = self._db.execute("SELECT tamanho FROM respostas WHERE url = ?", (url,)).fetchone()
+            if anterior:
+                self._total -= anterior[0]
+            self._db.execute(
+                """INSERT OR REPLACE INTO respostas
+                   (url, arquivo, etag, last_modified, encoding, tamanho, salvo_em, acessado_em)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (url, arquivo, headers.get('ETag'), headers.get('Last-Modified'),
+                 encoding, len(conteudo), agora, agora)
+            )
+            self._total += len(conteudo)
+            self._despejar()
+            self._db.commit()
+
+    def _despejar(self):
+        """Remove as entradas menos usadas até o cache caber em max_bytes"""
+        while self._total > self.max_bytes:
+            antigas = self._db.execute(
+                "SELECT url, arquivo, tamanho FROM respostas ORDER BY acessado_em LIMIT 64"
+            ).fetchall()
+            if not antigas:
+                break
+            for url, arquivo, tamanho in antigas:
+                if self._total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.diretorio, arquivo))
+                except OSError:
+                    pass
+                self._db.execute("DELETE FROM respostas WHERE url = ?", (url,))
+                self._total -= tamanho
+
+    def limpar(self):
+        """Apaga todas as entradas do cache"""
+        with self._lock:
+            for (arquivo,) in self._db.execute("SELECT arquivo FROM respostas").fetchall():
+                try:
+                    os.remove(os.path.join(self.diretorio, arquivo))
+                except OSError:
+                    pass
+            self._db.execute("DELETE FROM respostas")
+            self._db.commit()
+            self._total = 0
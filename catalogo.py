@@ -0,0 +1,372 @@
+import sqlite3
+import threading
+import time
+
+
+def _contem(texto, trecho):
+    # Mesmo critério dos filtros da busca: trecho em qualquer posição, sem diferenciar caixa
+    return texto is not None and trecho.lower() in texto.lower()
+
+
+class Catalogo:
+    """Catálogo local (SQLite) dos itens descobertos e baixados"""
+
+    COLUNAS = ('url', 'nome', 'ano', 'banca', 'orgao', 'nivel', 'tipo')
+    # Colunas adicionadas depois da primeira versão do esquema
+    COLUNAS_EXTRAS = (
+        ('validador', 'TEXT'),          # ETag ou Last-Modified usado no If-Range
+        ('tamanho_esperado', 'INTEGER'),
+        ('paginas', 'INTEGER'),
+        ('valido', 'INTEGER'),              # NULL enquanto o PDF não passou pela validação
+        ('erro_validacao', 'TEXT'),
+        ('validado_em', 'REAL'),
+    )
+
+    def __init__(self, caminho='pcileecher.db'):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(caminho, check_same_thread=False)
+        # WAL permite leituras enquanto outra thread grava
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                url TEXT PRIMARY KEY,
+                nome TEXT,
+                ano TEXT,
+                banca TEXT,
+                orgao TEXT,
+                nivel TEXT,
+                tipo TEXT,
+                caminho TEXT,
+                tamanho INTEGER,
+                sha256 TEXT,
+                status TEXT NOT NULL DEFAULT 'descoberto',
+                descoberto_em REAL NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS marcas (
+                termo TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                url TEXT NOT NULL,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (termo, tipo)
+            )
+        """)
+        # Índice exato do dedup: URLs normalizadas de itens já baixados (ver dedup.py)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS dedup (
+                url_normalizada TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                registrado_em REAL NOT NULL
+            )
+        """)
+        # Quais itens cada termo (ou categoria) lista no site, e quando a listagem foi percorrida;
+        # é o que permite responder buscas sem acessar o site (ver consulta.py)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS listagens (
+                termo TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                url TEXT NOT NULL,
+                posicao INTEGER NOT NULL,
+                PRIMARY KEY (termo, tipo, url)
+            ) WITHOUT ROWID
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS varreduras (
+                termo TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                paginas INTEGER NOT NULL,
+                completa INTEGER NOT NULL,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (termo, tipo)
+            )
+        """)
+        self._db.create_function('contem', 2, _contem, deterministic=True)
+        self._migrar()
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_dedup_url ON dedup (url)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_items_status ON items (status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_items_sha256 ON items (sha256)")
+        # Filtros por trecho (ano, banca, nivel, orgao) não usam índice; em consultar() o índice serve
+        # o filtro por tipo já na ordem da resposta, sem ordenação temporária
+        self._db.execute("DROP INDEX IF EXISTS idx_items_banca_ano")
+        self._db.execute("DROP INDEX IF EXISTS idx_items_tipo_ano")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_items_tipo_ordem ON items (tipo, ano DESC, nome)")
+        self._db.commit()
+
+    def _migrar(self):
+        """Acrescenta colunas novas em catálogos criados por versões anteriores"""
+        existentes = {linha[1] for linha in self._db.execute("PRAGMA table_info(items)")}
+        for coluna, tipo in self.COLUNAS_EXTRAS:
+            if coluna not in existentes:
+                self._db.execute(f"ALTER TABLE items ADD COLUMN {coluna} {tipo}")
+
+    def registrar_descobertos(self, items):
+        """Insere ou atualiza os metadados dos itens encontrados na busca, sem mexer no status"""
+        agora = time.time()
+        linhas = [
+            tuple(item.get(coluna, '') for coluna in self.COLUNAS) + (agora, agora)
+            for item in items
+        ]
+        with self._lock:
+            self._db.executemany("""
+                INSERT INTO items (url, nome, ano, banca, orgao, nivel, tipo, descoberto_em, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    nome = excluded.nome,
+                    ano = excluded.ano,
+                    banca = excluded.banca,
+                    orgao = COALESCE(NULLIF(excluded.orgao, ''), items.orgao),
+                    nivel = COALESCE(NULLIF(excluded.nivel, ''), items.nivel),
+                    tipo = excluded.tipo
+            """, linhas)
+            self._db.commit()
+
+    def obter(self, url):
+        """Retorna o registro do item como dicionário, ou None se não existir"""
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM items WHERE url = ?", (url,))
+            linha = cursor.fetchone()
+            if not linha:
+                return None
+            return dict(zip([c[0] for c in cursor.description], linha))
+
+    def conhecidos(self, urls):
+        """Retorna {url: status} das URLs que já constam no catálogo"""
+        urls = list(urls)
+        resultado = {}
+        with self._lock:
+            # Limite de parâmetros do SQLite: consulta em blocos
+            for i in range(0, len(urls), 500):
+                bloco = urls[i:i + 500]
+                marcadores = ','.join('?' * len(bloco))
+                resultado.update(self._db.execute(
+                    f"SELECT url, status FROM items WHERE url IN ({marcadores})", bloco
+                ).fetchall())
+        return resultado
+
+    def pendentes(self):
+        """Itens já descobertos que ainda não foram baixados com sucesso"""
+        with self._lock:
+            cursor = self._db.execute(
+                f"SELECT {', '.join(self.COLUNAS)} FROM items WHERE status IN ('descoberto', 'falha')"
+            )
+            return [dict(zip(self.COLUNAS, linha)) for linha in cursor.fetchall()]
+
+    def obter_marca(self, termo, tipo):
+        """URL do item mais recente visto na última busca incremental do termo"""
+        with self._lock:
+            linha = self._db.execute(
+                "SELECT url FROM marcas WHERE termo = ? AND tipo = ?", (termo, tipo)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def gravar_marca(self, termo, tipo, url):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO marcas (termo, tipo, url, atualizado_em) VALUES (?, ?, ?, ?)",
+                (termo, tipo, url, time.time())
+            )
+            self._db.commit()
+
+    def marcar_baixado(self, item, caminho, tamanho, sha256):
+        """Registra o download concluído com caminho final, tamanho e hash"""
+        self._gravar_status(item, 'baixado', caminho, tamanho, sha256)
+
+    def registrar_validador(self, url, validador, tamanho_esperado):
+        """Guarda o validador e o tamanho anunciados pelo servidor para retomar downloads parciais"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE items SET validador = ?, tamanho_esperado = ? WHERE url = ?",
+                (validador, tamanho_esperado, url)
+            )
+            self._db.commit()
+
+    def registrar_validacao(self, url, valido, paginas=None, erro=None):
+        """Resultado da validação do PDF baixado (ver validacao.py); valido=None: ainda não validado"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE items SET valido = ?, paginas = ?, erro_validacao = ?, validado_em = ? WHERE url = ?",
+                (None if valido is None else int(valido), paginas, erro, time.time(), url)
+            )
+            self._db.commit()
+
+    def marcar_falha(self, item):
+        self._gravar_status(item, 'falha')
+
+    def _gravar_status(self, item, status, caminho=None, tamanho=None, sha256=None):
+        agora = time.time()
+        valores = tuple(item.get(coluna, '') for coluna in self.COLUNAS)
+        with self._lock:
+            self._db.execute("""
+                INSERT INTO items (url, nome, ano, banca, orgao, nivel, tipo,
+                                   caminho, tamanho, sha256, status, descoberto_em, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    caminho = COALESCE(excluded.caminho, items.caminho),
+                    tamanho = COALESCE(excluded.tamanho, items.tamanho),
+                    sha256 = COALESCE(excluded.sha256, items.sha256),
+                    status = excluded.status,
+                    atualizado_em = excluded.atualizado_em
+            """, valores + (caminho, tamanho, sha256, status, agora, agora))
+            self._db.commit()
+
+    def indexar_baixados(self, normalizar):
+        """Leva para o índice de dedup os itens baixados que ainda não estão nele; retorna o total indexado"""
+        agora = time.time()
+        with self._lock:
+            faltantes = self._db.execute("""
+                SELECT url FROM items
+                WHERE status = 'baixado' AND NOT EXISTS (SELECT 1 FROM dedup WHERE dedup.url = items.url)
+            """).fetchall()
+            if faltantes:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO dedup (url_normalizada, url, registrado_em) VALUES (?, ?, ?)",
+                    ((normalizar(url), url, agora) for (url,) in faltantes)
+                )
+                self._db.commit()
+            return self._db.execute("SELECT COUNT(*) FROM dedup").fetchone()[0]
+
+    def iter_normalizadas(self, bloco=10000):
+        with self._lock:
+            cursor = self._db.execute("SELECT url_normalizada FROM dedup")
+            while True:
+                linhas = cursor.fetchmany(bloco)
+                if not linhas:
+                    return
+                for (chave,) in linhas:
+                    yield chave
+
+    def contem_normalizada(self, chave):
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM dedup WHERE url_normalizada = ?", (chave,)
+            ).fetchone() is not None
+
+    def registrar_normalizada(self, chave, url):
+        """Retorna True se a URL normalizada ainda não estava no índice"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO dedup (url_normalizada, url, registrado_em) VALUES (?, ?, ?)",
+                (chave, url, time.time())
+            )
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def registrar_listagem(self, termo, tipo, items, pagina=1):
+        """Guarda os itens de uma página de listagem do termo, na ordem do site"""
+        self.registrar_descobertos([{**item, 'tipo': tipo} for item in items])
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO listagens (termo, tipo, url, posicao) VALUES (?, ?, ?, ?)",
+                ((termo, tipo, item['url'], pagina * 1000 + i) for i, item in enumerate(items))
+            )
+            self._db.commit()
+
+    def registrar_varredura(self, termo, tipo, paginas, completa):
+        """Marca quando a listagem do termo foi percorrida e até onde (completa: chegou à última página)"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO varreduras (termo, tipo, paginas, completa, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (termo, tipo, paginas, int(completa), time.time())
+            )
+            self._db.commit()
+
+    def obter_varredura(self, termo, tipo):
+        with self._lock:
+            linha = self._db.execute(
+                "SELECT paginas, completa, atualizado_em FROM varreduras WHERE termo = ? AND tipo = ?",
+                (termo, tipo)
+            ).fetchone()
+        if not linha:
+            return None
+        return {'paginas': linha[0], 'completa': bool(linha[1]), 'atualizado_em': linha[2]}
+
+    def consultar(self, termo=None, tipo=None, ano=None, banca=None, nivel=None, orgao=None, limite=None):
+        """Itens do catálogo com os mesmos filtros da busca no site (ano, banca... por trecho, sem caixa).
+
+        Com termo, só os itens que a listagem daquele termo trouxe, na
+        ordem do site; sem termo, todo o catálogo, dos mais novos para os
+        mais antigos. Os índices só servem o termo (chave de listagens) e o
+        tipo; os filtros por trecho são conferidos linha a linha.
+        """
+        colunas = ', '.join(f"items.{coluna}" for coluna in
+                            self.COLUNAS + ('status', 'caminho', 'tamanho', 'sha256'))
+        condicoes, parametros = [], []
+        if termo:
+            sql = (f"SELECT {colunas} FROM listagens JOIN items ON items.url = listagens.url "
+                   f"WHERE listagens.termo = ?")
+            parametros.append(termo)
+            if tipo:
+                condicoes.append("listagens.tipo = ?")
+                parametros.append(tipo)
+            ordem = "listagens.tipo DESC, listagens.posicao"
+        else:
+            sql = f"SELECT {colunas} FROM items WHERE 1"
+            if tipo:
+                condicoes.append("items.tipo = ?")
+                parametros.append(tipo)
+            ordem = "items.ano DESC, items.nome"
+        for coluna, valor in (('ano', ano), ('banca', banca), ('nivel', nivel), ('orgao', orgao)):
+            if not valor:
+                continue
+            valor = str(valor)
+            if valor.isascii():
+                # lower() do SQLite só conhece ASCII, o que basta para um trecho ASCII e é bem mais rápido
+                condicoes.append(f"instr(lower(items.{coluna}), ?) > 0")
+                parametros.append(valor.lower())
+            else:
+                condicoes.append(f"contem(items.{coluna}, ?)")
+                parametros.append(valor)
+
+        sql += ''.join(f" AND {condicao}" for condicao in condicoes) + f" ORDER BY {ordem}"
+        if limite:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        with self._lock:
+            cursor = self._db.execute(sql, parametros)
+            nomes = [c[0] for c in cursor.description]
+            return [dict(zip(nomes, linha)) for linha in cursor.fetchall()]
+
+    def baixados_com_hash(self):
+        """(caminho, sha256) de cada conteúdo baixado, um caminho por hash"""
+        with self._lock:
+            return self._db.execute("""
+                SELECT MIN(caminho), sha256 FROM items
+                WHERE status = 'baixado' AND sha256 IS NOT NULL AND caminho IS NOT NULL
+                GROUP BY sha256
+            """).fetchall()
+
+    def por_sha256(self, hashes):
+        """{sha256: registro} de um item baixado com cada conteúdo"""
+        hashes = list(hashes)
+        resultado = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                bloco = hashes[i:i + 500]
+                marcadores = ','.join('?' * len(bloco))
+                cursor = self._db.execute(f"SELECT * FROM items WHERE sha256 IN ({marcadores})", bloco)
+                nomes = [c[0] for c in cursor.description]
+                for linha in cursor.fetchall():
+                    registro = dict(zip(nomes, linha))
+                    resultado.setdefault(registro['sha256'], registro)
+        return resultado
+
+    def remover_normalizada(self, url):
+        """Tira o item do índice exato do dedup (download descartado); o filtro de Bloom trata como falso positivo"""
+        with self._lock:
+            self._db.execute("DELETE FROM dedup WHERE url = ?", (url,))
+            self._db.commit()
+
+    def contar(self, status=None):
+        with self._lock:
+            if status:
+                return self._db.execute("SELECT COUNT(*) FROM items WHERE status = ?", (status,)).fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+import time
+
+
+class Checkpoint:
+    """Ponto de retomada de uma execução longa (download_all_by_year).
+
+    Guarda em um arquivo JSON os parâmetros da execução, os termos já
+    concluídos, o cursor da listagem (termo, tipo e última página entregue
+    por inteiro) e os itens entregues aos workers que ainda não terminaram.
+    Na retomada a busca recomeça na página seguinte ao cursor e só os
+    pendentes são baixados de novo, sem refazer listagens nem conferir
+    arquivos já resolvidos.
+
+    A gravação é atômica (arquivo temporário + os.replace). O cursor é
+    gravado a cada página, o que custa pouco perto da busca da página; a
+    conclusão de downloads, bem mais frequente, no máximo uma vez a cada
+    intervalo segundos. Numa queda, os itens concluídos nesse intervalo
+    voltam como pendentes e são atendidos pelo catálogo, sem acessar a rede.
+    """
+
+    VERSAO = 1
+
+    def __init__(self, caminho, parametros, intervalo=1.0):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._ultima_gravacao = 0.0
+        self._sujo = False
+        self.retomado = False
+
+        estado = self._ler()
+        if estado and estado.get('parametros') == parametros:
+            self.retomado = True
+        else:
+            if estado:
+                logging.info(f"Checkpoint {caminho} é de outra execução; começando do início")
+            estado = {'versao': self.VERSAO, 'parametros': parametros, 'concluidos': [],
+                      'cursor': None, 'pendentes': {}}
+        self.parametros = parametros
+        self.concluidos = estado['concluidos']
+        self.cursor = estado['cursor']
+        self.pendentes = estado['pendentes']
+
+    def _ler(self):
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                estado = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Checkpoint ilegível em {self.caminho}, ignorado: {str(e)}")
+            return None
+        return estado if estado.get('versao') == self.VERSAO else None
+
+    def concluido(self, etapa):
+        return etapa in self.concluidos
+
+    def cursor_de(self, etapa):
+        """Cursor salvo da etapa (termo ou 'estrutura'), ou None se ela não foi iniciada"""
+        if self.cursor and self.cursor.get('etapa') == etapa:
+            return self.cursor
+        return None
+
+    def avancar(self, etapa, **cursor):
+        """Registra que tudo até este ponto da listagem já foi entregue aos workers"""
+        with self._lock:
+            self.cursor = {'etapa': etapa, **cursor}
+            self._sujo = True
+        self.salvar()
+
+    def concluir(self, etapa):
+        with self._lock:
+            self.concluidos.append(etapa)
+            self.cursor = None
+            self._sujo = True
+        self.salvar()
+
+    def entregue(self, item):
+        with self._lock:
+            self.pendentes[item['url']] = item
+            self._sujo = True
+
+    def resolvido(self, item, ok=None):
+        """Callback ao_concluir de download_stream: o item saiu dos pendentes"""
+        with self._lock:
+            self.pendentes.pop(item['url'], None)
+            self._sujo = True
+        self._gravar_se_vencido()
+
+    def itens_pendentes(self):
+        with self._lock:
+            return list(self.pendentes.values())
+
+    def _gravar_se_vencido(self):
+        if time.monotonic() - self._ultima_gravacao >= self.intervalo:
+            self.salvar()
+
+    def salvar(self):
+        with self._lock:
+            if not self._sujo:
+                return
+            estado = {'versao': self.VERSAO, 'parametros': self.parametros, 'concluidos': self.concluidos,
+                      'cursor': self.cursor, 'pendentes': self.pendentes, 'salvo_em': time.time()}
+            temporario = self.caminho + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(estado, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+            self._ultima_gravacao = time.monotonic()
+            self._sujo = False
+
+    def remover(self):
+        """Execução terminada: o próximo início é do zero"""
+        with self._lock:
+            self._sujo = False
+            try:
+                os.remove(self.caminho)
+            except FileNotFoundError:
+                pass
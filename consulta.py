@@ -0,0 +1,129 @@
+"""Consultas ao acervo respondidas pelo catálogo local, indo ao site só quando preciso.
+
+Uso:
+    python consulta.py [termo] [--ano 2019] [--banca fgv] [--nivel superior] [--tipo prova|gabarito|todos]
+                       [--offline] [--ttl 24] [--max-pages 10] [--formato tabela|json|csv]
+
+Toda listagem percorrida pelo PCILeecher (busca por termo, download completo
+ou enumeração por categorias) fica registrada no catálogo com os itens de
+cada termo. Uma consulta com termo usa esse registro enquanto ele tiver
+menos de --ttl horas e cobrir as páginas pedidas; caso contrário a listagem
+do termo é buscada de novo antes de responder. Sem termo, ou com --offline,
+a resposta vem só do que já está no catálogo.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+from catalogo import Catalogo
+
+
+class Consulta:
+    """Mesma interface de busca do PCILeecher (query, ano, banca, nivel), servida pelo catálogo"""
+
+    TIPOS = ('prova', 'gabarito')
+
+    def __init__(self, catalogo=None, leecher=None, ttl=24 * 3600, max_pages=10, catalogo_path='pcileecher.db'):
+        self.leecher = leecher
+        self.catalogo = catalogo or (leecher.catalogo if leecher else Catalogo(catalogo_path))
+        self.catalogo_path = self.catalogo.caminho
+        self.ttl = ttl
+        self.max_pages = max_pages
+        # Termos buscados no site pela última consulta (vazio: respondida só com dados locais)
+        self.atualizados = []
+
+    def search_provas(self, query=None, ano=None, banca=None, nivel=None, max_pages=None, offline=False):
+        return self.buscar(query, 'prova', ano, banca, nivel, max_pages, offline)
+
+    def search_gabaritos(self, query=None, ano=None, banca=None, nivel=None, max_pages=None, offline=False):
+        return self.buscar(query, 'gabarito', ano, banca, nivel, max_pages, offline)
+
+    def search_provas_e_gabaritos(self, query=None, ano=None, banca=None, nivel=None, max_pages=None,
+                                  offline=False):
+        return self.buscar(query, None, ano, banca, nivel, max_pages, offline)
+
+    def buscar(self, query=None, tipo=None, ano=None, banca=None, nivel=None, max_pages=None, offline=False,
+               orgao=None, limite=None):
+        """Itens que a busca no site retornaria, lidos do catálogo; tipo=None traz provas e gabaritos"""
+        self.atualizados = []
+        if query and not offline:
+            for t in ([tipo] if tipo else self.TIPOS):
+                if not self.atual(query, t, max_pages or self.max_pages):
+                    self._atualizar(query, t, max_pages or self.max_pages)
+        return self.catalogo.consultar(query, tipo, ano, banca, nivel, orgao, limite)
+
+    def atual(self, query, tipo, max_pages=None):
+        """True se a listagem do termo no catálogo é recente e cobre as páginas pedidas"""
+        varredura = self.catalogo.obter_varredura(query, tipo)
+        if not varredura or time.time() - varredura['atualizado_em'] > self.ttl:
+            return False
+        return varredura['completa'] or varredura['paginas'] >= (max_pages or self.max_pages)
+
+    def _atualizar(self, query, tipo, max_pages):
+        # A própria busca do leecher registra a listagem e a varredura no catálogo
+        leecher = self._leecher()
+        if tipo == 'prova':
+            leecher.search_provas(query, max_pages=max_pages)
+        else:
+            leecher.search_gabaritos(query, max_pages=max_pages)
+        self.atualizados.append((query, tipo))
+
+    def _leecher(self):
+        # Criado só na primeira ida à rede: consultas locais não abrem sessão, cache nem dedup
+        if self.leecher is None:
+            from pcileecher import PCILeecher
+            self.leecher = PCILeecher(catalogo_path=self.catalogo_path, mostrar_progresso=False)
+        return self.leecher
+
+
+COLUNAS_SAIDA = ('tipo', 'ano', 'banca', 'orgao', 'nivel', 'nome', 'status', 'url', 'caminho')
+
+
+def _imprimir_tabela(items):
+    larguras = {'tipo': 8, 'ano': 9, 'banca': 18, 'orgao': 28, 'nome': 50, 'status': 10}
+    print('  '.join(coluna.upper().ljust(largura) for coluna, largura in larguras.items()))
+    for item in items:
+        print('  '.join(str(item.get(coluna) or '')[:largura].ljust(largura)
+                        for coluna, largura in larguras.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta provas e gabaritos pelo catálogo local")
+    parser.add_argument('termo', nargs='?', help="termo de busca do site (ex.: administracao); "
+                                                 "sem termo, consulta todo o catálogo")
+    parser.add_argument('--tipo', choices=['prova', 'gabarito', 'todos'], default='todos')
+    parser.add_argument('--ano')
+    parser.add_argument('--banca')
+    parser.add_argument('--nivel')
+    parser.add_argument('--orgao')
+    parser.add_argument('--offline', action='store_true', help="nunca acessa o site")
+    parser.add_argument('--ttl', type=float, default=24, help="horas até uma listagem local ser buscada de novo")
+    parser.add_argument('--max-pages', type=int, default=10)
+    parser.add_argument('--limite', type=int)
+    parser.add_argument('--catalogo', default='pcileecher.db')
+    parser.add_argument('--formato', choices=['tabela', 'json', 'csv'], default='tabela')
+    args = parser.parse_args()
+
+    consulta = Consulta(catalogo_path=args.catalogo, ttl=args.ttl * 3600, max_pages=args.max_pages)
+    inicio = time.perf_counter()
+    items = consulta.buscar(args.termo, None if args.tipo == 'todos' else args.tipo, args.ano, args.banca,
+                            args.nivel, offline=args.offline, orgao=args.orgao, limite=args.limite)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    if args.formato == 'json':
+        print(json.dumps(items, indent=2, ensure_ascii=False))
+    elif args.formato == 'csv':
+        escritor = csv.DictWriter(sys.stdout, COLUNAS_SAIDA, extrasaction='ignore')
+        escritor.writeheader()
+        escritor.writerows(items)
+    else:
+        _imprimir_tabela(items)
+
+    origem = f"site ({', '.join(f'{t}/{q}' for q, t in consulta.atualizados)})" if consulta.atualizados else "local"
+    print(f"\n{len(items)} itens em {duracao_ms:.1f} ms - {origem}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
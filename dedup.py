@@ -0,0 +1,177 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+# Parâmetros de rastreamento que não mudam o item apontado pela URL
+PARAMS_IGNORADOS = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'fbclid', 'gclid'}
+
+
+def normalizar_url(url):
+    """Chave canônica do item: sem esquema, fragmento, porta padrão, barra final nem parâmetros de rastreamento"""
+    partes = urlsplit(url.strip())
+    host = (partes.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if partes.port and partes.port not in (80, 443):
+        host = f"{host}:{partes.port}"
+
+    caminho = quote(unquote(partes.path), safe="/-._~!$&'()*+,;=:@")
+    while '//' in caminho:
+        caminho = caminho.replace('//', '/')
+    caminho = caminho.rstrip('/') or '/'
+
+    params = sorted((k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True)
+                    if k.lower() not in PARAMS_IGNORADOS)
+    consulta = f"?{urlencode(params)}" if params else ''
+    return f"{host}{caminho}{consulta}"
+
+
+def _hashes(chave):
+    """Dois hashes de 64 bits para o double hashing do filtro"""
+    digest = hashlib.blake2b(chave.encode('utf-8'), digest_size=16).digest()
+    return struct.unpack('<QQ', digest)
+
+
+class FiltroBloom:
+    """Filtro de Bloom em um bytearray: pode dar falso positivo, nunca falso negativo"""
+
+    CABECALHO = struct.Struct('<4sQQQQd')  # assinatura, bits, hashes, itens, capacidade, taxa de erro
+    ASSINATURA = b'BLM1'
+
+    def __init__(self, capacidade=1_000_000, taxa_erro=0.001):
+        self.capacidade = capacidade
+        self.taxa_erro = taxa_erro
+        self.bits = max(8, int(-capacidade * math.log(taxa_erro) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacidade * math.log(2)))
+        self.itens = 0
+        self._dados = bytearray((self.bits + 7) // 8)
+
+    def _posicoes(self, chave):
+        h1, h2 = _hashes(chave)
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def adicionar(self, chave):
+        for posicao in self._posicoes(chave):
+            self._dados[posicao >> 3] |= 1 << (posicao & 7)
+        self.itens += 1
+
+    def __contains__(self, chave):
+        return all(self._dados[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(chave))
+
+    @property
+    def cheio(self):
+        return self.itens > self.capacidade
+
+    def salvar(self, caminho):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(self.CABECALHO.pack(self.ASSINATURA, self.bits, self.hashes, self.itens,
+                                        self.capacidade, self.taxa_erro))
+            f.write(self._dados)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Lê um filtro salvo; None se o arquivo não existir ou estiver corrompido"""
+        try:
+            with open(caminho, 'rb') as f:
+                assinatura, bits, hashes, itens, capacidade, taxa_erro = \
+                    cls.CABECALHO.unpack(f.read(cls.CABECALHO.size))
+                dados = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if assinatura != cls.ASSINATURA or len(dados) != (bits + 7) // 8:
+            return None
+
+        filtro = cls.__new__(cls)
+        filtro.bits, filtro.hashes, filtro.itens, filtro._dados = bits, hashes, itens, dados
+        filtro.capacidade, filtro.taxa_erro = capacidade, taxa_erro
+        return filtro
+
+
+class IndiceDedup:
+    """Índice global de itens já baixados, pela URL normalizada.
+
+    O filtro de Bloom em memória responde "nunca visto" sem tocar no disco,
+    que é o caso da grande maioria dos itens numa busca nova; só os
+    "talvez visto" são confirmados na tabela exata do catálogo. Itens
+    entregues para download na execução atual também contam como vistos,
+    para que o mesmo item achado por vários termos seja baixado uma vez;
+    essa reserva é por pasta de destino, já que outro destino precisa
+    receber o arquivo (um hardlink, sem acessar a rede).
+    """
+
+    def __init__(self, catalogo, caminho_filtro=None, capacidade=1_000_000, taxa_erro=0.001, metricas=None):
+        self.catalogo = catalogo
+        self.caminho_filtro = caminho_filtro
+        self.taxa_erro = taxa_erro
+        self.metricas = metricas
+        self._lock = threading.Lock()
+        self._nesta_execucao = set()
+
+        total = self.catalogo.indexar_baixados(normalizar_url)
+        filtro = FiltroBloom.carregar(caminho_filtro) if caminho_filtro else None
+        # O filtro salvo só vale se tiver todas as URLs da tabela (senão daria falso negativo)
+        if filtro is None or filtro.itens != total or filtro.cheio:
+            filtro = self._reconstruir(max(capacidade, total * 2))
+        self.filtro = filtro
+
+    def _reconstruir(self, capacidade):
+        filtro = FiltroBloom(capacidade, self.taxa_erro)
+        for chave in self.catalogo.iter_normalizadas():
+            filtro.adicionar(chave)
+        return filtro
+
+    def iniciar_execucao(self):
+        """Esquece os itens entregues na execução anterior (que podem ter falhado)"""
+        with self._lock:
+            self._nesta_execucao = set()
+
+    def reservar(self, url, escopo=None):
+        """True se o item ainda não foi entregue nesta execução para o destino escopo; já o reserva"""
+        chave = normalizar_url(url)
+        # 64 bits do hash bastam para a reserva em memória e ocupam bem menos que a string
+        marca = _hashes(f"{escopo}\n{chave}" if escopo else chave)[0]
+        with self._lock:
+            if marca in self._nesta_execucao:
+                self._contar('repetido')
+                return False
+            self._nesta_execucao.add(marca)
+        return True
+
+    def baixado(self, url):
+        """True se o item já foi baixado em alguma execução (em qualquer pasta)"""
+        chave = normalizar_url(url)
+        if chave not in self.filtro:
+            self._contar('novo')
+            return False
+        if self.catalogo.contem_normalizada(chave):
+            self._contar('baixado')
+            return True
+        self._contar('falso_positivo')
+        return False
+
+    def novo(self, url, escopo=None):
+        """True se o item ainda não foi baixado nem entregue nesta execução; já o reserva"""
+        return self.reservar(url, escopo) and not self.baixado(url)
+
+    def registrar(self, url):
+        """Grava o item como baixado na tabela exata e no filtro"""
+        chave = normalizar_url(url)
+        if self.catalogo.registrar_normalizada(chave, url):
+            with self._lock:
+                self.filtro.adicionar(chave)
+                if self.filtro.cheio:
+                    self.filtro = self._reconstruir(self.filtro.capacidade * 2)
+
+    def salvar(self):
+        if self.caminho_filtro:
+            with self._lock:
+                self.filtro.salvar(self.caminho_filtro)
+
+    def _contar(self, resultado):
+        if self.metricas is not None:
+            self.metricas.incrementar('dedup_total', resultado=resultado)
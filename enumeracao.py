@@ -0,0 +1,139 @@
+import logging
+import re
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+# Link para uma página de categoria (banca, órgão, cargo...): /provas/<slug>/ ou /gabaritos/<slug>/
+RE_HREF = re.compile(r'href=["\']([^"\'#?]+)["\']', re.IGNORECASE)
+RE_CATEGORIA = {
+    'prova': re.compile(r'^/provas/([a-z0-9][a-z0-9-]*)/?$'),
+    'gabarito': re.compile(r'^/gabaritos/([a-z0-9][a-z0-9-]*)/?$')
+}
+# Segmentos que não são categorias de listagem
+IGNORADOS = {'download', 'busca', 'pesquisa'}
+
+
+class EnumeradorSite:
+    """Descobre o acervo pela estrutura do próprio site, sem termos de busca.
+
+    Parte das páginas de índice (/provas/ e /gabaritos/), que listam as
+    categorias do site (bancas, órgãos...), e pagina cada categoria uma
+    única vez. Links para outras categorias encontrados no caminho entram na
+    fila, então o que não aparece no índice também é alcançado. Cada página
+    de listagem é buscada no máximo uma vez e cada item é entregue uma única
+    vez, mesmo aparecendo em várias categorias.
+    """
+
+    def __init__(self, leecher, max_pages=500, max_categorias=None):
+        self.leecher = leecher
+        # Teto de segurança por categoria; a paginação para antes na primeira página vazia
+        self.max_pages = max_pages
+        self.max_categorias = max_categorias
+        self.visitadas = set()
+        self.entregues = set()
+        self.categorias = {'prova': [], 'gabarito': []}
+        self.paginas_buscadas = 0
+
+    def iter_itens(self, download_gabaritos=True, estado=None, ao_paginar=None):
+        """Gera provas e depois gabaritos, à medida que as páginas chegam.
+
+        ao_paginar(estado) recebe, a cada página consumida, um dicionário
+        serializável com a fila de categorias e a página atual; passado de
+        volta em estado, a enumeração continua a partir dali.
+        """
+        tipos = ['prova', 'gabarito'] if download_gabaritos else ['prova']
+        if estado:
+            tipos = tipos[tipos.index(estado['tipo']):]
+        for tipo in tipos:
+            yield from self._iter_tipo(tipo, estado if estado and estado['tipo'] == tipo else None, ao_paginar)
+
+    def _iter_tipo(self, tipo, estado=None, ao_paginar=None):
+        secao = 'provas' if tipo == 'prova' else 'gabaritos'
+        fila = deque()
+        conhecidas = set()
+        primeira_pagina = 1
+
+        def enfileirar(html):
+            for slug in self._categorias(html, tipo):
+                if slug not in conhecidas:
+                    conhecidas.add(slug)
+                    fila.append(slug)
+
+        if estado:
+            # Retomada: a fila já inclui a categoria em andamento, que continua na página seguinte
+            fila.extend(estado['fila'])
+            conhecidas.update(estado['conhecidas'])
+            self.categorias[tipo] = list(estado['categorias'])
+            primeira_pagina = estado['pagina'] + 1
+        else:
+            indice = self._buscar(f"{self.leecher.base_url}/{secao}/")
+            if indice:
+                enfileirar(indice)
+
+        while fila:
+            if self.max_categorias and len(self.categorias[tipo]) >= self.max_categorias:
+                break
+            slug = fila.popleft()
+            self.categorias[tipo].append(slug)
+            logging.info(f"Enumerando {secao}/{slug}")
+
+            completa = False
+            for page in range(primeira_pagina, self.max_pages + 1):
+                html = self._buscar(f"{self.leecher.base_url}/{secao}/{slug}/{page}/")
+                if not html:
+                    break
+                enfileirar(html)
+
+                if tipo == 'gabarito' and "Nenhum gabarito encontrado" in html:
+                    completa = True
+                    break
+                with self.leecher.metricas.medir('parse', tipo=tipo):
+                    if tipo == 'gabarito':
+                        items = self.leecher.parser.extrair_gabaritos(html)
+                    else:
+                        items = self.leecher.parser.extrair_provas(html)
+                if not items:
+                    completa = True
+                    break
+                # A categoria tem a mesma URL de uma busca por termo: fica disponível para consulta.py
+                self.leecher.catalogo.registrar_listagem(slug, tipo, items, page)
+
+                for item in items:
+                    if item['url'] in self.entregues:
+                        continue
+                    self.entregues.add(item['url'])
+                    item['tipo'] = tipo
+                    yield item
+
+                if ao_paginar:
+                    ao_paginar({'tipo': tipo, 'fila': [slug, *fila], 'conhecidas': sorted(conhecidas),
+                                'categorias': self.categorias[tipo][:-1], 'pagina': page})
+
+            if completa:
+                self.leecher.catalogo.registrar_varredura(slug, tipo, page - 1, True)
+            primeira_pagina = 1
+
+    def _buscar(self, url):
+        """Busca a página uma única vez; None se já foi visitada ou não existe"""
+        if url in self.visitadas:
+            return None
+        self.visitadas.add(url)
+        try:
+            html = self.leecher._fetch_listing(url)
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Erro ao acessar {url}: {str(e)}")
+            return None
+        self.paginas_buscadas += 1
+        return html
+
+    def _categorias(self, html, tipo):
+        host = urlsplit(self.leecher.base_url).netloc
+        for href in RE_HREF.findall(html):
+            url = urlsplit(urljoin(self.leecher.base_url + '/', href))
+            if url.netloc != host:
+                continue
+            categoria = RE_CATEGORIA[tipo].match(url.path)
+            if categoria and categoria.group(1) not in IGNORADOS:
+                yield categoria.group(1)
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+
+# Limites do bloco de leitura/escrita: pequeno o bastante para o cancelamento
+# e o progresso responderem rápido, grande o bastante para poucas syscalls
+BLOCO_MINIMO = 64 * 1024
+BLOCO_MAXIMO = 1024 * 1024
+# Tempo alvo de cada bloco; o tamanho se ajusta à vazão observada no host
+ALVO_BLOCO_SEGUNDOS = 0.05
+
+HAS_FALLOCATE = hasattr(os, 'posix_fallocate')
+
+
+class ArquivoParcial:
+    """Arquivo .part aberto por GravadorAtomico; só vira o arquivo final em concluir()"""
+
+    def __init__(self, gravador, filepath, parcial, inicio, total):
+        self.gravador = gravador
+        self.filepath = filepath
+        self.parcial = parcial
+        self.total = total
+        self.posicao = inicio
+        self._concluido = False
+        self._f = open(parcial, 'r+b' if inicio else 'wb')
+        if inicio:
+            self._f.seek(inicio)
+        elif total and HAS_FALLOCATE:
+            # Reserva o espaço de uma vez: menos fragmentação e "disco cheio" logo no início
+            try:
+                os.posix_fallocate(self._f.fileno(), 0, total)
+            except OSError:
+                pass
+
+    def write(self, dados):
+        tamanho = self._f.write(dados)
+        self.posicao += tamanho
+        return tamanho
+
+    def concluir(self):
+        """Fecha o .part e o renomeia atomicamente para o caminho final; retorna o tamanho"""
+        if self.total is not None and self.posicao != self.total:
+            raise IOError(f"download incompleto: {self.posicao} de {self.total} bytes")
+        self._f.truncate(self.posicao)
+        self._f.flush()
+        if self.gravador.sincronizar == 'arquivo':
+            os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self.parcial, self.filepath)
+        self._concluido = True
+        self.gravador._agendar(self.filepath)
+        return self.posicao
+
+    def fechar(self):
+        """Fecha sem concluir; o .part fica só com os bytes recebidos, pronto para o Range"""
+        if self._concluido or self._f.closed:
+            return
+        # Sem isso o espaço pré-alocado seria confundido com bytes já baixados
+        self._f.truncate(self.posicao)
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class GravadorAtomico:
+    """Caminho de escrita dos downloads.
+
+    Cada arquivo é escrito em <destino>.part e só aparece com o nome final
+    depois de completo (os.replace), então interromper o processo nunca
+    deixa um PDF truncado com cara de pronto. O espaço é pré-alocado quando
+    o tamanho é conhecido, as pastas já criadas ficam em cache e o tamanho
+    do bloco acompanha a vazão de cada host.
+
+    sincronizar controla o fsync e, com ele, o que sobrevive a uma queda
+    do sistema (energia, kernel): 'arquivo' sincroniza cada arquivo antes
+    do rename, então o nome final só aponta para dados já no disco; 'lote'
+    (padrão) sincroniza arquivos e pastas depois do rename, em grupos de
+    lote_fsync arquivos ou a cada intervalo_fsync segundos e em
+    descarregar(), e os renomeados desde o último lote podem voltar
+    vazios ou truncados (o catálogo confere o tamanho antes de reaproveitá-los);
+    'nunca' deixa tudo a cargo do sistema operacional.
+    """
+
+    def __init__(self, sincronizar='lote', lote_fsync=64, intervalo_fsync=5.0):
+        if sincronizar not in ('arquivo', 'lote', 'nunca'):
+            raise ValueError(f"modo de sincronização inválido: {sincronizar}")
+        self.sincronizar = sincronizar
+        self.lote_fsync = lote_fsync
+        self.intervalo_fsync = intervalo_fsync
+        self._lock = threading.Lock()
+        self._pastas = set()
+        self._pendentes = []
+        self._ultimo_fsync = time.monotonic()
+        self._vazao = {}  # host -> bytes/s (média móvel)
+
+    def garantir_pasta(self, pasta):
+        """os.makedirs uma única vez por pasta durante a vida do gravador"""
+        pasta = os.path.abspath(pasta)
+        if pasta in self._pastas:
+            return pasta
+        os.makedirs(pasta, exist_ok=True)
+        with self._lock:
+            self._pastas.add(pasta)
+        return pasta
+
+    def abrir(self, filepath, inicio=0, total=None, parcial=None):
+        """Abre filepath.part para escrita a partir de inicio (retomada com Range)"""
+        self.garantir_pasta(os.path.dirname(filepath) or '.')
+        return ArquivoParcial(self, filepath, parcial or filepath + '.part', inicio, total)
+
+    def bloco(self, host, total=None):
+        """Tamanho do próximo bloco para o host: ~ALVO_BLOCO_SEGUNDOS de transferência"""
+        vazao = self._vazao.get(host)
+        tamanho = int(vazao * ALVO_BLOCO_SEGUNDOS) if vazao else BLOCO_MINIMO
+        tamanho = min(max(tamanho, BLOCO_MINIMO), BLOCO_MAXIMO)
+        if total:
+            # Arquivos pequenos: um bloco só, sem reservar buffer à toa
+            tamanho = min(tamanho, max(total, 1))
+        # Potência de 2 para alinhar com as páginas do sistema de arquivos
+        return 1 << (tamanho - 1).bit_length()
+
+    def registrar_vazao(self, host, recebidos, segundos):
+        if recebidos < BLOCO_MINIMO or segundos <= 0:
+            return
+        amostra = recebidos / segundos
+        with self._lock:
+            anterior = self._vazao.get(host)
+            self._vazao[host] = amostra if anterior is None else 0.7 * anterior + 0.3 * amostra
+
+    def _agendar(self, filepath):
+        if self.sincronizar != 'lote':
+            return
+        with self._lock:
+            self._pendentes.append(filepath)
+            vencido = (len(self._pendentes) >= self.lote_fsync
+                       or time.monotonic() - self._ultimo_fsync >= self.intervalo_fsync)
+        if vencido:
+            self.descarregar()
+
+    def descarregar(self):
+        """Sincroniza com o disco os arquivos concluídos desde o último lote e suas pastas"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+            self._ultimo_fsync = time.monotonic()
+        pastas = set()
+        for caminho in pendentes:
+            _fsync_caminho(caminho, os.O_RDONLY)
+            pastas.add(os.path.dirname(os.path.abspath(caminho)))
+        # O fsync da pasta torna o rename durável
+        for pasta in pastas:
+            _fsync_caminho(pasta, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+        return len(pendentes)
+
+
+def _fsync_caminho(caminho, flags):
+    try:
+        fd = os.open(caminho, flags)
+    except OSError:
+        # Removido ou substituído por hardlink depois do rename; nada a sincronizar
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # Windows não permite fsync em diretórios
+        pass
+    finally:
+        os.close(fd)
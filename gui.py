@@ -1,46 +1,311 @@
 import sys
+import threading
+import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QLineEdit, 
                             QComboBox, QProgressBar, QTextEdit, QCheckBox,
-                            QFileDialog, QMessageBox)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+                            QFileDialog, QMessageBox, QTableView, QHeaderView,
+                            QAbstractItemView, QSplitter)
+from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QAbstractTableModel, QModelIndex,
+                          QSortFilterProxyModel)
 from pcileecher import PCILeecher
 from qconcursos_leecher import QConcursosLeecher
 import logging
 
+class ModeloResultados(QAbstractTableModel):
+    """Resultados da busca em uma lista simples; a view só pede as linhas visíveis"""
+    COLUNAS = [('tipo', 'Tipo'), ('nome', 'Nome'), ('ano', 'Ano'), ('banca', 'Banca'),
+               ('orgao', 'Órgão'), ('nivel', 'Nível')]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self.marcados = []
+        self._urls = set()
+        self._ordem = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUNAS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.get(self.COLUNAS[index.column()][0], '')
+        if role == Qt.ItemDataRole.CheckStateRole and index.column() == 0:
+            return Qt.CheckState.Checked if self.marcados[index.row()] else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return item['url']
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or index.column() != 0:
+            return False
+        self.marcados[index.row()] = Qt.CheckState(value) == Qt.CheckState.Checked
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == 0:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUNAS[section][1]
+        return None
+
+    def adicionar(self, items):
+        """Acrescenta um lote de itens de uma vez (um único beginInsertRows por lote)"""
+        novos = [item for item in items if item['url'] not in self._urls]
+        if not novos:
+            return
+        self._urls.update(item['url'] for item in novos)
+        if self._ordem:
+            # Com uma ordenação ativa, cada item entra direto na posição certa
+            for item in novos:
+                linha = self._posicao(item)
+                self.beginInsertRows(QModelIndex(), linha, linha)
+                self.items.insert(linha, item)
+                self.marcados.insert(linha, False)
+                self.endInsertRows()
+            return
+        inicio = len(self.items)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(novos) - 1)
+        self.items.extend(novos)
+        self.marcados.extend([False] * len(novos))
+        self.endInsertRows()
+
+    def _chave(self, item):
+        return (item.get(self.COLUNAS[self._ordem[0]][0]) or '').lower()
+
+    def _posicao(self, item):
+        """Busca binária da linha onde o item entra na ordenação atual"""
+        chave = self._chave(item)
+        decrescente = self._ordem[1] == Qt.SortOrder.DescendingOrder
+        inicio, fim = 0, len(self.items)
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            atual = self._chave(self.items[meio])
+            if (atual >= chave) if decrescente else (atual <= chave):
+                inicio = meio + 1
+            else:
+                fim = meio
+        return inicio
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Ordena em Python: bem mais rápido que deixar o proxy comparar célula a célula"""
+        if column < 0:
+            self._ordem = None
+            return
+        self._ordem = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        ordem = sorted(range(len(self.items)), key=lambda i: self._chave(self.items[i]),
+                       reverse=order == Qt.SortOrder.DescendingOrder)
+        nova_linha = {antiga: nova for nova, antiga in enumerate(ordem)}
+        self.items = [self.items[i] for i in ordem]
+        self.marcados = [self.marcados[i] for i in ordem]
+        antigos = self.persistentIndexList()
+        self.changePersistentIndexList(antigos, [self.index(nova_linha[i.row()], i.column()) for i in antigos])
+        self.layoutChanged.emit()
+
+    def limpar(self):
+        self.beginResetModel()
+        self.items, self.marcados, self._urls = [], [], set()
+        self._ordem = None
+        self.endResetModel()
+
+    def marcar(self, linhas, marcado=True):
+        for linha in linhas:
+            self.marcados[linha] = marcado
+        if self.items:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.items) - 1, 0),
+                                  [Qt.ItemDataRole.CheckStateRole])
+
+    def selecionados(self):
+        return [item for item, marcado in zip(self.items, self.marcados) if marcado]
+
+
+class FiltroResultados(QSortFilterProxyModel):
+    """Filtra os resultados por ano, banca e órgão e ordena por qualquer coluna"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filtros = {'ano': '', 'banca': '', 'orgao': ''}
+        self.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # A ordenação fica no modelo de origem; o proxy só filtra
+        self.sourceModel().sort(column, order)
+
+    def definir_filtro(self, campo, texto):
+        self.filtros[campo] = texto.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, linha, parent):
+        item = self.sourceModel().items[linha]
+        return all(texto in (item.get(campo) or '').lower()
+                   for campo, texto in self.filtros.items() if texto)
+
+    def linhas_visiveis(self):
+        return [self.mapToSource(self.index(i, 0)).row() for i in range(self.rowCount())]
+
+
+class BuscaWorker(QThread):
+    """Busca provas e gabaritos página a página e envia os itens em lotes para a tabela"""
+    pagina = pyqtSignal(list)
+    finished = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    INTERVALO_LOTE = 0.2
+
+    def __init__(self, leecher, params):
+        super().__init__()
+        self.leecher = leecher
+        self.params = params
+        self.cancelamento = threading.Event()
+
+    def cancel(self):
+        self.cancelamento.set()
+
+    def run(self):
+        total = 0
+        lote = []
+        ultimo_envio = time.monotonic()
+        if not isinstance(self.leecher, PCILeecher):
+            self.error.emit("A busca só está disponível para o PCI Concursos.")
+            self.finished.emit(0)
+            return
+        try:
+            for item in self.leecher.iter_provas_e_gabaritos(
+                    self.params['query'],
+                    self.params.get('ano'),
+                    self.params.get('banca'),
+                    self.params.get('gabaritos', True),
+                    self.params.get('max_pages', 10)):
+                if self.cancelamento.is_set():
+                    break
+                lote.append(item)
+                total += 1
+                # Um sinal por lote, no máximo a cada INTERVALO_LOTE segundos
+                if time.monotonic() - ultimo_envio >= self.INTERVALO_LOTE:
+                    self.pagina.emit(lote)
+                    lote = []
+                    ultimo_envio = time.monotonic()
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            if lote:
+                self.pagina.emit(lote)
+            self.finished.emit(total)
+
+
 class DownloadWorker(QThread):
+    """Busca e baixa em um pool de threads, com cancelamento cooperativo.
+
+    O progresso (arquivos e bytes) é acumulado pelos workers e emitido no
+    máximo a cada INTERVALO_PROGRESSO segundos, para a interface não receber
+    um sinal por bloco ou por arquivo.
+    """
     progress = pyqtSignal(str)
+    stats = pyqtSignal(dict)
     finished = pyqtSignal(int)
     error = pyqtSignal(str)
 
+    INTERVALO_PROGRESSO = 0.2
+
     def __init__(self, leecher, params):
         super().__init__()
         self.leecher = leecher
         self.params = params
+        self.cancelamento = threading.Event()
+        self._lock = threading.Lock()
+        self._ultimo_envio = 0.0
+        self._inicio = None
+        self._estado = {'encontrados': 0, 'baixados': 0, 'falhas': 0, 'bytes': 0}
+        self._concluidos = []
+
+    def cancel(self):
+        """Pede o cancelamento; os downloads param no próximo bloco, sem arquivos pela metade"""
+        self.cancelamento.set()
 
     def run(self):
+        if not isinstance(self.leecher, PCILeecher):
+            self.error.emit("O download só está disponível para o PCI Concursos.")
+            self.finished.emit(0)
+            return
         try:
-            if isinstance(self.leecher, PCILeecher):
-                items = self.leecher.search_provas_e_gabaritos(
+            self._inicio = time.monotonic()
+            if self.params.get('items') is not None:
+                # Itens escolhidos na tabela de resultados: o total já é conhecido
+                self._estado['encontrados'] = len(self.params['items'])
+                items = iter(self.params['items'])
+            else:
+                items = self._contar_encontrados(self.leecher.iter_provas_e_gabaritos(
                     self.params['query'],
                     self.params.get('ano'),
                     self.params.get('banca'),
                     self.params.get('gabaritos', True)
-                )
-                
-                total = 0
-                for item in items:
-                    try:
-                        if self.leecher.download_item(item, self.params['pasta']):
-                            total += 1
-                            self.progress.emit(f"Baixado: {item['nome']}")
-                    except Exception as e:
-                        self.error.emit(str(e))
-                
-                self.finished.emit(total)
-            
+                ))
+
+            baixados = set()
+            self.leecher.download_stream(
+                items,
+                self.params['pasta'],
+                cancelamento=self.cancelamento,
+                progresso=self._bytes_recebidos,
+                ao_concluir=self._item_concluido,
+                baixados=baixados
+            )
+            # Uma espera só, no fim: o total desconta os PDFs descartados na validação
+            total = self.leecher.aguardar_validacao(baixados)
+
+            self._emitir_progresso(forcar=True)
+            self.finished.emit(total)
+
         except Exception as e:
             self.error.emit(str(e))
+            self.finished.emit(self._estado['baixados'])
+
+    def _contar_encontrados(self, items):
+        for item in items:
+            with self._lock:
+                self._estado['encontrados'] += 1
+            yield item
+            self._emitir_progresso()
+
+    def _bytes_recebidos(self, quantidade):
+        with self._lock:
+            self._estado['bytes'] += quantidade
+        self._emitir_progresso()
+
+    def _item_concluido(self, item, ok):
+        with self._lock:
+            self._estado['baixados' if ok else 'falhas'] += 1
+            if ok:
+                self._concluidos.append(item['nome'])
+        self._emitir_progresso()
+
+    def _emitir_progresso(self, forcar=False):
+        """Junta tudo o que aconteceu desde o último envio em um único sinal"""
+        agora = time.monotonic()
+        with self._lock:
+            if not forcar and agora - self._ultimo_envio < self.INTERVALO_PROGRESSO:
+                return
+            self._ultimo_envio = agora
+            estado = dict(self._estado)
+            concluidos, self._concluidos = self._concluidos, []
+
+        decorrido = agora - self._inicio if self._inicio else 0
+        estado['bytes_por_s'] = estado['bytes'] / decorrido if decorrido > 0 else 0
+        if concluidos:
+            self.progress.emit("\n".join(f"Baixado: {nome}" for nome in concluidos))
+        self.stats.emit(estado)
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -93,79 +358,171 @@ class MainWindow(QMainWindow):
         # Botões
         button_layout = QHBoxLayout()
         self.search_button = QPushButton("Buscar")
-        self.search_button.clicked.connect(self.start_download)
+        self.search_button.clicked.connect(self.start_search)
+        self.download_button = QPushButton("Baixar selecionados")
+        self.download_button.clicked.connect(self.start_download)
         self.cancel_button = QPushButton("Cancelar")
         self.cancel_button.clicked.connect(self.cancel_download)
         self.cancel_button.setEnabled(False)
         button_layout.addWidget(self.search_button)
+        button_layout.addWidget(self.download_button)
         button_layout.addWidget(self.cancel_button)
         layout.addLayout(button_layout)
 
+        # Filtros locais da tabela de resultados
+        results_filter_layout = QHBoxLayout()
+        results_filter_layout.addWidget(QLabel("Filtrar resultados:"))
+        self.proxy = FiltroResultados(self)
+        for campo, rotulo in (('ano', "Ano"), ('banca', "Banca"), ('orgao', "Órgão")):
+            campo_input = QLineEdit()
+            campo_input.setPlaceholderText(rotulo)
+            campo_input.textChanged.connect(lambda texto, c=campo: self.proxy.definir_filtro(c, texto))
+            results_filter_layout.addWidget(campo_input)
+        self.mark_visible_button = QPushButton("Marcar visíveis")
+        self.mark_visible_button.clicked.connect(lambda: self.results_model.marcar(self.proxy.linhas_visiveis()))
+        self.unmark_button = QPushButton("Desmarcar todos")
+        self.unmark_button.clicked.connect(
+            lambda: self.results_model.marcar(range(self.results_model.rowCount()), False))
+        results_filter_layout.addWidget(self.mark_visible_button)
+        results_filter_layout.addWidget(self.unmark_button)
+        layout.addLayout(results_filter_layout)
+
+        # Tabela de resultados (model/view: suporta dezenas de milhares de linhas)
+        self.results_model = ModeloResultados(self)
+        self.proxy.setSourceModel(self.results_model)
+        self.results_view = QTableView()
+        self.results_view.setModel(self.proxy)
+        # Começa na ordem do site; a ordenação só é aplicada ao clicar em uma coluna
+        self.results_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.results_view.setSortingEnabled(True)
+        self.results_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.results_view.verticalHeader().setVisible(False)
+        self.results_view.verticalHeader().setDefaultSectionSize(22)
+        self.results_view.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+
         # Log
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
-        layout.addWidget(self.log_text)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.results_view)
+        splitter.addWidget(self.log_text)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+        layout.addWidget(splitter)
 
         # Progress Bar
         self.progress_bar = QProgressBar()
         layout.addWidget(self.progress_bar)
 
         self.worker = None
+        self.leecher = None
 
     def log(self, message):
         self.log_text.append(message)
 
-    def start_download(self):
+    def _criar_leecher(self):
+        # Cria leecher apropriado, reaproveitado entre busca e download
+        if self.site_combo.currentText() == "PCI Concursos":
+            if not isinstance(self.leecher, PCILeecher):
+                self.leecher = PCILeecher(mostrar_progresso=False)
+        elif not isinstance(self.leecher, QConcursosLeecher):
+            self.leecher = QConcursosLeecher()
+            # Precisaria implementar login aqui
+        return self.leecher
+
+    def _set_running(self, running):
+        self.search_button.setEnabled(not running)
+        self.download_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def start_search(self):
         query = self.search_input.text().strip()
         if not query:
             QMessageBox.warning(self, "Erro", "Digite um termo de busca!")
             return
 
-        # Prepara parâmetros
         params = {
             'query': query,
             'ano': self.year_input.text().strip() or None,
             'banca': self.banca_input.text().strip() or None,
-            'gabaritos': self.gabaritos_check.isChecked(),
-            'pasta': QFileDialog.getExistingDirectory(self, "Selecione a pasta para download")
+            'gabaritos': self.gabaritos_check.isChecked()
         }
 
-        if not params['pasta']:
+        self.results_model.limpar()
+        self.worker = BuscaWorker(self._criar_leecher(), params)
+        self.worker.pagina.connect(self.results_model.adicionar)
+        self.worker.error.connect(self.handle_error)
+        self.worker.finished.connect(self.search_finished)
+
+        self._set_running(True)
+        self.progress_bar.setMaximum(0)
+        self.log(f"Buscando: {query}")
+        self.worker.start()
+
+    def search_finished(self, total):
+        self.log(f"Busca concluída: {total} resultados. Marque os itens e clique em 'Baixar selecionados'.")
+        self._set_running(False)
+        self.progress_bar.setMaximum(100)
+        self.progress_bar.setValue(0)
+
+    def start_download(self):
+        items = self.results_model.selecionados()
+        if not items:
+            QMessageBox.warning(self, "Erro", "Busque e marque os itens que deseja baixar!")
             return
 
-        # Cria worker apropriado
-        if self.site_combo.currentText() == "PCI Concursos":
-            leecher = PCILeecher()
-        else:
-            leecher = QConcursosLeecher()
-            # Precisaria implementar login aqui
+        pasta = QFileDialog.getExistingDirectory(self, "Selecione a pasta para download")
+        if not pasta:
+            return
+
+        params = {'items': items, 'pasta': pasta}
 
-        self.worker = DownloadWorker(leecher, params)
+        self.worker = DownloadWorker(self._criar_leecher(), params)
         self.worker.progress.connect(self.log)
+        self.worker.stats.connect(self.update_progress)
         self.worker.error.connect(self.handle_error)
         self.worker.finished.connect(self.download_finished)
 
-        self.search_button.setEnabled(False)
-        self.cancel_button.setEnabled(True)
-        self.progress_bar.setMaximum(0)
+        self._set_running(True)
+        self.progress_bar.setMaximum(len(items))
+        self.progress_bar.setValue(0)
+        self.log(f"Baixando {len(items)} arquivos para: {pasta}")
         self.worker.start()
 
     def cancel_download(self):
         if self.worker and self.worker.isRunning():
-            self.worker.terminate()
-            self.worker.wait()
-            self.log("Download cancelado!")
-            self.search_button.setEnabled(True)
+            # Cancelamento cooperativo: o worker termina sozinho e dispara finished
+            self.worker.cancel()
             self.cancel_button.setEnabled(False)
-            self.progress_bar.setMaximum(100)
+            self.log("Cancelando... aguardando as operações em andamento pararem.")
+
+    def update_progress(self, stats):
+        encontrados = stats['encontrados']
+        concluidos = stats['baixados'] + stats['falhas']
+        if encontrados:
+            self.progress_bar.setMaximum(encontrados)
+            self.progress_bar.setValue(concluidos)
+        self.progress_bar.setFormat(
+            f"{concluidos}/{encontrados} arquivos - {stats['bytes'] / 1048576:.1f} MB "
+            f"({stats['bytes_por_s'] / 1048576:.1f} MB/s)"
+        )
+
+    def closeEvent(self, event):
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
     def handle_error(self, error_msg):
         self.log(f"Erro: {error_msg}")
 
     def download_finished(self, total):
-        self.log(f"\nDownload concluído! {total} arquivos baixados.")
-        self.search_button.setEnabled(True)
-        self.cancel_button.setEnabled(False)
+        if self.worker and self.worker.cancelamento.is_set():
+            self.log(f"\nDownload cancelado! {total} arquivos baixados antes do cancelamento.")
+        else:
+            self.log(f"\nDownload concluído! {total} arquivos baixados.")
+        self._set_running(False)
         self.progress_bar.setMaximum(100)
         self.progress_bar.setValue(100)
 
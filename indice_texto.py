@@ -0,0 +1,387 @@
+"""Índice de texto completo dos PDFs baixados (SQLite FTS5), consultável sem rede.
+
+Uso:
+    python indice_texto.py indexar [--catalogo pcileecher.db] [--pasta downloads_completo] [--processos 4]
+    python indice_texto.py buscar 'controle de constitucionalidade' [--limite 20]
+
+A extração de texto roda em um pool de processos (PyMuPDF se instalado,
+senão pypdf) e o texto vai para uma tabela FTS5 sem conteúdo: só o índice
+invertido com as posições fica no disco, o que basta para buscas por
+termos e frases e mantém o arquivo pequeno. Cada conteúdo (SHA-256) é
+indexado uma única vez, por mais pastas que o repitam. Com
+PCILeecher(indice_texto_path=...), cada download concluído entra no índice
+em segundo plano.
+
+Na busca, palavras soltas precisam aparecer todas no documento, trechos
+entre aspas são frases exatas, "termo*" busca por prefixo e OR/NOT
+combinam os termos. Acentos e caixa são ignorados.
+"""
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    try:
+        import fitz as pymupdf
+        HAS_PYMUPDF = True
+    except ImportError:
+        HAS_PYMUPDF = False
+
+try:
+    from pypdf import PdfReader
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+
+def extrair_texto(caminho, calcular_hash=False):
+    """Roda no processo do pool: (texto, páginas, sha256 ou None) do PDF"""
+    sha256 = None
+    if calcular_hash:
+        sha256 = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(bloco)
+        sha256 = sha256.hexdigest()
+
+    if HAS_PYMUPDF:
+        with pymupdf.open(caminho) as documento:
+            paginas = [pagina.get_text() for pagina in documento]
+    elif HAS_PYPDF:
+        paginas = [pagina.extract_text() or '' for pagina in PdfReader(caminho).pages]
+    else:
+        raise ImportError("extração de texto requer pymupdf ou pypdf (pip install pymupdf)")
+    return '\n'.join(paginas), len(paginas), sha256
+
+
+RE_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def consulta_fts(texto):
+    """Converte a busca do usuário em uma expressão FTS5 segura (frases, prefixos, OR/NOT)"""
+    partes = []
+    for frase, palavra in RE_TOKEN.findall(texto):
+        if frase:
+            frase = ' '.join(re.findall(r'\w+', frase))
+            if frase:
+                partes.append(f'"{frase}"')
+        elif palavra in ('OR', 'NOT', 'AND'):
+            partes.append(palavra)
+        else:
+            prefixo = palavra.endswith('*')
+            for termo in re.findall(r'\w+', palavra):
+                partes.append(f'"{termo}"')
+            if prefixo and partes and partes[-1].startswith('"'):
+                partes[-1] += '*'
+    # Operador solto no início ou no fim deixaria a expressão inválida
+    while partes and partes[0] in ('OR', 'NOT', 'AND'):
+        partes.pop(0)
+    while partes and partes[-1] in ('OR', 'NOT', 'AND'):
+        partes.pop()
+    return ' '.join(partes)
+
+
+class IndiceTexto:
+    """Índice invertido dos PDFs, alimentado por um pool de processos.
+
+    Se um processo do pool morre, o pool é recriado e os PDFs que estavam
+    nele são reenviados (até MAX_REENVIOS vezes); falhas do pool nunca vão
+    para o índice. Erros da própria extração ficam registrados em
+    documentos.erro e o PDF é tentado de novo quando for agendado outra vez.
+    """
+
+    MAX_REENVIOS = 2
+
+    def __init__(self, caminho='pcileecher_texto.db', processos=None, lote=50, metricas=None):
+        self.caminho = caminho
+        self.processos = processos or max(1, (os.cpu_count() or 2) - 1)
+        self.lote = lote
+        self.metricas = metricas
+        self._lock = threading.Lock()
+        self._executor = None
+        # Limita os PDFs em extração: quem agenda espera se o pool ficar para trás
+        self._vagas = threading.BoundedSemaphore(self.processos * 4)
+        self._em_andamento = set()
+        self._resultados = []
+
+        self._db = sqlite3.connect(caminho, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS documentos (
+                id INTEGER PRIMARY KEY,
+                sha256 TEXT NOT NULL UNIQUE,
+                caminho TEXT NOT NULL,
+                tamanho INTEGER,
+                mtime REAL,
+                paginas INTEGER,
+                erro TEXT,
+                indexado_em REAL NOT NULL
+            )
+        """)
+        # Sem conteúdo: só o índice invertido (com posições, para as frases); rowid = documentos.id
+        self._db.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(
+                texto, content='', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        # Todo caminho já visto: cópias e hardlinks do mesmo conteúdo não são extraídos de novo
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha256 TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._db.commit()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: o pool é criado com threads de download rodando, e fork copiaria locks presos
+                self._executor = ProcessPoolExecutor(self.processos,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _descartar_pool(self, executor):
+        """Tira de uso um pool quebrado; o próximo envio cria outro"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False)
+
+    def contem(self, sha256):
+        """True se o conteúdo já está indexado (sem erro) ou em extração"""
+        with self._lock:
+            return sha256 in self._em_andamento or self._db.execute(
+                "SELECT 1 FROM documentos WHERE sha256 = ? AND erro IS NULL", (sha256,)
+            ).fetchone() is not None
+
+    def agendar(self, caminho, sha256=None):
+        """Envia o PDF para extração em segundo plano; conteúdo já indexado é ignorado.
+
+        Sem sha256 (arquivos avulsos) o hash é calculado no próprio processo
+        de extração e o arquivo é pulado se caminho, tamanho e data não
+        mudaram desde a última indexação.
+        """
+        try:
+            estado = os.stat(caminho)
+        except OSError as e:
+            logging.error(f"Não foi possível indexar {caminho}: {str(e)}")
+            return False
+        if sha256 is None:
+            with self._lock:
+                if self._db.execute("""
+                    SELECT 1 FROM arquivos JOIN documentos ON documentos.sha256 = arquivos.sha256
+                    WHERE arquivos.caminho = ? AND arquivos.tamanho = ? AND arquivos.mtime = ?
+                      AND documentos.erro IS NULL
+                """, (caminho, estado.st_size, estado.st_mtime)).fetchone():
+                    return False
+        elif self.contem(sha256):
+            return False
+
+        self._vagas.acquire()
+        with self._lock:
+            if sha256:
+                self._em_andamento.add(sha256)
+        try:
+            self._enviar(caminho, sha256, estado, 0)
+        except Exception:
+            self._liberar(sha256)
+            raise
+        return True
+
+    def _enviar(self, caminho, sha256, estado, reenvios):
+        executor = self._pool()
+        try:
+            futuro = executor.submit(extrair_texto, caminho, sha256 is None)
+        except BrokenProcessPool:
+            # O pool quebrou antes de algum callback perceber
+            self._descartar_pool(executor)
+            executor = self._pool()
+            futuro = executor.submit(extrair_texto, caminho, sha256 is None)
+        futuro.add_done_callback(lambda f: self._concluido(f, executor, caminho, sha256, estado, reenvios))
+
+    def _liberar(self, sha256):
+        with self._lock:
+            self._em_andamento.discard(sha256)
+        self._vagas.release()
+
+    def _concluido(self, futuro, executor, caminho, sha256, estado, reenvios):
+        erro, texto, paginas = None, '', None
+        try:
+            texto, paginas, sha_calculado = futuro.result()
+            sha256 = sha256 or sha_calculado
+        except BrokenProcessPool as e:
+            # Um processo morreu e levou junto os PDFs do pool: nada a registrar sobre o conteúdo
+            self._descartar_pool(executor)
+            if reenvios < self.MAX_REENVIOS:
+                try:
+                    self._enviar(caminho, sha256, estado, reenvios + 1)
+                    return
+                except Exception as erro_envio:
+                    e = erro_envio
+            logging.error(f"Texto de {caminho} não extraído, pool de processos falhou: {type(e).__name__}: {e}")
+            if self.metricas is not None:
+                self.metricas.incrementar('pdfs_indexados_total', resultado='nao_extraido')
+            self._liberar(sha256)
+            return
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+            logging.error(f"Erro ao extrair texto de {caminho}: {erro}")
+        if sha256 is None:
+            # Falhou antes de calcular o hash: registra pelo caminho
+            sha256 = f"caminho:{caminho}"
+        with self._lock:
+            self._resultados.append((sha256, caminho, estado.st_size, estado.st_mtime, paginas, erro, texto))
+            cheio = len(self._resultados) >= self.lote
+        if self.metricas is not None:
+            self.metricas.incrementar('pdfs_indexados_total', resultado='erro' if erro else 'ok')
+        self._liberar(sha256)
+        if cheio:
+            self.gravar()
+
+    def gravar(self):
+        """Grava em uma transação os textos extraídos desde a última gravação"""
+        with self._lock:
+            resultados, self._resultados = self._resultados, []
+            if not resultados:
+                return 0
+            agora = time.time()
+            for sha256, caminho, tamanho, mtime, paginas, erro, texto in resultados:
+                # Um erro anterior não impede a nova tentativa; um documento já indexado não é substituído
+                self._db.execute("DELETE FROM documentos WHERE sha256 = ? AND erro IS NOT NULL", (sha256,))
+                cursor = self._db.execute("""
+                    INSERT OR IGNORE INTO documentos (sha256, caminho, tamanho, mtime, paginas, erro, indexado_em)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (sha256, caminho, tamanho, mtime, paginas, erro, agora))
+                if cursor.rowcount == 1 and texto:
+                    self._db.execute("INSERT INTO textos (rowid, texto) VALUES (?, ?)", (cursor.lastrowid, texto))
+                self._db.execute("INSERT OR REPLACE INTO arquivos (caminho, tamanho, mtime, sha256) VALUES (?, ?, ?, ?)",
+                                 (caminho, tamanho, mtime, sha256))
+            self._db.commit()
+            return len(resultados)
+
+    def aguardar(self):
+        """Espera os PDFs agendados e grava o que falta"""
+        # Esvazia as vagas: só retorna quando todas as extrações terminaram, mesmo
+        # com o pool sendo recriado depois de uma queda
+        for _ in range(self.processos * 4):
+            self._vagas.acquire()
+        for _ in range(self.processos * 4):
+            self._vagas.release()
+        return self.gravar()
+
+    def indexar(self, caminhos):
+        """Indexa (caminho, sha256 ou None) e espera terminar; retorna quantos foram enviados"""
+        enviados = sum(1 for caminho, sha256 in caminhos if self.agendar(caminho, sha256))
+        self.aguardar()
+        return enviados
+
+    def otimizar(self):
+        """Funde os segmentos do índice: menos espaço e buscas mais rápidas depois de muitas inserções"""
+        with self._lock:
+            self._db.execute("INSERT INTO textos (textos) VALUES ('optimize')")
+            self._db.commit()
+
+    def buscar(self, consulta, limite=20):
+        """Documentos que atendem à consulta, do mais ao menos relevante (BM25)"""
+        expressao = consulta_fts(consulta)
+        if not expressao:
+            return []
+        with self._lock:
+            cursor = self._db.execute("""
+                SELECT documentos.sha256, documentos.caminho, documentos.paginas, textos.rank
+                FROM textos JOIN documentos ON documentos.id = textos.rowid
+                WHERE textos MATCH ?
+                ORDER BY textos.rank
+                LIMIT ?
+            """, (expressao, limite))
+            return [{'sha256': sha256, 'caminho': caminho, 'paginas': paginas, 'relevancia': -rank}
+                    for sha256, caminho, paginas, rank in cursor.fetchall()]
+
+    def contar(self):
+        with self._lock:
+            total, erros = self._db.execute("SELECT COUNT(*), COUNT(erro) FROM documentos").fetchone()
+        return {'documentos': total, 'erros': erros}
+
+    def fechar(self):
+        self.aguardar()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+        with self._lock:
+            self._db.close()
+
+
+def _arquivos_da_pasta(pasta):
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in nomes:
+            if nome.lower().endswith('.pdf'):
+                yield os.path.abspath(os.path.join(raiz, nome)), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de texto completo dos PDFs baixados")
+    parser.add_argument('--indice', default='pcileecher_texto.db')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    indexar = sub.add_parser('indexar', help="indexa os PDFs do catálogo e/ou de uma pasta")
+    indexar.add_argument('--catalogo', default='pcileecher.db')
+    indexar.add_argument('--pasta', help="também indexa os PDFs desta pasta (hash calculado na hora)")
+    indexar.add_argument('--processos', type=int)
+
+    buscar = sub.add_parser('buscar', help="busca termos e frases (entre aspas) no texto das provas")
+    buscar.add_argument('consulta', nargs='+')
+    buscar.add_argument('--limite', type=int, default=20)
+    buscar.add_argument('--catalogo', default='pcileecher.db')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from catalogo import Catalogo
+
+    if args.comando == 'indexar':
+        indice = IndiceTexto(args.indice, args.processos)
+        inicio = time.time()
+        enviados = 0
+        if os.path.exists(args.catalogo):
+            enviados += indice.indexar(Catalogo(args.catalogo).baixados_com_hash())
+        if args.pasta:
+            enviados += indice.indexar(_arquivos_da_pasta(args.pasta))
+        if enviados:
+            indice.otimizar()
+        contagem = indice.contar()
+        indice.fechar()
+        print(f"{enviados} PDFs processados em {time.time() - inicio:.1f}s; "
+              f"{contagem['documentos']} no índice ({contagem['erros']} com erro)")
+        return
+
+    indice = IndiceTexto(args.indice)
+    catalogo = Catalogo(args.catalogo) if os.path.exists(args.catalogo) else None
+    inicio = time.perf_counter()
+    resultados = indice.buscar(' '.join(args.consulta), args.limite)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    itens = catalogo.por_sha256([r['sha256'] for r in resultados]) if catalogo else {}
+    for resultado in resultados:
+        item = itens.get(resultado['sha256'])
+        descricao = f"{item['nome']} ({item['ano']}) - {item['banca']}" if item else ''
+        print(f"{resultado['relevancia']:7.2f}  {resultado['caminho']}  {descricao}")
+    print(f"\n{len(resultados)} documentos em {duracao_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
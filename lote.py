@@ -0,0 +1,193 @@
+"""Execução em lote, sem perguntas, de buscas e downloads do PCILeecher.
+
+Uso:
+    python lote.py jobs.json [--jobs 2] [--workers 8] [--intervalo-host 0.5]
+
+Formato do arquivo de jobs (JSON):
+
+    {
+      "padrao": {"max_pages": 10, "saida": "downloads_completo"},
+      "jobs": [
+        {"nome": "fgv-ti", "termos": ["ti", "informatica"], "anos": [2024, 2018], "bancas": ["FGV"]},
+        {"nome": "cesgranrio", "query": "cesgranrio ti", "ano": 2023, "gabaritos": false,
+         "saida": "/dados/cesgranrio"},
+        {"nome": "completo", "incremental": true}
+      ]
+    }
+
+Campos de cada job (todos opcionais): termos ou query, anos [inicial, final]
+ou ano, bancas, saida, max_pages, gabaritos, incremental e estrutura (percorre
+as categorias do site em vez de termos). Sem termos, usa os termos padrão do
+download completo. Todos os jobs rodam em paralelo
+sobre um único PCILeecher, dividindo a mesma sessão, o mesmo ritmo por host
+e o mesmo limite de concorrência.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pcileecher import PCILeecher
+from perfil import Perfilador
+
+
+def carregar_jobs(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        dados = json.load(f)
+
+    if isinstance(dados, list):
+        dados = {'jobs': dados}
+
+    padrao = dados.get('padrao', {})
+    jobs = []
+    for i, job in enumerate(dados.get('jobs', []), 1):
+        job = {**padrao, **job}
+        job.setdefault('nome', f"job-{i}")
+        jobs.append(job)
+
+    if not jobs:
+        raise ValueError(f"Nenhum job encontrado em {caminho}")
+    return jobs
+
+
+def executar_job(leecher, job, baixados=None):
+    """Roda um job reaproveitando download_all_by_year para cada banca pedida.
+
+    Com baixados (set), a validação dos PDFs não é esperada aqui: o set
+    recebe as URLs baixadas e quem chama espera uma vez por todos os jobs.
+    """
+    termos = job.get('termos')
+    if termos is None and job.get('query'):
+        termos = [job['query']]
+
+    if 'ano' in job:
+        ano_inicial = ano_final = int(job['ano'])
+    else:
+        anos = job.get('anos') or [None, None]
+        ano_inicial, ano_final = anos[0], anos[-1]
+
+    total = 0
+    for banca in job.get('bancas') or [None]:
+        logging.info(f"[{job['nome']}] iniciando banca={banca or 'todas'}")
+        total += leecher.download_all_by_year(
+            ano_inicial,
+            ano_final,
+            banca,
+            termos,
+            max_pages=job.get('max_pages', 10),
+            incremental=job.get('incremental', False),
+            download_gabaritos=job.get('gabaritos', True),
+            pasta_base=job.get('saida'),
+            interativo=False,
+            estrutura=job.get('estrutura', False),
+            baixados=baixados
+        )
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa jobs do PCILeecher sem interação")
+    parser.add_argument('arquivo', help="arquivo JSON com os jobs")
+    parser.add_argument('--jobs', type=int, default=2, help="jobs executados ao mesmo tempo")
+    parser.add_argument('--workers', type=int, default=8, help="downloads simultâneos no total")
+    parser.add_argument('--intervalo-host', type=float, default=0.5, help="segundos entre downloads no mesmo host")
+    parser.add_argument('--parser', default='auto')
+    parser.add_argument('--catalogo', default='pcileecher.db')
+    parser.add_argument('--cache-dir', default='.cache_http')
+    parser.add_argument('--resumo', help="grava o resumo da execução em JSON neste arquivo")
+    parser.add_argument('--porta-metricas', type=int, help="expõe métricas Prometheus em 127.0.0.1:PORTA/metrics")
+    parser.add_argument('--pool', type=int, help="conexões mantidas por host (padrão: max(10, workers))")
+    parser.add_argument('--http2', action='store_true', help="usa HTTP/2 (requer httpx[http2])")
+    parser.add_argument('--indice-texto', help="indexa o texto dos PDFs baixados neste arquivo (ver indice_texto.py)")
+    parser.add_argument('--sem-validacao', action='store_true', help="não valida os PDFs baixados")
+    parser.add_argument('--fsync', choices=['arquivo', 'lote', 'nunca'], default='lote',
+                        help="quando sincronizar os arquivos baixados com o disco")
+    parser.add_argument('--perfil', help="grava um perfil por amostragem (pilhas por fase) neste diretório")
+    parser.add_argument('--perfil-intervalo', type=float, default=0.01, help="segundos entre amostras do perfil")
+    parser.add_argument('--base-url', help="outro endereço para o site (ex.: benchmarks/servidor_local.py)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler('pcileecher.log'), logging.StreamHandler()]
+    )
+
+    jobs = carregar_jobs(args.arquivo)
+
+    # Um único leecher: sessão, ritmo por host e limite AIMD são globais a todos os jobs
+    leecher = PCILeecher(
+        max_workers=args.workers,
+        intervalo_host=args.intervalo_host,
+        cache_dir=args.cache_dir,
+        catalogo_path=args.catalogo,
+        parser=args.parser,
+        mostrar_progresso=False,
+        porta_metricas=args.porta_metricas,
+        pool_conexoes=args.pool,
+        http2=args.http2,
+        sincronizar=args.fsync,
+        indice_texto_path=args.indice_texto,
+        validar_pdfs=not args.sem_validacao
+    )
+    if args.base_url:
+        leecher.base_url = args.base_url.rstrip('/')
+        leecher.gabaritos_url = f"{leecher.base_url}/gabaritos"
+
+    perfilador = Perfilador(leecher.metricas, args.perfil, args.perfil_intervalo).iniciar() if args.perfil else None
+
+    resumo = []
+    inicio = time.time()
+    baixados_por_job = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futuros = {}
+        for job in jobs:
+            baixados = set()
+            futuros[executor.submit(executar_job, leecher, job, baixados)] = (job, baixados)
+        for futuro in as_completed(futuros):
+            job, baixados = futuros[futuro]
+            resultado = {'nome': job['nome'], 'baixados': 0, 'erro': None}
+            try:
+                resultado['baixados'] = futuro.result()
+                logging.info(f"[{job['nome']}] concluído: {resultado['baixados']} arquivos")
+                baixados_por_job.append((resultado, baixados))
+            except Exception as e:
+                resultado['erro'] = str(e)
+                logging.error(f"[{job['nome']}] falhou: {str(e)}")
+            resumo.append(resultado)
+
+    # Uma única espera pelas validações de todos os jobs; os totais descontam os PDFs descartados
+    leecher.aguardar_validacao()
+    for resultado, baixados in baixados_por_job:
+        confirmados = leecher.aguardar_validacao(baixados)
+        if confirmados < resultado['baixados']:
+            logging.warning(f"[{resultado['nome']}] {resultado['baixados'] - confirmados} PDFs descartados "
+                            f"na validação")
+        resultado['baixados'] = confirmados
+
+    if perfilador:
+        perfilador.parar()
+    if leecher.validador:
+        leecher.validador.fechar()
+    if leecher.indice_texto:
+        leecher.indice_texto.fechar()
+
+    saida = {
+        'duracao_s': round(time.time() - inicio, 1),
+        'baixados': sum(r['baixados'] for r in resumo),
+        'jobs': resumo,
+        'metricas': leecher.metricas.resumo()
+    }
+    texto = json.dumps(saida, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.resumo:
+        with open(args.resumo, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+
+    return 1 if any(r['erro'] for r in resumo) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metricas:
+    """Contadores e histogramas de latência por fase, seguros entre threads.
+
+    As fases medidas são: listagem (HTTP das páginas de busca), parse,
+    download (item inteiro), transferencia, catalogo e as esperas do ritmo
+    por host e do backoff. Os nomes seguem o formato do Prometheus.
+    """
+
+    def __init__(self, prefixo='pcileecher', buckets=BUCKETS):
+        self.prefixo = prefixo
+        self.buckets = tuple(buckets)
+        self.inicio = time.time()
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+        # Pilha de fases em andamento por thread (usada pelo perfilador de perfil.py)
+        self._fases_thread = {}
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, segundos, **rotulos):
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            hist = self._histogramas.get(chave)
+            if hist is None:
+                hist = self._histogramas[chave] = {'buckets': [0] * len(self.buckets), 'soma': 0.0, 'total': 0}
+            for i, limite in enumerate(self.buckets):
+                if segundos <= limite:
+                    hist['buckets'][i] += 1
+                    break
+            hist['soma'] += segundos
+            hist['total'] += 1
+
+    @contextmanager
+    def medir(self, fase, **rotulos):
+        """Mede a duração do bloco na fase e conta as execuções e os erros"""
+        pilha = self._fases_thread.setdefault(threading.get_ident(), [])
+        pilha.append(fase)
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.incrementar('erros_total', fase=fase, **rotulos)
+            raise
+        finally:
+            pilha.pop()
+            self.observar('fase_segundos', time.perf_counter() - inicio, fase=fase, **rotulos)
+            self.incrementar('operacoes_total', fase=fase, **rotulos)
+
+    def fase_da_thread(self, ident):
+        """Fase mais interna em andamento na thread, ou None"""
+        try:
+            # Lida sem trava: a pilha pode esvaziar entre a consulta e o acesso
+            return self._fases_thread[ident][-1]
+        except (KeyError, IndexError):
+            return None
+
+    def _copiar(self):
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {k: {'buckets': list(v['buckets']), 'soma': v['soma'], 'total': v['total']}
+                           for k, v in self._histogramas.items()}
+        return contadores, histogramas
+
+    def _rotulos(self, rotulos, extra=()):
+        pares = list(rotulos) + list(extra)
+        if not pares:
+            return ''
+        return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+    def texto_prometheus(self):
+        """Exposição no formato texto do Prometheus (versão 0.0.4)"""
+        contadores, histogramas = self._copiar()
+        linhas = []
+
+        for nome in sorted({nome for nome, _ in contadores}):
+            completo = f"{self.prefixo}_{nome}"
+            linhas.append(f"# TYPE {completo} counter")
+            for (n, rotulos), valor in sorted(contadores.items()):
+                if n == nome:
+                    linhas.append(f"{completo}{self._rotulos(rotulos)} {valor}")
+
+        for nome in sorted({nome for nome, _ in histogramas}):
+            completo = f"{self.prefixo}_{nome}"
+            linhas.append(f"# TYPE {completo} histogram")
+            for (n, rotulos), hist in sorted(histogramas.items()):
+                if n != nome:
+                    continue
+                acumulado = 0
+                for limite, quantidade in zip(self.buckets, hist['buckets']):
+                    acumulado += quantidade
+                    linhas.append(f"{completo}_bucket{self._rotulos(rotulos, [('le', limite)])} {acumulado}")
+                linhas.append(f"{completo}_bucket{self._rotulos(rotulos, [('le', '+Inf')])} {hist['total']}")
+                linhas.append(f"{completo}_sum{self._rotulos(rotulos)} {hist['soma']:.6f}")
+                linhas.append(f"{completo}_count{self._rotulos(rotulos)} {hist['total']}")
+
+        linhas.append(f"# TYPE {self.prefixo}_inicio_segundos gauge")
+        linhas.append(f"{self.prefixo}_inicio_segundos {self.inicio:.3f}")
+        return '\n'.join(linhas) + '\n'
+
+    def resumo(self):
+        """Resumo em dicionário: totais por contador e latência por fase"""
+        contadores, histogramas = self._copiar()
+
+        def chave(nome, rotulos):
+            return nome + ''.join(f".{v}" for _, v in rotulos)
+
+        fases = {}
+        for (nome, rotulos), hist in sorted(histogramas.items()):
+            total = hist['total']
+            fase = fases[chave(nome, rotulos)] = {
+                'total': total,
+                'segundos': round(hist['soma'], 4),
+                'media_s': round(hist['soma'] / total, 4) if total else 0.0,
+                'p50_s': self._quantil(hist, 0.5),
+                'p95_s': self._quantil(hist, 0.95)
+            }
+            erros = contadores.get(('erros_total', rotulos), 0)
+            fase['erros'] = erros
+            fase['taxa_erro'] = round(erros / total, 4) if total else 0.0
+
+        return {
+            'duracao_s': round(time.time() - self.inicio, 1),
+            'contadores': {chave(nome, rotulos): valor for (nome, rotulos), valor in sorted(contadores.items())},
+            'fases': fases
+        }
+
+    def _quantil(self, hist, q):
+        """Limite superior do bucket que contém o quantil (estimativa do histograma)"""
+        if not hist['total']:
+            return 0.0
+        alvo = q * hist['total']
+        acumulado = 0
+        for limite, quantidade in zip(self.buckets, hist['buckets']):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return limite
+        return None
+
+    def gravar_resumo(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.resumo(), f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class ServidorMetricas:
+    """Endpoint /metrics em localhost, servido por uma thread em segundo plano"""
+
+    def __init__(self, metricas, porta=9108, host='127.0.0.1'):
+        self.metricas = metricas
+        self._httpd = ThreadingHTTPServer((host, porta), self._criar_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._httpd.server_address[:2]
+        return f"http://{host}:{porta}/metrics"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"Métricas disponíveis em {self.url}")
+        return self
+
+    def parar(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _criar_handler(self):
+        metricas = self.metricas
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] == '/metrics':
+                    corpo = metricas.texto_prometheus().encode('utf-8')
+                    tipo = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path.split('?')[0] == '/resumo':
+                    corpo = json.dumps(metricas.resumo(), ensure_ascii=False).encode('utf-8')
+                    tipo = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+        return Handler
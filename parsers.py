@@ -0,0 +1,154 @@
+import logging
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    try:
+        # Versões antigas do selectolax só têm o backend Modest
+        from selectolax.parser import HTMLParser
+        HAS_SELECTOLAX = True
+    except ImportError:
+        HAS_SELECTOLAX = False
+
+
+# Só as partes da página que interessam são transformadas em árvore
+SO_LINHAS = SoupStrainer('tr')
+SO_GABARITOS = SoupStrainer('div', class_='ga-list-item')
+
+
+class ParserBeautifulSoup:
+    """Parser das listagens com BeautifulSoup, montando apenas as linhas e itens de gabarito"""
+
+    def __init__(self, leecher, features='html.parser'):
+        self.leecher = leecher
+        self.features = features
+        self.nome = 'bs4' if features == 'html.parser' else f"bs4+{features}"
+
+    def extrair_provas(self, html):
+        soup = BeautifulSoup(html, self.features, parse_only=SO_LINHAS)
+        provas = []
+
+        for tr in soup.find_all('tr'):
+            try:
+                prova = self.leecher._extract_prova_info(tr)
+                if prova:
+                    provas.append(prova)
+            except Exception as e:
+                logging.error(f"Erro ao extrair informações da prova: {str(e)}")
+                continue
+
+        return provas
+
+    def extrair_gabaritos(self, html):
+        soup = BeautifulSoup(html, self.features, parse_only=SO_GABARITOS)
+        return self.leecher._extract_gabaritos(soup)
+
+
+class ParserSelectolax:
+    """Parser das listagens com selectolax, que devolve os mesmos dicionários do BeautifulSoup"""
+
+    nome = 'selectolax'
+
+    def __init__(self, leecher):
+        self.leecher = leecher
+
+    def extrair_provas(self, html):
+        provas = []
+
+        for tr in HTMLParser(html).css('tr'):
+            try:
+                tds = tr.css('td')
+                if len(tds) < 5:
+                    continue
+
+                link = tds[0].css_first('a')
+                if link is None:
+                    continue
+
+                href = link.attributes.get('href')
+                if href is None:
+                    raise KeyError('href')
+
+                provas.append({
+                    'url': urljoin(self.leecher.base_url, href),
+                    'nome': self.leecher._clean_filename(link.text().strip()),
+                    'ano': tds[1].text().strip(),
+                    'orgao': tds[2].text().strip(),
+                    'banca': tds[3].text().strip(),
+                    'nivel': tds[4].text().strip()
+                })
+            except Exception as e:
+                logging.error(f"Erro ao extrair informações da prova: {str(e)}")
+                continue
+
+        return provas
+
+    def extrair_gabaritos(self, html):
+        gabaritos = []
+
+        for item in HTMLParser(html).css('div.ga-list-item'):
+            try:
+                link = item.css_first('a[href]')
+                if link is None:
+                    continue
+
+                info = item.css_first('div.ga-list-info')
+                if info is None:
+                    continue
+
+                titulo = link.text().strip()
+                data_div = info.css_first('div.ga-list-date')
+                data = data_div.text().strip() if data_div is not None else ''
+                ano = data.split('/')[-1] if data else ''
+
+                banca_div = info.css_first('div.ga-list-org')
+                banca = banca_div.text().strip() if banca_div is not None else ''
+
+                gabaritos.append({
+                    'url': urljoin(self.leecher.base_url, link.attributes['href']),
+                    'nome': self.leecher._clean_filename(titulo),
+                    'ano': ano,
+                    'banca': banca,
+                    'data': data
+                })
+            except Exception as e:
+                logging.error(f"Erro ao extrair gabarito: {str(e)}")
+                continue
+
+        return gabaritos
+
+
+BACKENDS = ('auto', 'bs4', 'lxml', 'selectolax')
+
+
+def criar_parser(leecher, backend='auto'):
+    """Escolhe o parser das listagens; 'auto' usa o mais rápido instalado"""
+    if backend == 'auto':
+        if HAS_SELECTOLAX:
+            backend = 'selectolax'
+        elif HAS_LXML:
+            backend = 'lxml'
+        else:
+            backend = 'bs4'
+
+    if backend == 'selectolax':
+        if not HAS_SELECTOLAX:
+            raise ImportError("selectolax não está instalado (pip install selectolax)")
+        return ParserSelectolax(leecher)
+    if backend == 'lxml':
+        if not HAS_LXML:
+            raise ImportError("lxml não está instalado (pip install lxml)")
+        return ParserBeautifulSoup(leecher, 'lxml')
+    if backend == 'bs4':
+        return ParserBeautifulSoup(leecher)
+
+    raise ValueError(f"Parser desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
@@ -1,20 +1,93 @@
 import requests
-from bs4 import BeautifulSoup
 import os
 import re
 import time
-from urllib.parse import urljoin
+import hashlib
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
 from datetime import datetime
 from tqdm import tqdm
 import logging
+from transporte import RitmoPorHost, ControleAIMD, Requisitor, criar_sessao
+from cache_http import CacheHTTP
+from catalogo import Catalogo
+from armazem import ArmazemConteudo
+from parsers import criar_parser
+from metricas import Metricas, ServidorMetricas
+from perfil import Perfilador
+from enumeracao import EnumeradorSite
+from dedup import IndiceDedup
+from escrita import GravadorAtomico
+from checkpoint import Checkpoint
+from indice_texto import IndiceTexto
+from validacao import ValidadorPDF, parece_pdf
+
+class DownloadCancelado(Exception):
+    """Download interrompido pelo token de cancelamento; o .part fica para ser retomado"""
+
 
 class PCILeecher:
-    def __init__(self):
+    # Lista de termos padrão para busca
+    TERMOS_PADRAO = [
+        "administracao", "direito", "contabilidade", "economia", 
+        "informatica", "ti", "medicina", "enfermagem", "engenharia",
+        "matematica", "portugues", "conhecimentos-gerais", "raciocinio-logico",
+        # Adiciona mais termos comuns
+        "tecnico", "analista", "auditor", "fiscal", "professor",
+        "policia", "agente", "oficial", "assistente", "superior",
+        "medio", "fundamental", "especialista", "gestor", "perito"
+    ]
+    # Downloads refeitos por URL quando o arquivo recebido não passa na validação de PDF
+    MAX_REVALIDACOES = 2
+
+    def __init__(self, max_workers=4, intervalo_host=0.5, usar_cache=True, cache_dir='.cache_http', cache_ttl=3600,
+                 catalogo_path='pcileecher.db', armazem_dir='.blobs', parser='auto', mostrar_progresso=True,
+                 porta_metricas=None, pool_conexoes=None, http2=False, sincronizar='lote',
+                 indice_texto_path=None, validar_pdfs=True):
         self.base_url = "https://www.pciconcursos.com.br"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        self.session = requests.Session()
+        self.max_workers = max_workers
+        # Barras do tqdm; desligadas em execuções sem terminal (ex.: lote.py)
+        self.mostrar_progresso = mostrar_progresso
+        # Uma única sessão compartilhada por todas as threads de download, com
+        # pool grande o bastante para não descartar conexões, keep-alive e
+        # listagens comprimidas; http2=True multiplexa tudo em uma conexão
+        self.session = criar_sessao(pool=pool_conexoes or max(10, max_workers), http2=http2)
+        # Intervalo mínimo entre downloads no mesmo host (substitui os sleeps fixos)
+        self.ritmo = RitmoPorHost(intervalo_host)
+        self._travas_url = [threading.Lock() for _ in range(64)]
+        # Contadores e latências por fase; com porta_metricas, expostos em /metrics
+        self.metricas = Metricas()
+        self.servidor_metricas = ServidorMetricas(self.metricas, porta_metricas).iniciar() if porta_metricas else None
+        # Novas tentativas com backoff e limite de concorrência adaptativo (AIMD),
+        # compartilhados entre listagens e downloads; começa na metade de max_workers
+        self.http = Requisitor(self.session, ControleAIMD(inicial=max(1, max_workers // 2), maximo=max_workers),
+                               metricas=self.metricas)
+        # Catálogo persistente de itens descobertos/baixados (substitui info.txt)
+        self.catalogo = Catalogo(catalogo_path)
+        # Dedup global pela URL normalizada, com filtro de Bloom salvo ao lado do catálogo
+        self.dedup = IndiceDedup(self.catalogo, f"{catalogo_path}.bloom", metricas=self.metricas)
+        # Cada conteúdo é guardado uma única vez; as pastas recebem hardlinks
+        self.armazem = ArmazemConteudo(armazem_dir)
+        # Escrita em .part com rename atômico, pré-alocação, cache de pastas e fsync em lote
+        self.escrita = GravadorAtomico(sincronizar)
+        # Texto dos PDFs baixados, indexado em segundo plano por um pool de processos
+        self.indice_texto = IndiceTexto(indice_texto_path, metricas=self.metricas) if indice_texto_path else None
+        # Cada PDF baixado é validado num pool de processos; os inválidos são apagados e baixados de novo
+        self.validador = ValidadorPDF(self._pdf_validado, metricas=self.metricas) if validar_pdfs else None
+        self._refazer = None
+        self._refazendo = set()
+        self._lock_refazer = threading.Lock()
+        self._tentativas_validacao = {}
+        # Backend de parsing das listagens (bs4, lxml ou selectolax)
+        self.parser = criar_parser(self, parser)
+        # Cache em disco das páginas de listagem (provas e gabaritos)
+        self.cache = CacheHTTP(cache_dir, ttl=cache_ttl) if usar_cache else None
         self.setup_logging()
         self.gabaritos_url = "https://www.pciconcursos.com.br/gabaritos"
         self.ano_atual = datetime.now().year + 2  # Considera até 2 anos futuros
@@ -27,15 +100,38 @@ class PCILeecher:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
 
-    def search_provas(self, query, ano=None, banca=None, max_pages=10):
-        all_provas = []
-        page = 1
+    def search_provas(self, query, ano=None, banca=None, max_pages=10, incremental=False):
+        return [prova for pagina in self.iter_provas(query, ano, banca, max_pages, incremental) for prova in pagina]
 
-        with tqdm(total=max_pages, desc="Buscando páginas") as pbar:
+    def iter_provas(self, query, ano=None, banca=None, max_pages=10, incremental=False, pagina_inicial=1,
+                    ao_paginar=None):
+        """Gera as provas página a página, à medida que a busca avança.
+
+        ao_paginar(page) é chamado quando a página já foi toda consumida;
+        pagina_inicial permite continuar de onde uma execução anterior parou.
+        """
+        page = pagina_inicial
+        marca = self.catalogo.obter_marca(query, 'prova') if incremental else None
+        nova_marca = None
+        completa = parar = False
+
+        with tqdm(total=max_pages, initial=page - 1, desc="Buscando páginas",
+                  disable=not self.mostrar_progresso) as pbar:
             while page <= max_pages:
                 provas_page = self._get_provas_from_page(query, page)
                 if not provas_page:
+                    # None é erro de acesso; lista vazia é o fim da listagem
+                    completa = provas_page is not None
                     break
+
+                parar = False
+                if incremental:
+                    if page == 1:
+                        # A listagem vem do mais novo para o mais antigo: o 1º item da 1ª página é a nova marca
+                        nova_marca = provas_page[0]['url']
+                    provas_page, parar = self._pagina_incremental(query, 'prova', provas_page, page, marca)
+                else:
+                    self.catalogo.registrar_listagem(query, 'prova', provas_page, page)
                 
                 # Filtros
                 if ano:
@@ -43,33 +139,68 @@ class PCILeecher:
                 if banca:
                     provas_page = [p for p in provas_page if banca.lower() in p.get('banca', '').lower()]
                 
-                all_provas.extend(provas_page)
                 page += 1
                 pbar.update(1)
+                if provas_page:
+                    yield provas_page
+                if ao_paginar:
+                    ao_paginar(page - 1)
+
+                if parar:
+                    break
+
+        self._encerrar_varredura(query, 'prova', page - 1, completa, nova_marca if parar or completa else None)
+
+    def _encerrar_varredura(self, query, tipo, paginas, completa, nova_marca=None):
+        """Fim da paginação de um termo: registra a varredura e, se houver, a nova marca incremental.
+
+        A marca só deve ser passada quando a paginação terminou normalmente
+        (chegou à marca anterior, só achou itens conhecidos ou acabou a
+        listagem). Gravada antes disso, uma execução interrompida ou limitada
+        por max_pages faria a próxima parar cedo e pular os itens do meio.
+        """
+        if nova_marca:
+            self.catalogo.gravar_marca(query, tipo, nova_marca)
+        # Percorrida até o fim (ou até max_pages): a consulta local pode responder por este termo
+        self.catalogo.registrar_varredura(query, tipo, paginas, completa)
+
+    def _pagina_incremental(self, query, tipo, items_page, page, marca):
+        """Registra a página no catálogo e decide se a busca incremental pode parar.
 
-        return all_provas
+        Retorna os itens da página que ainda não foram baixados e se a
+        paginação deve parar: a página contém a marca da última execução ou
+        só tem itens já conhecidos.
+        """
+        urls = [item['url'] for item in items_page]
+        # Retrato do catálogo antes de registrar a página; depois dela todos os itens já seriam conhecidos
+        conhecidos = self.catalogo.conhecidos(urls)
+        self.catalogo.registrar_listagem(query, tipo, items_page, page)
+
+        pendentes = [item for item in items_page if conhecidos.get(item['url']) != 'baixado']
+        parar = marca in urls or all(url in conhecidos for url in urls)
+        return pendentes, parar
+
+    def _fetch_listing(self, url):
+        """Obtém o HTML de uma página de listagem, passando pelo cache quando habilitado"""
+        with self.metricas.medir('listagem'):
+            if self.cache:
+                return self.cache.get(self.http, url, headers=self.headers)
+
+            response = self.http.get(url, headers=self.headers)
+            response.raise_for_status()
+            return response.text
 
     def _get_provas_from_page(self, query, page):
         search_url = f"{self.base_url}/provas/{query}/{page}/"
         try:
-            response = self.session.get(search_url, headers=self.headers)
-            response.raise_for_status()
+            html = self._fetch_listing(search_url)
         except requests.exceptions.RequestException as e:
             logging.error(f"Erro ao acessar página {page}: {str(e)}")
-            return []
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        provas = []
-
-        for tr in soup.find_all('tr'):
-            try:
-                prova = self._extract_prova_info(tr)
-                if prova:
-                    provas.append(prova)
-            except Exception as e:
-                logging.error(f"Erro ao extrair informações da prova: {str(e)}")
-                continue
+            return None
 
+        with self.metricas.medir('parse', tipo='prova'):
+            provas = self.parser.extrair_provas(html)
+        self.metricas.incrementar('itens_listados_total', len(provas), tipo='prova')
         return provas
 
     def _extract_prova_info(self, tr):
@@ -91,8 +222,7 @@ class PCILeecher:
         }
 
     def download_prova(self, prova, pasta_destino):
-        if not os.path.exists(pasta_destino):
-            os.makedirs(pasta_destino)
+        self.escrita.garantir_pasta(pasta_destino)
 
         filename = f"{prova['nome']} ({prova['ano']}) - {prova['banca']}.pdf"
         filepath = os.path.join(pasta_destino, filename)
@@ -104,79 +234,221 @@ class PCILeecher:
                 return True
             
         try:
-            response = self.session.get(prova['url'], headers=self.headers, stream=True)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            
-            with open(filepath, 'wb') as f, tqdm(
-                desc=filename,
-                total=total_size,
-                unit='iB',
-                unit_scale=True
-            ) as pbar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        size = f.write(chunk)
-                        pbar.update(size)
-                        
+            self._baixar_arquivo(prova['url'], filepath, filename)
             return True
 
         except Exception as e:
+            # O .part fica no disco para a próxima tentativa continuar de onde parou
             logging.error(f"Erro ao baixar {filename}: {str(e)}")
-            if os.path.exists(filepath):
-                os.remove(filepath)  # Remove arquivo incompleto
             return False
 
-    def _verify_file_size(self, filepath):
-        """Verifica se o arquivo está completo comparando tamanho"""
+    def _baixar_arquivo(self, url, filepath, desc, tentativas=3, cancelamento=None, progresso=None):
+        """Baixa a URL em filepath.part, retomando com Range após falhas, e renomeia ao concluir.
+
+        cancelamento (threading.Event) é verificado entre os blocos e
+        interrompe com DownloadCancelado sem tocar no arquivo final;
+        progresso(bytes) é chamado a cada bloco gravado. Retorna (tamanho,
+        sha256) do arquivo final.
+        """
+        parcial = filepath + '.part'
+        registro = self.catalogo.obter(url)
+        validador = registro['validador'] if registro else None
+        ultimo_erro = None
+
+        for tentativa in range(tentativas):
+            if cancelamento is not None and cancelamento.is_set():
+                raise DownloadCancelado(url)
+            inicio = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+            # O Range se refere aos bytes do arquivo, não à versão comprimida
+            headers = dict(self.headers, **{'Accept-Encoding': 'identity'})
+            if inicio:
+                headers['Range'] = f"bytes={inicio}-"
+                if validador:
+                    # Se o arquivo mudou no servidor, If-Range faz ele devolver o conteúdo inteiro
+                    headers['If-Range'] = validador
+
+            recebidos = 0
+            try:
+                with self.metricas.medir('espera_ritmo'):
+                    self.ritmo.aguardar(url)
+                # A vaga de concorrência fica ocupada durante toda a transferência
+                with self.http.vaga() as vaga, self.metricas.medir('transferencia'):
+                    response = self.http.get(url, vaga=vaga, headers=headers, stream=True)
+
+                    if response.status_code == 416:
+                        # O .part não corresponde mais ao arquivo remoto: recomeça do zero
+                        response.close()
+                        os.remove(parcial)
+                        continue
+                    response.raise_for_status()
+
+                    if inicio and response.status_code != 206:
+                        inicio = 0
+
+                    total = self._tamanho_total(response, inicio)
+                    etag = response.headers.get('ETag', '')
+                    novo_validador = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+                    if novo_validador != validador or (registro and registro['tamanho_esperado'] != total):
+                        validador = novo_validador
+                        self.catalogo.registrar_validador(url, validador, total)
+
+                    sha256 = hashlib.sha256()
+                    if inicio:
+                        self._hash_prefixo(parcial, sha256)
+
+                    host = urlsplit(url).netloc
+                    bloco = self.escrita.bloco(host, total - inicio if total else None)
+                    inicio_transferencia = time.monotonic()
+                    with self.escrita.abrir(filepath, inicio, total, parcial) as f, tqdm(
+                        desc=desc,
+                        total=total,
+                        initial=inicio,
+                        unit='iB',
+                        unit_scale=True,
+                        leave=False,
+                        mininterval=0.5,
+                        disable=not self.mostrar_progresso
+                    ) as pbar:
+                        for chunk in response.iter_content(chunk_size=bloco):
+                            if cancelamento is not None and cancelamento.is_set():
+                                response.close()
+                                raise DownloadCancelado(url)
+                            if chunk:
+                                size = f.write(chunk)
+                                sha256.update(chunk)
+                                pbar.update(size)
+                                recebidos += size
+                                if progresso:
+                                    progresso(size)
+
+                        self.escrita.registrar_vazao(host, recebidos, time.monotonic() - inicio_transferencia)
+                        # Confere o tamanho, trunca a pré-alocação e renomeia para o nome final
+                        tamanho = f.concluir()
+                    return tamanho, sha256.hexdigest()
+
+            except (requests.exceptions.RequestException, IOError) as e:
+                ultimo_erro = e
+                logging.warning(f"Tentativa {tentativa + 1} de {tentativas} falhou para {desc}: {str(e)}")
+                if tentativa < tentativas - 1:
+                    self.http.pausa(tentativa)
+            finally:
+                self.metricas.incrementar('bytes_baixados_total', recebidos)
+
+        raise ultimo_erro or IOError(f"não foi possível baixar {url}")
+
+    def _tamanho_total(self, response, inicio):
+        """Tamanho final esperado do arquivo, a partir de Content-Range ou Content-Length"""
+        if response.status_code == 206:
+            content_range = response.headers.get('Content-Range', '')
+            total = content_range.rpartition('/')[2]
+            if total.isdigit():
+                return int(total)
+
+        # Com compressão o Content-Length não corresponde aos bytes gravados
+        if response.headers.get('Content-Encoding', 'identity') != 'identity':
+            return None
+
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit():
+            return int(content_length) + (inicio if response.status_code == 206 else 0)
+        return None
+
+    def _hash_prefixo(self, filepath, sha256):
+        with open(filepath, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(bloco)
+
+    def _verify_file_size(self, filepath, tamanho_esperado=None):
+        """Verifica se o arquivo está completo comparando tamanho e se tem cabeçalho e trailer de PDF"""
         try:
             size = os.path.getsize(filepath)
-            return size > 1024  # Maior que 1KB
-        except:
+        except OSError:
+            return False
+        if tamanho_esperado and size != tamanho_esperado:
             return False
+        # Uma página de erro HTML salva como .pdf passaria por qualquer limite de tamanho
+        return parece_pdf(filepath)
 
     def _clean_filename(self, filename):
         # Remove caracteres inválidos e limita tamanho
         clean = re.sub(r'[<>:"/\\|?*]', '', filename)
         return clean[:150]  # Limita tamanho para evitar problemas
 
-    def search_provas_e_gabaritos(self, query, ano=None, banca=None, download_gabaritos=True, max_pages=10):
+    def search_provas_e_gabaritos(self, query, ano=None, banca=None, download_gabaritos=True, max_pages=10,
+                                  incremental=False):
         """Busca provas e gabaritos com filtros"""
-        all_items = []
-        
+        return list(self.iter_provas_e_gabaritos(query, ano, banca, download_gabaritos, max_pages, incremental))
+
+    def iter_provas_e_gabaritos(self, query, ano=None, banca=None, download_gabaritos=True, max_pages=10,
+                                incremental=False, cursor=None, ao_paginar=None):
+        """Versão em streaming de search_provas_e_gabaritos: gera os itens à medida que as páginas chegam.
+
+        cursor ({'tipo': ..., 'pagina': n}) retoma depois da página n daquele
+        tipo; ao_paginar(tipo, page) é chamado a cada página consumida.
+        """
+        tipo_inicial = cursor['tipo'] if cursor else 'prova'
+        def pagina_inicial(tipo):
+            return cursor['pagina'] + 1 if cursor and cursor['tipo'] == tipo else 1
+        def paginar(tipo):
+            return (lambda page: ao_paginar(tipo, page)) if ao_paginar else None
+
         # Busca provas
-        provas = self.search_provas(query, ano, banca, max_pages)
-        for prova in provas:
-            prova['tipo'] = 'prova'
-            all_items.append(prova)
+        if tipo_inicial == 'prova':
+            for pagina in self.iter_provas(query, ano, banca, max_pages, incremental, pagina_inicial('prova'),
+                                           paginar('prova')):
+                for prova in pagina:
+                    prova['tipo'] = 'prova'
+                    yield prova
 
         # Busca gabaritos se solicitado
         if download_gabaritos:
-            gabaritos = self.search_gabaritos(query, ano, banca, max_pages)
-            for gabarito in gabaritos:
-                gabarito['tipo'] = 'gabarito'
-                all_items.append(gabarito)
+            for pagina in self.iter_gabaritos(query, ano, banca, max_pages, incremental, pagina_inicial('gabarito'),
+                                              paginar('gabarito')):
+                for gabarito in pagina:
+                    gabarito['tipo'] = 'gabarito'
+                    yield gabarito
 
-        return all_items
+    def _anos_do_item(self, item, anos):
+        return [int(ano) for ano in set(re.findall(r'\d{4}', item.get('ano') or '')) if int(ano) in anos]
 
-    def search_gabaritos(self, query, ano=None, banca=None, max_pages=10):
+    def search_gabaritos(self, query, ano=None, banca=None, max_pages=10, incremental=False):
         """Busca gabaritos especificamente"""
-        all_gabaritos = []
-        page = 1
+        return [gabarito for pagina in self.iter_gabaritos(query, ano, banca, max_pages, incremental)
+                for gabarito in pagina]
+
+    def iter_gabaritos(self, query, ano=None, banca=None, max_pages=10, incremental=False, pagina_inicial=1,
+                       ao_paginar=None):
+        """Gera os gabaritos página a página, à medida que a busca avança (parâmetros como em iter_provas)"""
+        page = pagina_inicial
+        marca = self.catalogo.obter_marca(query, 'gabarito') if incremental else None
+        nova_marca = None
+        completa = parar = False
 
-        with tqdm(total=max_pages, desc="Buscando gabaritos") as pbar:
+        with tqdm(total=max_pages, initial=page - 1, desc="Buscando gabaritos",
+                  disable=not self.mostrar_progresso) as pbar:
             while page <= max_pages:
                 search_url = f"{self.gabaritos_url}/{query}/{page}/"
                 try:
-                    response = self.session.get(search_url, headers=self.headers)
-                    response.raise_for_status()
+                    html = self._fetch_listing(search_url)
                     
-                    if "Nenhum gabarito encontrado" in response.text:
+                    if "Nenhum gabarito encontrado" in html:
+                        completa = True
                         break
 
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    gabaritos_page = self._extract_gabaritos(soup)
+                    with self.metricas.medir('parse', tipo='gabarito'):
+                        gabaritos_page = self.parser.extrair_gabaritos(html)
+                    self.metricas.incrementar('itens_listados_total', len(gabaritos_page), tipo='gabarito')
+                    if not gabaritos_page:
+                        completa = True
+
+                    parar = False
+                    if incremental and gabaritos_page:
+                        if page == 1:
+                            nova_marca = gabaritos_page[0]['url']
+                        gabaritos_page, parar = self._pagina_incremental(query, 'gabarito', gabaritos_page, page,
+                                                                         marca)
+                    elif gabaritos_page:
+                        self.catalogo.registrar_listagem(query, 'gabarito', gabaritos_page, page)
                     
                     # Aplicar filtros
                     if ano:
@@ -186,16 +458,33 @@ class PCILeecher:
                     
                     if not gabaritos_page:
                         break
-                        
-                    all_gabaritos.extend(gabaritos_page)
+
                     page += 1
                     pbar.update(1)
-                    
+                except requests.exceptions.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 404:
+                        completa = True
+                        break
+                    # Falha persistente depois das novas tentativas: pula só esta página
+                    logging.error(f"Erro ao buscar gabaritos página {page}: {str(e)}")
+                    page += 1
+                    pbar.update(1)
+                    continue
                 except Exception as e:
                     logging.error(f"Erro ao buscar gabaritos página {page}: {str(e)}")
+                    page += 1
+                    pbar.update(1)
+                    continue
+
+                # Entrega a página fora do try para não confundir erros do consumidor com os da busca
+                yield gabaritos_page
+                if ao_paginar:
+                    ao_paginar(page - 1)
+
+                if parar:
                     break
 
-        return all_gabaritos
+        self._encerrar_varredura(query, 'gabarito', page - 1, completa, nova_marca if parar or completa else None)
 
     def _extract_gabaritos(self, soup):
         """Extrai informações dos gabaritos da página"""
@@ -232,8 +521,18 @@ class PCILeecher:
                 
         return gabaritos
 
-    def download_item(self, item, pasta_destino):
+    def download_item(self, item, pasta_destino, cancelamento=None, progresso=None):
         """Download unificado para provas e gabaritos organizados por banca/concurso"""
+        tipo = item.get('tipo', 'prova')
+        with self.metricas.medir('download', tipo=tipo):
+            # A mesma URL nunca é baixada por duas threads ao mesmo tempo (o .part seria compartilhado)
+            with self._travas_url[hash(item['url']) % len(self._travas_url)]:
+                ok = self._download_item(item, pasta_destino, cancelamento, progresso)
+        if not ok:
+            self.metricas.incrementar('erros_total', fase='download', tipo=tipo)
+        return ok
+
+    def _download_item(self, item, pasta_destino, cancelamento=None, progresso=None):
         tipo = item.get('tipo', 'prova')
         banca = self._clean_filename(item['banca'])
         orgao = self._clean_filename(item['orgao'])
@@ -245,72 +544,301 @@ class PCILeecher:
         
         # Cria subpastas para provas e gabaritos dentro do concurso
         subpasta = os.path.join(pasta_concurso, tipo + 's')
-        
-        if not os.path.exists(subpasta):
-            os.makedirs(subpasta)
 
         filename = f"{item['nome']} ({item['ano']}).pdf"
         filepath = os.path.join(subpasta, filename)
 
+        # Consulta o catálogo antes de qualquer acesso à rede
+        registro = self.catalogo.obter(item['url'])
+        if registro and registro['status'] == 'baixado' and self._reaproveitar(registro, filepath):
+            logging.info(f"Arquivo já consta no catálogo: {filename}")
+            if registro['valido'] is None:
+                # Baixado antes da validação existir: confere agora, em segundo plano
+                caminho = filepath if os.path.exists(filepath) else registro['caminho']
+                self._validar(item, caminho, registro['sha256'], pasta_destino)
+            return True
+
+        self.escrita.garantir_pasta(subpasta)
+
         # Verifica se arquivo já existe
         if os.path.exists(filepath):
-            if self._verify_file_size(filepath):
+            tamanho_esperado = registro['tamanho_esperado'] if registro else None
+            if self._verify_file_size(filepath, tamanho_esperado):
                 logging.info(f"Arquivo já existe e está completo: {filename}")
+                sha256 = self._hash_arquivo(filepath)
+                self.armazem.incorporar(filepath, sha256)
+                self._update_concurso_index(item, filepath, os.path.getsize(filepath), sha256)
+                if not (registro and registro['valido'] and registro['sha256'] == sha256):
+                    self._validar(item, filepath, sha256, pasta_destino)
                 return True
             
         try:
-            response = self.session.get(item['url'], headers=self.headers, stream=True)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            
-            with open(filepath, 'wb') as f, tqdm(
-                desc=filename,
-                total=total_size,
-                unit='iB',
-                unit_scale=True
-            ) as pbar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        size = f.write(chunk)
-                        pbar.update(size)
-
-            # Cria arquivo de índice para o concurso
-            self._update_concurso_index(pasta_concurso, item)
+            tamanho, sha256 = self._baixar_arquivo(item['url'], filepath, filename,
+                                                   cancelamento=cancelamento, progresso=progresso)
+
+            # Conteúdo repetido vira hardlink para o blob já existente
+            self.armazem.incorporar(filepath, sha256)
+
+            # Registra o arquivo do concurso no catálogo
+            self._update_concurso_index(item, filepath, tamanho, sha256)
+            self._validar(item, filepath, sha256, pasta_destino)
                         
             return True
 
+        except DownloadCancelado:
+            raise
         except Exception as e:
+            # O .part fica no disco para a próxima tentativa continuar de onde parou
             logging.error(f"Erro ao baixar {filename}: {str(e)}")
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            self.catalogo.marcar_falha(item)
             return False
 
-    def _update_concurso_index(self, pasta_concurso, item):
-        """Cria/atualiza arquivo de índice com informações do concurso"""
-        index_file = os.path.join(pasta_concurso, "info.txt")
-        
-        info = {
-            'Órgão': item['orgao'],
-            'Banca': item['banca'],
-            'Ano': item['ano'],
-            'Nível': item.get('nivel', 'N/A')
-        }
-        
-        # Cria ou atualiza arquivo de índice
-        mode = 'a' if os.path.exists(index_file) else 'w'
-        with open(index_file, mode, encoding='utf-8') as f:
-            if mode == 'w':
-                f.write("=== Informações do Concurso ===\n\n")
-                for key, value in info.items():
-                    f.write(f"{key}: {value}\n")
-                f.write("\n=== Arquivos ===\n")
-            f.write(f"\n- [{item['tipo']}] {item['nome']}")
-
-    def download_all_by_year(self, ano_inicial=None, ano_final=None, banca=None, termos=None, max_pages=10):
-        """Baixa todas as provas e gabaritos por anos específicos"""
-        total_items = 0
-        
+    def _reaproveitar(self, registro, filepath):
+        """Atende um item já baixado a partir do catálogo/armazém, sem acessar a rede.
+
+        Só vale cópia com o tamanho registrado: com o fsync em lote, uma queda
+        de energia pode deixar truncado um arquivo que já tinha o nome final.
+        """
+        def integro(caminho):
+            try:
+                return registro['tamanho'] is None or os.path.getsize(caminho) == registro['tamanho']
+            except OSError:
+                return False
+
+        if registro['caminho'] == os.path.abspath(filepath) and integro(filepath):
+            return True
+
+        # Mesmo conteúdo pedido em outra pasta: basta um hardlink para o blob
+        if self.armazem.contem(registro['sha256']):
+            if not integro(self.armazem.caminho_blob(registro['sha256'])):
+                # Blob truncado: sai do armazém para não ser vinculado ao próximo download
+                self.armazem.descartar(registro['sha256'])
+            else:
+                if integro(filepath):
+                    return True
+                self.escrita.garantir_pasta(os.path.dirname(filepath))
+                if self.armazem.vincular(registro['sha256'], filepath):
+                    return True
+
+        return bool(registro['caminho']) and integro(registro['caminho'])
+
+    def download_items(self, items, pasta_destino, max_workers=None):
+        """Baixa vários itens em paralelo e retorna quantos foram baixados com sucesso"""
+        # Registra os itens de uma vez, para o download já encontrá-los no catálogo
+        self.catalogo.registrar_descobertos(items)
+        baixados = set()
+        self.download_stream(items, pasta_destino, max_workers, registrar=False, baixados=baixados)
+        return self.aguardar_validacao(baixados)
+
+    def download_stream(self, items, pasta_destino, max_workers=None, tamanho_fila=None, registrar=True,
+                        cancelamento=None, progresso=None, ao_concluir=None, baixados=None):
+        """Baixa os itens à medida que são gerados (ex.: iter_provas_e_gabaritos).
+
+        A busca roda na thread atual e alimenta uma fila limitada consumida
+        pelos workers, então os downloads começam logo na primeira página e a
+        memória não cresce com o número de páginas. Retorna quantos itens
+        foram baixados com sucesso.
+
+        A validação dos PDFs continua em segundo plano depois do retorno:
+        quem chama espera por ela uma vez, no fim de todo o trabalho, com
+        aguardar_validacao(baixados), e baixados (set) recebe as URLs
+        baixadas para a contagem final descontar os PDFs descartados.
+
+        Com cancelamento (threading.Event) ligado, a busca para, os itens
+        ainda na fila são descartados e os downloads em curso param no
+        próximo bloco. progresso(bytes) recebe cada bloco gravado e
+        ao_concluir(item, ok) é chamado ao fim de cada item.
+        """
+        workers = max_workers or self.max_workers
+        fila = queue.Queue(maxsize=tamanho_fila or workers * 2)
+        fim = object()
+        lock = threading.Lock()
+        baixados = set() if baixados is None else baixados
+        sucessos = 0
+
+        def consumir():
+            nonlocal sucessos
+            while True:
+                item = fila.get()
+                if item is fim:
+                    return
+                if cancelamento is not None and cancelamento.is_set():
+                    continue
+                try:
+                    if registrar:
+                        self.catalogo.registrar_descobertos([item])
+                    ok = self.download_item(item, pasta_destino, cancelamento, progresso)
+                except DownloadCancelado:
+                    continue
+                except Exception as e:
+                    logging.error(f"Erro ao baixar {item.get('nome')}: {str(e)}")
+                    ok = False
+                if ok:
+                    with lock:
+                        sucessos += 1
+                        baixados.add(item['url'])
+                if ao_concluir:
+                    ao_concluir(item, ok)
+
+        threads = [threading.Thread(target=consumir, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in items:
+                if cancelamento is not None and cancelamento.is_set():
+                    break
+                fila.put(item)
+        finally:
+            for _ in threads:
+                fila.put(fim)
+            for thread in threads:
+                thread.join()
+            # Fecha o último lote de fsync antes de devolver o controle
+            self.escrita.descarregar()
+
+        return sucessos
+
+    def _novos_no_periodo(self, items, anos, contagem, pasta_base):
+        """Filtra, sem acumular em memória, os itens do período ainda não entregues para pasta_base.
+
+        Itens já baixados (nesta ou em outra pasta) seguem mesmo assim:
+        download_item os atende pelo catálogo, com um hardlink e sem rede.
+        contagem só soma os que ainda não foram baixados.
+        """
+        anos = set(anos)
+        escopo = os.path.abspath(pasta_base)
+        for item in items:
+            if not self._anos_do_item(item, anos):
+                continue
+            # O mesmo item achado por vários termos vai para a fila uma vez só
+            if not self.dedup.reservar(item['url'], escopo):
+                continue
+            if not self.dedup.baixado(item['url']):
+                contagem[item['tipo']] += 1
+            yield item
+
+    def _update_concurso_index(self, item, filepath, tamanho, sha256):
+        """Registra no catálogo o arquivo baixado com os dados do concurso"""
+        with self.metricas.medir('catalogo'):
+            self.catalogo.marcar_baixado(item, os.path.abspath(filepath), tamanho, sha256)
+            self.dedup.registrar(item['url'])
+
+    def _validar(self, item, filepath, sha256, pasta_destino):
+        """Agenda a validação do PDF; sem validador, segue direto para o índice de texto"""
+        filepath = os.path.abspath(filepath)
+        if self.validador:
+            try:
+                self.validador.agendar(filepath, (item, filepath, sha256, pasta_destino), sha256)
+            except Exception as e:
+                # O download em si deu certo: sem validação agora, o PDF segue com valido NULL
+                logging.error(f"Erro ao agendar a validação de {filepath}: {str(e)}")
+        elif self.indice_texto:
+            self.indice_texto.agendar(filepath, sha256)
+
+    def _pdf_validado(self, contexto, resultado):
+        """Chamado pelo ValidadorPDF: registra o resultado e manda baixar de novo o que não é PDF"""
+        item, filepath, sha256, pasta_destino = contexto
+        self.catalogo.registrar_validacao(item['url'], resultado['valido'], resultado['paginas'], resultado['erro'])
+        if resultado['valido'] is None:
+            # Falha do pool, não do arquivo: fica como está e é conferido de novo quando for pedido outra vez
+            logging.warning(f"PDF não validado: {filepath} ({resultado['erro']})")
+            return
+        if resultado['valido']:
+            if self.indice_texto:
+                self.indice_texto.agendar(filepath, sha256)
+            return
+
+        logging.warning(f"PDF inválido, descartado: {filepath} ({resultado['erro']})")
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        if sha256:
+            self.armazem.descartar(sha256)
+        self.catalogo.marcar_falha(item)
+        self.catalogo.remover_normalizada(item['url'])
+
+        with self._lock_refazer:
+            tentativas = self._tentativas_validacao.get(item['url'], 0) + 1
+            self._tentativas_validacao[item['url']] = tentativas
+            if tentativas > self.MAX_REVALIDACOES:
+                # O servidor insiste em devolver algo que não é PDF: fica como falha para a próxima execução
+                logging.error(f"Desistindo de {item['url']} após {tentativas - 1} downloads inválidos")
+                return
+            if self._refazer is None:
+                # Threads próprias: o novo download não ocupa os workers nem espera a fila da busca
+                self._refazer = ThreadPoolExecutor(max_workers=2)
+            futuro = self._refazer.submit(self.download_item, item, pasta_destino)
+            self._refazendo.add(futuro)
+        futuro.add_done_callback(self._refeito)
+
+    def _refeito(self, futuro):
+        with self._lock_refazer:
+            self._refazendo.discard(futuro)
+
+    def aguardar_validacao(self, baixados=None):
+        """Espera as validações pendentes e os downloads refeitos por causa delas.
+
+        Com baixados (as URLs coletadas por download_stream), retorna quantas
+        delas continuam baixadas depois da validação.
+        """
+        while self.validador:
+            self.validador.aguardar()
+            with self._lock_refazer:
+                refazendo = list(self._refazendo)
+            if not refazendo and not self.validador.pendentes:
+                break
+            # Cada download refeito agenda uma nova validação
+            for futuro in refazendo:
+                futuro.exception()
+        # Os downloads refeitos também entram no lote de fsync
+        self.escrita.descarregar()
+        if baixados is not None:
+            return self._confirmados(baixados)
+
+    def _confirmados(self, urls):
+        """Quantas das URLs baixadas seguem baixadas no catálogo depois da validação"""
+        with self._lock_refazer:
+            invalidadas = self._tentativas_validacao.keys() & urls
+        # Só as que já falharam na validação podem ter mudado de estado
+        perdidas = 0
+        for url in invalidadas:
+            registro = self.catalogo.obter(url)
+            if not registro or registro['status'] != 'baixado':
+                perdidas += 1
+        return len(urls) - perdidas
+
+    def _hash_arquivo(self, filepath):
+        sha256 = hashlib.sha256()
+        self._hash_prefixo(filepath, sha256)
+        return sha256.hexdigest()
+
+    def download_all_by_year(self, ano_inicial=None, ano_final=None, banca=None, termos=None, max_pages=10,
+                             incremental=False, download_gabaritos=True, pasta_base=None, interativo=True,
+                             estrutura=False, retomar=True, baixados=None):
+        """Baixa todas as provas e gabaritos por anos específicos.
+
+        Com incremental=True a paginação de cada termo para nos itens já
+        conhecidos, e os itens de execuções anteriores que ainda não foram
+        baixados são tentados de novo. Com interativo=False nenhuma pergunta
+        é feita: sem termos, usa TERMOS_PADRAO. Com estrutura=True os termos
+        são ignorados e o acervo é percorrido pelas categorias do próprio
+        site (ver enumeracao.EnumeradorSite).
+
+        Com retomar=True o progresso fica num checkpoint ao lado do catálogo
+        (ver checkpoint.Checkpoint): uma execução interrompida com os mesmos
+        parâmetros continua do termo e da página em que parou, começando
+        pelos itens que estavam em download.
+
+        A validação dos PDFs é esperada uma vez, no fim, e o total retornado
+        já desconta os descartados. Com baixados (set), quem chama fica com
+        essa espera (ex.: lote.py, que espera uma vez por todos os jobs) e o
+        set recebe as URLs para a contagem final.
+
+        Os itens reservados no dedup em memória não são esquecidos aqui:
+        jobs simultâneos do lote.py dividem esse conjunto. Entre execuções
+        seguidas no mesmo processo, quem chama usa dedup.iniciar_execucao()
+        (ver menu).
+        """
         # Define intervalo de anos
         ano_inicial = ano_inicial if ano_inicial else self.ano_atual
         ano_final = ano_final if ano_final else self.ano_minimo
@@ -320,17 +848,13 @@ class PCILeecher:
         ano_final = min(ano_inicial, ano_final)
         
         # Lista de termos padrão para busca
-        termos_padrao = [
-            "administracao", "direito", "contabilidade", "economia", 
-            "informatica", "ti", "medicina", "enfermagem", "engenharia",
-            "matematica", "portugues", "conhecimentos-gerais", "raciocinio-logico",
-            # Adiciona mais termos comuns
-            "tecnico", "analista", "auditor", "fiscal", "professor",
-            "policia", "agente", "oficial", "assistente", "superior",
-            "medio", "fundamental", "especialista", "gestor", "perito"
-        ]
-
-        if termos is None:  # Se não foi passado como parâmetro
+        termos_padrao = self.TERMOS_PADRAO
+
+        if estrutura:
+            termos = []
+        elif termos is None and not interativo:
+            termos = termos_padrao
+        elif termos is None:  # Se não foi passado como parâmetro
             print("\nOpções de busca:")
             print("1. Baixar todo o conteúdo sem filtros")
             print("2. Usar termos de busca padrão")
@@ -352,69 +876,162 @@ class PCILeecher:
                 termos = termos_padrao
                 
         print(f"\nIniciando download de {ano_inicial} até {ano_final}")
-        print(f"Usando {len(termos)} termos de busca")
+        if estrutura:
+            print("Percorrendo as categorias do site (bancas, órgãos...)")
+        else:
+            print(f"Usando {len(termos)} termos de busca")
 
         # Cria pasta base única para todo o download
-        pasta_base = os.path.join(os.getcwd(), f"downloads_completo")
+        pasta_base = pasta_base or os.path.join(os.getcwd(), f"downloads_completo")
         
-        # Itera sobre os anos
-        for ano in range(ano_inicial, ano_final - 1, -1):
-            print(f"\n=== Buscando conteúdo do ano {ano} ===")
-            
-            # Dicionário para controlar arquivos já baixados
-            arquivos_baixados = set()
-            
-            for termo in termos:
-                print(f"\nBuscando termo: {termo}")
-                
-                # Busca provas e gabaritos
-                items = self.search_provas_e_gabaritos(termo, str(ano), banca, True, max_pages)
-                
-                if not items:
-                    continue
-                
-                # Filtra itens já baixados
-                items_novos = []
-                for item in items:
-                    identificador = f"{item['nome']}_{item['ano']}_{item['banca']}"
-                    if identificador not in arquivos_baixados:
-                        items_novos.append(item)
-                        arquivos_baixados.add(identificador)
-                
-                if not items_novos:
-                    continue
-                    
-                provas = [i for i in items_novos if i['tipo'] == 'prova']
-                gabaritos = [i for i in items_novos if i['tipo'] == 'gabarito']
-                
-                print(f"Encontrados novos arquivos para {termo} em {ano}:")
-                print(f"- {len(provas)} provas")
-                print(f"- {len(gabaritos)} gabaritos")
-                
-                # Agrupa itens por banca
-                items_por_banca = {}
-                for item in items_novos:
-                    banca_nome = item['banca']
-                    if banca_nome not in items_por_banca:
-                        items_por_banca[banca_nome] = []
-                    items_por_banca[banca_nome].append(item)
-                
-                # Download por banca
-                for banca_nome, banca_items in items_por_banca.items():
-                    print(f"\nBaixando arquivos da banca {banca_nome} - Ano {ano}")
-                    for item in banca_items:
-                        if self.download_item(item, pasta_base):
-                            total_items += 1
-                        time.sleep(0.5)
-                
-                # Pequena pausa entre termos
-                time.sleep(1)
-                    
+        anos = list(range(ano_inicial, ano_final - 1, -1))
+
+        checkpoint = None
+        if retomar:
+            checkpoint = self._checkpoint({
+                'anos': [ano_inicial, ano_final], 'banca': banca, 'termos': termos, 'max_pages': max_pages,
+                'incremental': incremental, 'gabaritos': download_gabaritos, 'pasta_base': pasta_base,
+                'estrutura': estrutura
+            })
+        aguardar = baixados is None
+        baixados = set() if aguardar else baixados
+        try:
+            total_items = self._executar_periodo(anos, banca, termos, max_pages, incremental, download_gabaritos,
+                                                 pasta_base, estrutura, checkpoint, baixados)
+        finally:
+            if checkpoint:
+                checkpoint.salvar()
+        if aguardar:
+            total_items = self.aguardar_validacao(baixados)
+
+        # Chegou ao fim: a próxima execução com os mesmos parâmetros começa do zero
+        if checkpoint:
+            checkpoint.remover()
+        self.dedup.salvar()
+        return total_items
+
+    def _checkpoint(self, parametros):
+        # Um arquivo por combinação de parâmetros: jobs simultâneos do lote.py não se sobrepõem
+        assinatura = hashlib.sha1(json.dumps(parametros, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        return Checkpoint(f"{self.catalogo.caminho}.checkpoint-{assinatura}.json", parametros)
+
+    def _entregues(self, items, checkpoint):
+        """Registra no checkpoint cada item antes de ele seguir para a fila de download"""
+        for item in items:
+            checkpoint.entregue(item)
+            yield item
+
+    def _executar_periodo(self, anos, banca, termos, max_pages, incremental, download_gabaritos, pasta_base,
+                          estrutura, checkpoint, baixados):
+        total_items = 0
+        ano_inicial, ano_final = anos[0], anos[-1]
+        ao_concluir = checkpoint.resolvido if checkpoint else None
+
+        def entregar(items):
+            return self._entregues(items, checkpoint) if checkpoint else items
+
+        escopo = os.path.abspath(pasta_base)
+
+        if checkpoint and checkpoint.retomado:
+            pendentes = []
+            for item in checkpoint.itens_pendentes():
+                # Os que terminaram depois da última gravação do checkpoint saem do catálogo, sem rede
+                if self.dedup.reservar(item['url'], escopo):
+                    pendentes.append(item)
+                else:
+                    checkpoint.resolvido(item)
+            print(f"\nRetomando execução interrompida: {len(checkpoint.concluidos)} etapas concluídas, "
+                  f"{len(pendentes)} itens em andamento")
+            if pendentes:
+                total_items += self.download_stream(pendentes, pasta_base, ao_concluir=ao_concluir,
+                                                    baixados=baixados)
+
+        if incremental:
+            pendentes = self.catalogo.pendentes()
+            if banca:
+                pendentes = [i for i in pendentes if banca.lower() in (i['banca'] or '').lower()]
+            periodo = set(anos)
+            pendentes = [i for i in pendentes
+                         if self._anos_do_item(i, periodo) and self.dedup.reservar(i['url'], escopo)]
+            if pendentes:
+                print(f"\nRetomando {len(pendentes)} itens pendentes de execuções anteriores")
+                # Já estão no catálogo: não precisam ser registrados de novo
+                total_items += self.download_stream(pendentes, pasta_base, registrar=False, baixados=baixados)
+
+        if estrutura and not (checkpoint and checkpoint.concluido('estrutura')):
+            enumerador = EnumeradorSite(self)
+            contagem = {'prova': 0, 'gabarito': 0}
+            cursor = checkpoint.cursor_de('estrutura') if checkpoint else None
+            ao_paginar = (lambda estado: checkpoint.avancar('estrutura', estado=estado)) if checkpoint else None
+            items = enumerador.iter_itens(download_gabaritos, cursor and cursor['estado'], ao_paginar)
+            if banca:
+                items = (i for i in items if banca.lower() in i.get('banca', '').lower())
+            items = self._novos_no_periodo(items, anos, contagem, pasta_base)
+            sucessos = self.download_stream(entregar(items), pasta_base, ao_concluir=ao_concluir,
+                                            baixados=baixados)
+            total_items += sucessos
+            if checkpoint:
+                checkpoint.concluir('estrutura')
+
+            print(f"\n{len(enumerador.categorias['prova']) + len(enumerador.categorias['gabarito'])} categorias "
+                  f"e {enumerador.paginas_buscadas} páginas percorridas")
+            print(f"Novos arquivos entre {ano_final} e {ano_inicial}:")
+            print(f"- {contagem['prova']} provas")
+            print(f"- {contagem['gabarito']} gabaritos")
+            print(f"- {sucessos} baixados com sucesso")
+
+        # A listagem do site não depende do ano: cada termo é buscado uma única
+        # vez e os itens são filtrados pelo intervalo de anos localmente, já
+        # seguindo para os downloads enquanto as páginas seguintes são buscadas
+        for termo in termos:
+            if checkpoint and checkpoint.concluido(termo):
+                continue
+            print(f"\nBuscando termo: {termo}")
+
+            contagem = {'prova': 0, 'gabarito': 0}
+            cursor = checkpoint.cursor_de(termo) if checkpoint else None
+            ao_paginar = (lambda tipo, page, termo=termo: checkpoint.avancar(termo, tipo=tipo, pagina=page)) \
+                if checkpoint else None
+            items = self.iter_provas_e_gabaritos(termo, None, banca, download_gabaritos, max_pages, incremental,
+                                                 cursor, ao_paginar)
+            items = self._novos_no_periodo(items, anos, contagem, pasta_base)
+            sucessos = self.download_stream(entregar(items), pasta_base, ao_concluir=ao_concluir,
+                                            baixados=baixados)
+            total_items += sucessos
+            if checkpoint:
+                checkpoint.concluir(termo)
+
+            if contagem['prova'] or contagem['gabarito']:
+                print(f"Novos arquivos para {termo} entre {ano_final} e {ano_inicial}:")
+                print(f"- {contagem['prova']} provas")
+                print(f"- {contagem['gabarito']} gabaritos")
+                print(f"- {sucessos} baixados com sucesso")
+
         return total_items
 
 def main():
-    leecher = PCILeecher()
-    
+    # PCILEECHER_METRICAS_PORTA=9108 expõe /metrics em localhost durante a execução
+    porta = os.getenv('PCILEECHER_METRICAS_PORTA')
+    # PCILEECHER_INDICE_TEXTO=pcileecher_texto.db indexa o texto de cada PDF baixado (ver indice_texto.py)
+    leecher = PCILeecher(porta_metricas=int(porta) if porta else None,
+                         indice_texto_path=os.getenv('PCILEECHER_INDICE_TEXTO'))
+    # PCILEECHER_PERFIL=perfil grava pilhas amostradas por fase nesse diretório
+    pasta_perfil = os.getenv('PCILEECHER_PERFIL')
+    perfilador = Perfilador(leecher.metricas, pasta_perfil).iniciar() if pasta_perfil else None
+    try:
+        menu(leecher)
+    finally:
+        if perfilador:
+            perfilador.parar()
+            print(f"Perfil salvo em: {pasta_perfil}/")
+        if leecher.validador:
+            leecher.validador.fechar()
+        if leecher.indice_texto:
+            leecher.indice_texto.fechar()
+        leecher.metricas.gravar_resumo('pcileecher_metricas.json')
+        print("Resumo de métricas salvo em: pcileecher_metricas.json")
+
+def menu(leecher):
     while True:
         print("\n=== PCI Leecher (Python Version) ===")
         print("\nOpções:")
@@ -430,6 +1047,8 @@ def main():
             break
             
         elif opcao in ["1", "2", "3"]:
+            # Uma operação por vez: os itens que falharam na anterior podem ser tentados de novo
+            leecher.dedup.iniciar_execucao()
             try:
                 if opcao == "1":
                     # Código existente para busca específica
@@ -442,45 +1061,37 @@ def main():
                     banca = input("Filtrar por banca (opcional, Enter para pular): ").strip()
                     baixar_gabaritos = input("Baixar gabaritos também? (s/n): ").strip().lower() == 's'
 
+                    # Pasta base com timestamp
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    pasta_destino = os.path.join(os.getcwd(), f"downloads_{timestamp}")
+
                     print("\nIniciando busca...")
-                    items = leecher.search_provas_e_gabaritos(query, ano, banca, baixar_gabaritos)
-                    
-                    if not items:
+                    print(f"Baixando arquivos para: {pasta_destino}")
+                    print("Os arquivos serão organizados por: banca/orgao_ano/[provas|gabaritos]/")
+
+                    # Os downloads começam enquanto as próximas páginas ainda estão sendo buscadas
+                    contagem = {'prova': 0, 'gabarito': 0}
+
+                    def contar(items):
+                        for item in items:
+                            contagem[item['tipo']] += 1
+                            yield item
+
+                    items = leecher.iter_provas_e_gabaritos(query, ano, banca, baixar_gabaritos)
+                    baixados = set()
+                    leecher.download_stream(contar(items), pasta_destino, baixados=baixados)
+                    sucessos = leecher.aguardar_validacao(baixados)
+                    total = contagem['prova'] + contagem['gabarito']
+
+                    if not total:
                         print("\nNenhum item encontrado!")
                         return
 
-                    provas = [i for i in items if i['tipo'] == 'prova']
-                    gabaritos = [i for i in items if i['tipo'] == 'gabarito']
-                    
                     print(f"\nEncontrados:")
-                    print(f"- {len(provas)} provas")
-                    print(f"- {len(gabaritos)} gabaritos")
-                    
-                    # Pasta base com timestamp
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    pasta_destino = os.path.join(os.getcwd(), f"downloads_{timestamp}")
-                    
-                    print(f"\nBaixando arquivos para: {pasta_destino}")
-                    print("Os arquivos serão organizados por: banca/orgao_ano/[provas|gabaritos]/")
-                    
-                    # Agrupa itens por banca para melhor organização
-                    items_por_banca = {}
-                    for item in items:
-                        banca = item['banca']
-                        if banca not in items_por_banca:
-                            items_por_banca[banca] = []
-                        items_por_banca[banca].append(item)
-                    
-                    # Download por banca
-                    sucessos = 0
-                    for banca, banca_items in items_por_banca.items():
-                        print(f"\nBaixando arquivos da banca: {banca}")
-                        for item in banca_items:
-                            if leecher.download_item(item, pasta_destino):
-                                sucessos += 1
-                            time.sleep(0.5)
-
-                    print(f"\nDownload concluído! {sucessos} de {len(items)} arquivos baixados com sucesso!")
+                    print(f"- {contagem['prova']} provas")
+                    print(f"- {contagem['gabarito']} gabaritos")
+
+                    print(f"\nDownload concluído! {sucessos} de {total} arquivos baixados com sucesso!")
                     print(f"Log de erros disponível em: pcileecher.log")
                 
                 elif opcao == "2":
@@ -494,7 +1105,8 @@ def main():
                     if input("\nDeseja continuar? (s/n): ").strip().lower() != 's':
                         return
                         
-                    total_items = leecher.download_all_by_year(banca=banca)
+                    # Percorre as categorias do site: cada página de listagem é buscada uma única vez
+                    total_items = leecher.download_all_by_year(banca=banca, estrutura=True)
                     
                     print(f"\nDownload completo concluído!")
                     print(f"Total de arquivos baixados: {total_items}")
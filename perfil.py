@@ -0,0 +1,137 @@
+"""Perfilador por amostragem para crawls longos.
+
+Uma thread em segundo plano lê as pilhas de todas as threads a cada
+`intervalo` segundos (sys._current_frames) e atribui cada amostra à fase em
+andamento naquela thread, segundo as medições de metricas.Metricas:
+listagem (busca), parse, download/transferencia/espera_* (download) e
+catalogo (índice). Como nada é instrumentado função a função, o custo fica
+em uma leitura de pilhas por intervalo e pode ficar ligado em produção.
+
+Ao parar, grava no diretório escolhido:
+    <fase>.folded   pilhas no formato do stackcollapse (flamegraph.pl, speedscope)
+    <fase>.txt      funções com mais amostras (próprias e acumuladas)
+    todas.folded    todas as fases, com a fase como raiz da pilha
+    resumo.json     amostras por fase, tempo de parede e tempo de CPU do processo
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+SEM_FASE = 'outros'
+
+
+class Perfilador:
+    """Amostra as pilhas de todas as threads e agrupa por fase do crawl"""
+
+    def __init__(self, metricas, diretorio='perfil', intervalo=0.01, profundidade=64, incluir_ociosas=False):
+        self.metricas = metricas
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        self.profundidade = profundidade
+        # Threads fora de qualquer fase (ex.: workers esperando a fila) só entram se pedido
+        self.incluir_ociosas = incluir_ociosas
+        self.pilhas = defaultdict(Counter)
+        self.amostras = 0
+        self._rotulos = {}
+        self._parar = threading.Event()
+        self._thread = None
+        self._inicio = None
+        self._cpu_inicio = None
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._cpu_inicio = time.process_time()
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._amostrar, name='perfilador', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        self.gravar()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                fase = self.metricas.fase_da_thread(ident)
+                if fase is None:
+                    if not self.incluir_ociosas:
+                        continue
+                    fase = SEM_FASE
+                self.pilhas[fase][self._pilha(frame)] += 1
+            self.amostras += 1
+
+    def _pilha(self, frame):
+        """Pilha da raiz para a folha, no formato 'a;b;c' do stackcollapse"""
+        nomes = []
+        while frame is not None and len(nomes) < self.profundidade:
+            nomes.append(self._rotulo(frame.f_code))
+            frame = frame.f_back
+        return ';'.join(reversed(nomes))
+
+    def _rotulo(self, code):
+        rotulo = self._rotulos.get(code)
+        if rotulo is None:
+            rotulo = self._rotulos[code] = \
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return rotulo
+
+    def funcoes(self, fase):
+        """(próprias, acumuladas): amostras com a função na folha e em qualquer ponto da pilha"""
+        proprias, acumuladas = Counter(), Counter()
+        for pilha, quantidade in self.pilhas[fase].items():
+            nomes = pilha.split(';')
+            proprias[nomes[-1]] += quantidade
+            for nome in set(nomes):
+                acumuladas[nome] += quantidade
+        return proprias, acumuladas
+
+    def resumo(self):
+        parede = time.perf_counter() - self._inicio if self._inicio is not None else 0.0
+        cpu = time.process_time() - self._cpu_inicio if self._cpu_inicio is not None else 0.0
+        return {
+            'intervalo_s': self.intervalo,
+            'parede_s': round(parede, 2),
+            'cpu_processo_s': round(cpu, 2),
+            'rodadas': self.amostras,
+            'fases': {fase: sum(pilhas.values()) for fase, pilhas in sorted(self.pilhas.items())}
+        }
+
+    def gravar(self, top=40):
+        os.makedirs(self.diretorio, exist_ok=True)
+
+        with open(os.path.join(self.diretorio, 'todas.folded'), 'w', encoding='utf-8') as todas:
+            for fase, pilhas in sorted(self.pilhas.items()):
+                with open(os.path.join(self.diretorio, f"{fase}.folded"), 'w', encoding='utf-8') as f:
+                    for pilha, quantidade in pilhas.most_common():
+                        f.write(f"{pilha} {quantidade}\n")
+                        todas.write(f"{fase};{pilha} {quantidade}\n")
+
+                total = sum(pilhas.values())
+                proprias, acumuladas = self.funcoes(fase)
+                with open(os.path.join(self.diretorio, f"{fase}.txt"), 'w', encoding='utf-8') as f:
+                    f.write(f"Fase {fase}: {total} amostras (~{total * self.intervalo:.1f}s de thread)\n\n")
+                    f.write(f"{'próprias':>10}{'%':>7}{'acumuladas':>12}{'%':>7}  função\n")
+                    for nome, quantidade in proprias.most_common(top):
+                        f.write(f"{quantidade:>10}{quantidade / total * 100:>7.1f}"
+                                f"{acumuladas[nome]:>12}{acumuladas[nome] / total * 100:>7.1f}  {nome}\n")
+
+        with open(os.path.join(self.diretorio, 'resumo.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.resumo(), f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+        logging.info(f"Perfil gravado em {self.diretorio}")
@@ -10,9 +10,10 @@ import logging
 from dotenv import load_dotenv
 import json
 import sys
+from transporte import criar_sessao
 
 class QConcursosLeecher:
-    def __init__(self):
+    def __init__(self, pool_conexoes=10, http2=False):
         self.base_url = "https://www.qconcursos.com"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
@@ -20,7 +21,8 @@ class QConcursosLeecher:
             'Accept-Language': 'pt-BR,pt;q=0.8,en-US;q=0.5,en;q=0.3',
             'Connection': 'keep-alive',
         }
-        self.session = requests.Session()
+        # Pool configurável, keep-alive e respostas comprimidas; HTTP/2 opcional (httpx)
+        self.session = criar_sessao(pool=pool_conexoes, http2=http2)
         self.setup_logging()
         self.cancelar = False
         self.auth_headers = {}
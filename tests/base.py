@@ -0,0 +1,44 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+# Com um handler na raiz, o basicConfig do PCILeecher não cria pcileecher.log na pasta do projeto
+logging.getLogger().addHandler(logging.NullHandler())
+
+
+def item(url, ano='2020', tipo='prova', **extras):
+    return {'url': url, 'nome': url.rsplit('/', 1)[-1], 'ano': ano, 'banca': 'FGV', 'orgao': 'Orgao',
+            'nivel': '', 'tipo': tipo, **extras}
+
+
+class CasoComPasta(unittest.TestCase):
+    """Caso de teste com uma pasta temporária apagada no fim"""
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+
+    def caminho(self, *partes):
+        return os.path.join(self.pasta, *partes)
+
+    def criar_leecher(self, **opcoes):
+        from pcileecher import PCILeecher
+        padrao = dict(usar_cache=False, mostrar_progresso=False, validar_pdfs=False, intervalo_host=0,
+                      catalogo_path=self.caminho('catalogo.db'), armazem_dir=self.caminho('blobs'))
+        leecher = PCILeecher(**{**padrao, **opcoes})
+        self.addCleanup(leecher.catalogo.fechar)
+        return leecher
+
+
+def pdf_valido(identificador='teste', tamanho=2048):
+    """PDF de uma página, o mesmo servido pelo servidor local dos benchmarks"""
+    from types import SimpleNamespace
+    from servidor_local import ServidorLocal
+    return ServidorLocal.pdf_sintetico(SimpleNamespace(tamanho_pdf=tamanho), identificador)
@@ -0,0 +1,64 @@
+import hashlib
+import os
+import unittest
+
+from armazem import ArmazemConteudo
+from base import CasoComPasta, item
+from servidor_local import ServidorLocal
+
+
+class TestArmazemConteudo(CasoComPasta):
+
+    def setUp(self):
+        super().setUp()
+        self.armazem = ArmazemConteudo(self.caminho('blobs'))
+
+    def arquivo(self, nome, dados):
+        caminho = self.caminho(nome)
+        with open(caminho, 'wb') as f:
+            f.write(dados)
+        return caminho, hashlib.sha256(dados).hexdigest()
+
+    def test_conteudo_repetido_vira_hardlink(self):
+        a, sha256 = self.arquivo('a.pdf', b'mesmo conteudo')
+        b, _ = self.arquivo('b.pdf', b'mesmo conteudo')
+        self.assertTrue(self.armazem.incorporar(a, sha256))
+        self.assertTrue(self.armazem.incorporar(b, sha256))
+        self.assertTrue(os.path.samefile(a, b))
+        self.assertTrue(os.path.samefile(a, self.armazem.caminho_blob(sha256)))
+
+    def test_vincular_cria_a_copia_em_outra_pasta(self):
+        a, sha256 = self.arquivo('a.pdf', b'conteudo')
+        self.armazem.incorporar(a, sha256)
+        destino = self.caminho('b.pdf')
+        self.assertTrue(self.armazem.vincular(sha256, destino))
+        self.assertTrue(os.path.samefile(a, destino))
+        self.assertFalse(os.path.exists(destino + '.link'))
+
+    def test_descartar_mantem_as_pastas(self):
+        a, sha256 = self.arquivo('a.pdf', b'conteudo')
+        self.armazem.incorporar(a, sha256)
+        self.armazem.descartar(sha256)
+        self.assertFalse(self.armazem.contem(sha256))
+        self.assertTrue(os.path.exists(a))
+
+
+class TestDownloadComArmazem(CasoComPasta):
+    """URLs diferentes com o mesmo PDF ocupam o disco uma vez só"""
+
+    def test_mesmo_pdf_em_bancas_diferentes(self):
+        with ServidorLocal(tamanho_pdf=4096) as servidor:
+            leecher = self.criar_leecher()
+            a = item(f"{servidor.url}/provas/download/1")
+            b = item(f"{servidor.url}/provas/download/1?copia=1", banca='Cebraspe')
+            self.assertTrue(leecher.download_item(a, self.pasta))
+            self.assertTrue(leecher.download_item(b, self.pasta))
+
+        caminho_a = leecher.catalogo.obter(a['url'])['caminho']
+        caminho_b = leecher.catalogo.obter(b['url'])['caminho']
+        self.assertNotEqual(os.path.dirname(caminho_a), os.path.dirname(caminho_b))
+        self.assertTrue(os.path.samefile(caminho_a, caminho_b))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import unittest
+
+from base import CasoComPasta, item
+from checkpoint import Checkpoint
+from servidor_local import ServidorLocal
+
+
+class TestCheckpoint(CasoComPasta):
+
+    def test_estado_volta_com_os_mesmos_parametros(self):
+        caminho = self.caminho('cp.json')
+        checkpoint = Checkpoint(caminho, {'termos': ['a', 'b']})
+        checkpoint.concluir('a')
+        checkpoint.avancar('b', tipo='prova', pagina=2)
+        checkpoint.entregue(item('u/1'))
+        checkpoint.entregue(item('u/2'))
+        checkpoint.resolvido(item('u/1'))
+        checkpoint.salvar()
+
+        retomado = Checkpoint(caminho, {'termos': ['a', 'b']})
+        self.assertTrue(retomado.retomado)
+        self.assertTrue(retomado.concluido('a'))
+        self.assertEqual(retomado.cursor_de('b'), {'etapa': 'b', 'tipo': 'prova', 'pagina': 2})
+        self.assertEqual([i['url'] for i in retomado.itens_pendentes()], ['u/2'])
+
+        self.assertFalse(Checkpoint(caminho, {'termos': ['c']}).retomado)
+
+    def test_arquivo_ilegivel_comeca_do_zero(self):
+        caminho = self.caminho('cp.json')
+        with open(caminho, 'w') as f:
+            f.write('{"versao": 1, ')
+        checkpoint = Checkpoint(caminho, {})
+        self.assertFalse(checkpoint.retomado)
+        self.assertEqual(checkpoint.itens_pendentes(), [])
+
+
+class TestRetomadaDoPeriodo(CasoComPasta):
+    """download_all_by_year(retomar=True) continua do termo e da página salvos"""
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorLocal(tamanho_pdf=4096).iniciar()
+        self.addCleanup(self.servidor.parar)
+        self.leecher = self.criar_leecher()
+        self.buscadas = []
+        self.falhar_em = None
+
+        def iter_provas_e_gabaritos(termo, ano, banca, gabaritos, max_pages, incremental, cursor=None,
+                                    ao_paginar=None):
+            for pagina in range(cursor['pagina'] + 1 if cursor else 1, 4):
+                if (termo, pagina) == self.falhar_em:
+                    raise KeyboardInterrupt
+                self.buscadas.append((termo, pagina))
+                for i in range(2):
+                    yield item(f"{self.servidor.url}/provas/download/{termo}-{pagina}-{i}")
+                if ao_paginar:
+                    ao_paginar('prova', pagina)
+        self.leecher.iter_provas_e_gabaritos = iter_provas_e_gabaritos
+
+    def baixar(self):
+        return self.leecher.download_all_by_year(2020, 2020, None, ['a', 'b'], download_gabaritos=False,
+                                                 pasta_base=self.caminho('saida'), interativo=False, retomar=True)
+
+    def checkpoint(self):
+        return self.leecher._checkpoint({
+            'anos': [2020, 2020], 'banca': None, 'termos': ['a', 'b'], 'max_pages': 10, 'incremental': False,
+            'gabaritos': False, 'pasta_base': self.caminho('saida'), 'estrutura': False
+        })
+
+    def test_replay_de_checkpoint_salvo(self):
+        checkpoint = self.checkpoint()
+        checkpoint.concluir('a')
+        checkpoint.avancar('b', tipo='prova', pagina=1)
+        checkpoint.entregue(item(f"{self.servidor.url}/provas/download/pendente"))
+        checkpoint.salvar()
+
+        # O pendente e as páginas 2 e 3 de 'b'; 'a' e a página 1 de 'b' não são refeitos
+        self.assertEqual(self.baixar(), 5)
+        self.assertEqual(self.buscadas, [('b', 2), ('b', 3)])
+        self.assertEqual(self.servidor.contadores['pdf'], 5)
+        self.assertFalse(os.path.exists(checkpoint.caminho))
+
+    def test_interrupcao_e_retomada(self):
+        self.falhar_em = ('b', 2)
+        self.assertRaises(KeyboardInterrupt, self.baixar)
+        self.assertTrue(os.path.exists(self.checkpoint().caminho))
+
+        self.falhar_em = None
+        self.buscadas = []
+        self.baixar()
+        self.assertEqual(self.buscadas, [('b', 2), ('b', 3)])
+        # Cada PDF veio da rede uma única vez somando as duas execuções
+        self.assertEqual(self.servidor.contadores['pdf'], 12)
+        self.assertFalse(os.path.exists(self.checkpoint().caminho))
+
+
+if __name__ == '__main__':
+    unittest.main()
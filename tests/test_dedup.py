@@ -0,0 +1,121 @@
+import os
+import unittest
+from collections import Counter
+
+from base import CasoComPasta, item
+from catalogo import Catalogo
+from dedup import FiltroBloom, IndiceDedup, normalizar_url
+from servidor_local import ServidorLocal
+
+
+class MetricasFalsas:
+    def __init__(self):
+        self.contagem = Counter()
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        self.contagem[rotulos.get('resultado')] += valor
+
+
+class TestNormalizarUrl(unittest.TestCase):
+
+    def test_variacoes_da_mesma_url(self):
+        chave = normalizar_url('https://www.pciconcursos.com.br/provas/download/x')
+        for url in ('http://pciconcursos.com.br/provas/download/x/',
+                    'https://WWW.PCICONCURSOS.COM.BR:443/provas//download/x',
+                    'https://www.pciconcursos.com.br/provas/download/x?utm_source=a#topo'):
+            self.assertEqual(normalizar_url(url), chave)
+        self.assertNotEqual(normalizar_url('https://pciconcursos.com.br/provas/download/x?id=2'), chave)
+
+
+class TestFiltroBloom(CasoComPasta):
+
+    def test_sem_falso_negativo_e_persistencia(self):
+        filtro = FiltroBloom(capacidade=1000, taxa_erro=0.01)
+        chaves = [f"pci/{i}" for i in range(1000)]
+        for chave in chaves:
+            filtro.adicionar(chave)
+        caminho = self.caminho('filtro.bloom')
+        filtro.salvar(caminho)
+        carregado = FiltroBloom.carregar(caminho)
+        self.assertTrue(all(chave in carregado for chave in chaves))
+        self.assertEqual(carregado.itens, 1000)
+
+    def test_arquivo_corrompido(self):
+        caminho = self.caminho('filtro.bloom')
+        with open(caminho, 'wb') as f:
+            f.write(b'lixo')
+        self.assertIsNone(FiltroBloom.carregar(caminho))
+
+
+class TestIndiceDedup(CasoComPasta):
+
+    def setUp(self):
+        super().setUp()
+        self.catalogo = Catalogo(self.caminho('catalogo.db'))
+        self.addCleanup(self.catalogo.fechar)
+        self.metricas = MetricasFalsas()
+        self.dedup = IndiceDedup(self.catalogo, self.caminho('catalogo.db.bloom'), capacidade=1000,
+                                 metricas=self.metricas)
+
+    def test_falso_positivo_confirmado_na_tabela_exata(self):
+        self.dedup.registrar('https://pci.com/a')
+        # Filtro saturado: toda chave parece "talvez vista"
+        self.dedup.filtro._dados = bytearray(b'\xff' * len(self.dedup.filtro._dados))
+        self.assertFalse(self.dedup.baixado('https://pci.com/b'))
+        self.assertTrue(self.dedup.baixado('https://www.pci.com/a/'))
+        self.assertEqual(self.metricas.contagem['falso_positivo'], 1)
+        self.assertEqual(self.metricas.contagem['baixado'], 1)
+
+    def test_reserva_por_destino(self):
+        self.assertTrue(self.dedup.reservar('https://pci.com/a', '/A'))
+        self.assertFalse(self.dedup.reservar('https://pci.com/a?utm_source=x', '/A'))
+        self.assertTrue(self.dedup.reservar('https://pci.com/a', '/B'))
+        self.dedup.iniciar_execucao()
+        self.assertTrue(self.dedup.reservar('https://pci.com/a', '/A'))
+
+    def test_filtro_salvo_desatualizado_e_reconstruido(self):
+        self.dedup.registrar('https://pci.com/a')
+        self.dedup.salvar()
+        self.dedup.registrar('https://pci.com/b')
+        # O arquivo tem um item a menos que a tabela: confiar nele daria falso negativo
+        reaberto = IndiceDedup(self.catalogo, self.caminho('catalogo.db.bloom'))
+        self.assertTrue(reaberto.baixado('https://pci.com/b'))
+
+
+class TestDedupEntreDestinos(CasoComPasta):
+    """O dedup evita baixar de novo, mas não deixa de entregar o item em outra pasta"""
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorLocal(tamanho_pdf=4096).iniciar()
+        self.addCleanup(self.servidor.parar)
+        self.leecher = self.criar_leecher()
+        self.items = [item(f"{self.servidor.url}/provas/download/{i}") for i in range(3)]
+        # Dois termos acham os mesmos itens
+        self.leecher.iter_provas_e_gabaritos = lambda *args, **kwargs: iter(self.items)
+
+    def baixar(self, pasta):
+        return self.leecher.download_all_by_year(2020, 2020, None, ['a', 'b'], download_gabaritos=False,
+                                                 pasta_base=self.caminho(pasta), interativo=False)
+
+    def pdfs(self, pasta):
+        return sorted(nome for _, _, nomes in os.walk(self.caminho(pasta)) for nome in nomes)
+
+    def test_segunda_pasta_recebe_os_itens_sem_rede(self):
+        self.assertEqual(self.baixar('A'), 3)
+        self.assertEqual(self.servidor.contadores['pdf'], 3)
+
+        self.assertEqual(self.baixar('B'), 3)
+        self.assertEqual(self.servidor.contadores['pdf'], 3)
+        self.assertEqual(self.pdfs('B'), self.pdfs('A'))
+        self.assertEqual(len(self.pdfs('B')), 3)
+
+    def test_mesmo_destino_depois_de_iniciar_execucao(self):
+        self.baixar('A')
+        self.leecher.dedup.iniciar_execucao()
+        self.assertEqual(self.baixar('A'), 3)
+        self.assertEqual(self.servidor.contadores['pdf'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
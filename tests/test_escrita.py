@@ -0,0 +1,78 @@
+import os
+import unittest
+
+from base import CasoComPasta, item
+from escrita import GravadorAtomico
+from servidor_local import ServidorLocal
+
+
+class TestGravadorAtomico(CasoComPasta):
+
+    def test_nome_final_so_depois_de_concluir(self):
+        destino = self.caminho('a', 'prova.pdf')
+        with GravadorAtomico().abrir(destino, total=10) as arquivo:
+            arquivo.write(b'12345')
+            self.assertFalse(os.path.exists(destino))
+            self.assertRaises(IOError, arquivo.concluir)
+        self.assertFalse(os.path.exists(destino))
+        # O espaço pré-alocado não conta como recebido
+        self.assertEqual(os.path.getsize(destino + '.part'), 5)
+
+    def test_retomada_continua_o_parcial(self):
+        destino = self.caminho('prova.pdf')
+        gravador = GravadorAtomico(sincronizar='arquivo')
+        with gravador.abrir(destino, total=10) as arquivo:
+            arquivo.write(b'12345')
+        with gravador.abrir(destino, inicio=5, total=10) as arquivo:
+            arquivo.write(b'67890')
+            self.assertEqual(arquivo.concluir(), 10)
+        with open(destino, 'rb') as f:
+            self.assertEqual(f.read(), b'1234567890')
+        self.assertFalse(os.path.exists(destino + '.part'))
+
+    def test_lote_sincroniza_em_descarregar(self):
+        gravador = GravadorAtomico(lote_fsync=100, intervalo_fsync=3600)
+        for i in range(3):
+            with gravador.abrir(self.caminho(f"{i}.pdf")) as arquivo:
+                arquivo.write(b'x')
+                arquivo.concluir()
+        self.assertEqual(gravador.descarregar(), 3)
+        self.assertEqual(gravador.descarregar(), 0)
+
+
+class TestReaproveitarConfereTamanho(CasoComPasta):
+    """Cópia truncada por uma queda antes do fsync em lote não é reaproveitada"""
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorLocal(tamanho_pdf=4096).iniciar()
+        self.addCleanup(self.servidor.parar)
+        self.leecher = self.criar_leecher()
+        self.item = item(f"{self.servidor.url}/provas/download/1")
+
+    def baixar(self, pasta):
+        self.assertTrue(self.leecher.download_item(self.item, self.caminho(pasta)))
+        registro = self.leecher.catalogo.obter(self.item['url'])
+        return os.path.join(self.caminho(pasta), 'FGV', 'Orgao_2020', 'provas', '1 (2020).pdf'), registro
+
+    def test_arquivo_truncado_e_baixado_de_novo(self):
+        caminho, registro = self.baixar('A')
+        # O blob do armazém é o mesmo inode: fica truncado junto
+        with open(caminho, 'r+b') as f:
+            f.truncate(100)
+
+        caminho_b, _ = self.baixar('B')
+        self.assertEqual(self.servidor.contadores['pdf'], 2)
+        self.assertEqual(os.path.getsize(caminho_b), registro['tamanho'])
+        blob = self.leecher.armazem.caminho_blob(registro['sha256'])
+        self.assertEqual(os.path.getsize(blob), registro['tamanho'])
+
+    def test_arquivo_integro_vira_hardlink(self):
+        caminho, _ = self.baixar('A')
+        caminho_b, _ = self.baixar('B')
+        self.assertEqual(self.servidor.contadores['pdf'], 1)
+        self.assertTrue(os.path.samefile(caminho, caminho_b))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from base import CasoComPasta, item
+
+
+class TestIncremental(CasoComPasta):
+    """Condição de parada da busca incremental e gravação da marca"""
+
+    def setUp(self):
+        super().setUp()
+        self.leecher = self.criar_leecher()
+        self.paginas = {p: [item(f"u/{p}-{i}") for i in range(3)] for p in range(1, 4)}
+        self.buscadas = []
+
+        def fetch(url):
+            page = int(url.rstrip('/').rsplit('/', 1)[1])
+            self.buscadas.append(page)
+            return str(page)
+        self.leecher._fetch_listing = fetch
+        self.leecher.parser.extrair_provas = lambda html: list(self.paginas.get(int(html), []))
+
+    def urls(self, **opcoes):
+        self.buscadas = []
+        return [i['url'] for p in self.leecher.iter_provas('termo', incremental=True, **opcoes) for i in p]
+
+    def test_catalogo_vazio_percorre_toda_a_listagem(self):
+        self.assertEqual(len(self.urls()), 9)
+        self.assertEqual(self.buscadas, [1, 2, 3, 4])
+        self.assertEqual(self.leecher.catalogo.obter_marca('termo', 'prova'), 'u/1-0')
+
+    def test_para_na_marca_anterior(self):
+        self.urls()
+        self.paginas[1].insert(0, item('u/novo'))
+        self.assertEqual(self.urls(), ['u/novo', 'u/1-0', 'u/1-1', 'u/1-2'])
+        self.assertEqual(self.buscadas, [1])
+        self.assertEqual(self.leecher.catalogo.obter_marca('termo', 'prova'), 'u/novo')
+
+    def test_limite_de_paginas_nao_grava_marca(self):
+        self.assertEqual(len(self.urls(max_pages=2)), 6)
+        self.assertIsNone(self.leecher.catalogo.obter_marca('termo', 'prova'))
+
+    def test_gabaritos_no_catalogo_vazio(self):
+        gabaritos = {p: f"g{p}" for p in range(1, 4)}
+
+        def fetch(url):
+            page = int(url.rstrip('/').rsplit('/', 1)[1])
+            return gabaritos.get(page, "Nenhum gabarito encontrado")
+        self.leecher._fetch_listing = fetch
+        self.leecher.parser.extrair_gabaritos = lambda html: [item(f"{html}-{i}", tipo='gabarito') for i in range(2)]
+        urls = [g['url'] for p in self.leecher.iter_gabaritos('termo', incremental=True) for g in p]
+        self.assertEqual(len(urls), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import signal
+import time
+import unittest
+
+from base import CasoComPasta, pdf_valido
+
+from indice_texto import IndiceTexto, consulta_fts
+
+
+class TestConsultaFTS(unittest.TestCase):
+
+    def test_frases_prefixos_e_operadores(self):
+        self.assertEqual(consulta_fts('"controle de" direito*'), '"controle de" "direito"*')
+        self.assertEqual(consulta_fts('OR penal NOT'), '"penal"')
+
+
+class TestIndiceTexto(CasoComPasta):
+
+    def setUp(self):
+        super().setUp()
+        self.indice = IndiceTexto(self.caminho('texto.db'), processos=1)
+        self.addCleanup(self.indice.fechar)
+
+    def gravar(self, nome, conteudo):
+        caminho = self.caminho(nome)
+        with open(caminho, 'wb') as f:
+            f.write(conteudo)
+        return caminho
+
+    def test_erro_de_extracao_e_tentado_de_novo(self):
+        caminho = self.gravar('a.pdf', b'%PDF-1.4 quebrado')
+        self.assertTrue(self.indice.agendar(caminho, 'sha-a'))
+        self.indice.aguardar()
+        self.assertEqual(self.indice.contar(), {'documentos': 1, 'erros': 1})
+
+        self.gravar('a.pdf', pdf_valido('alfa'))
+        self.assertTrue(self.indice.agendar(caminho, 'sha-a'))
+        self.indice.aguardar()
+        self.assertEqual(self.indice.contar(), {'documentos': 1, 'erros': 0})
+        self.assertEqual([r['sha256'] for r in self.indice.buscar('alfa')], ['sha-a'])
+        self.assertFalse(self.indice.agendar(caminho, 'sha-a'))
+
+    def test_processo_morto_nao_marca_os_pdfs_pendentes(self):
+        caminhos = [self.gravar(f"{i}.pdf", pdf_valido(f"doc{i}")) for i in range(3)]
+
+        # Ocupa o único processo e deixa os PDFs na fila para morrerem com ele
+        executor = self.indice._pool()
+        ocupado = executor.submit(time.sleep, 30)
+        for i, caminho in enumerate(caminhos):
+            self.assertTrue(self.indice.agendar(caminho, f"sha-{i}"))
+        while not executor._processes:
+            time.sleep(0.05)
+        time.sleep(0.5)
+        os.kill(next(iter(executor._processes)), signal.SIGKILL)
+        self.assertIsNotNone(ocupado.exception(timeout=30))
+
+        self.indice.aguardar()
+        self.assertEqual(self.indice.contar(), {'documentos': 3, 'erros': 0})
+        self.assertEqual(len(self.indice.buscar('prova')), 3)
+
+        # O pool foi recriado: novos PDFs seguem sendo indexados
+        self.assertTrue(self.indice.agendar(self.gravar('novo.pdf', pdf_valido('novo')), 'sha-novo'))
+        self.indice.aguardar()
+        self.assertEqual(len(self.indice.buscar('novo')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
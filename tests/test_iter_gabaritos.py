@@ -0,0 +1,54 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pcileecher import PCILeecher
+
+
+def _erro_http(status):
+    resposta = requests.Response()
+    resposta.status_code = status
+    return requests.exceptions.HTTPError(f"{status} Server Error", response=resposta)
+
+
+class TestIterGabaritos(unittest.TestCase):
+    """Erros HTTP em uma página de gabaritos não podem repetir nem quebrar a paginação"""
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.leecher = PCILeecher(usar_cache=False, mostrar_progresso=False, validar_pdfs=False,
+                                  catalogo_path=os.path.join(self.pasta, 'catalogo.db'),
+                                  armazem_dir=os.path.join(self.pasta, 'blobs'))
+        self.leecher.parser.extrair_gabaritos = lambda html: [
+            {'url': f"https://exemplo/{html}", 'nome': html, 'ano': '2020', 'banca': 'FGV'}
+        ]
+
+    def tearDown(self):
+        self.leecher.catalogo.fechar()
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+    def _paginas(self, respostas):
+        def fetch(url):
+            page = int(url.rstrip('/').rsplit('/', 1)[1])
+            resposta = respostas.get(page, "Nenhum gabarito encontrado")
+            if isinstance(resposta, Exception):
+                raise resposta
+            return resposta
+        self.leecher._fetch_listing = fetch
+        return [g['nome'] for pagina in self.leecher.iter_gabaritos('termo', max_pages=5) for g in pagina]
+
+    def test_erro_500_na_primeira_pagina(self):
+        self.assertEqual(self._paginas({1: _erro_http(500), 2: 'g/2'}), ['g/2'])
+
+    def test_erro_500_no_meio_nao_repete_pagina(self):
+        self.assertEqual(self._paginas({1: 'g/1', 2: _erro_http(500), 3: 'g/3'}), ['g/1', 'g/3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
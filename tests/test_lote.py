@@ -0,0 +1,70 @@
+import json
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from base import CasoComPasta, item
+from lote import carregar_jobs, executar_job
+from servidor_local import ServidorLocal
+
+
+class TestCarregarJobs(CasoComPasta):
+
+    def carregar(self, dados):
+        caminho = self.caminho('jobs.json')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(dados, f)
+        return carregar_jobs(caminho)
+
+    def test_padrao_e_nomes(self):
+        jobs = self.carregar({'padrao': {'max_pages': 3, 'saida': 'x'},
+                              'jobs': [{'query': 'ti'}, {'nome': 'fgv', 'saida': 'y'}]})
+        self.assertEqual([j['nome'] for j in jobs], ['job-1', 'fgv'])
+        self.assertEqual([j['saida'] for j in jobs], ['x', 'y'])
+        self.assertEqual(jobs[1]['max_pages'], 3)
+
+    def test_lista_sem_jobs(self):
+        self.assertEqual(len(self.carregar([{'query': 'ti'}])), 1)
+        self.assertRaises(ValueError, self.carregar, {'jobs': []})
+
+
+class TestExecutarJob(CasoComPasta):
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorLocal(tamanho_pdf=4096).iniciar()
+        self.addCleanup(self.servidor.parar)
+        self.leecher = self.criar_leecher()
+        self.items = [item(f"{self.servidor.url}/provas/download/{i}", banca=banca)
+                      for i, banca in enumerate(['FGV', 'FGV', 'Cebraspe'])]
+        self.chamadas = []
+
+        def iter_provas_e_gabaritos(termo, ano, banca, *args, **kwargs):
+            self.chamadas.append((termo, banca))
+            return (i for i in self.items if banca is None or i['banca'] == banca)
+        self.leecher.iter_provas_e_gabaritos = iter_provas_e_gabaritos
+
+    def job(self, saida, **campos):
+        return {'nome': saida, 'query': 'ti', 'ano': 2020, 'gabaritos': False, 'saida': self.caminho(saida),
+                **campos}
+
+    def test_uma_execucao_por_banca(self):
+        total = executar_job(self.leecher, self.job('A', bancas=['FGV', 'Cebraspe']))
+        self.assertEqual(self.chamadas, [('ti', 'FGV'), ('ti', 'Cebraspe')])
+        self.assertEqual(total, 3)
+
+    def test_jobs_simultaneos_em_saidas_diferentes(self):
+        baixados = [set(), set()]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            totais = list(executor.map(executar_job, [self.leecher] * 2, [self.job('A'), self.job('B')],
+                                       baixados))
+        self.assertEqual(totais, [3, 3])
+        self.assertEqual(self.leecher.aguardar_validacao(baixados[0]), 3)
+        # Cada PDF vem da rede uma vez; o outro job recebe hardlinks
+        self.assertEqual(self.servidor.contadores['pdf'], 3)
+        for saida in ('A', 'B'):
+            self.assertEqual(sum(len(nomes) for _, _, nomes in os.walk(self.caminho(saida))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
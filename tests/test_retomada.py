@@ -0,0 +1,53 @@
+import hashlib
+import os
+import unittest
+
+from base import CasoComPasta, item
+from servidor_local import ServidorLocal
+
+
+class TestRetomadaComRange(CasoComPasta):
+    """Retomada do .part com Range/If-Range contra o servidor local"""
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorLocal(tamanho_pdf=8192).iniciar()
+        self.addCleanup(self.servidor.parar)
+        self.leecher = self.criar_leecher()
+        self.item = item(f"{self.servidor.url}/provas/download/1")
+        self.corpo = self.servidor.pdf_sintetico('provas-1')
+        self.destino = self.caminho('prova.pdf')
+        self.leecher.catalogo.registrar_descobertos([self.item])
+
+    def parcial(self, dados, validador):
+        with open(self.destino + '.part', 'wb') as f:
+            f.write(dados)
+        self.leecher.catalogo.registrar_validador(self.item['url'], validador, len(self.corpo))
+
+    def baixar(self):
+        antes = self.servidor.contadores['bytes']
+        tamanho, sha256 = self.leecher._baixar_arquivo(self.item['url'], self.destino, 'prova')
+        with open(self.destino, 'rb') as f:
+            self.assertEqual(f.read(), self.corpo)
+        self.assertEqual((tamanho, sha256), (len(self.corpo), hashlib.sha256(self.corpo).hexdigest()))
+        self.assertFalse(os.path.exists(self.destino + '.part'))
+        return self.servidor.contadores['bytes'] - antes
+
+    def test_parcial_truncado_continua_de_onde_parou(self):
+        etag = '"' + hashlib.sha1(self.corpo).hexdigest() + '"'
+        self.parcial(self.corpo[:3000], etag)
+        self.assertEqual(self.baixar(), len(self.corpo) - 3000)
+
+    def test_if_range_diferente_recebe_o_arquivo_inteiro(self):
+        # O .part é de uma versão antiga: o servidor ignora o Range e responde 200
+        self.parcial(b'x' * 3000, '"versao-antiga"')
+        self.assertEqual(self.baixar(), len(self.corpo))
+
+    def test_parcial_maior_que_o_remoto_recomeca(self):
+        etag = '"' + hashlib.sha1(self.corpo).hexdigest() + '"'
+        self.parcial(self.corpo + b'lixo', etag)
+        self.assertEqual(self.baixar(), len(self.corpo))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+
+import requests
+
+import base  # noqa: F401  (caminho do projeto)
+from servidor_local import ServidorLocal
+from transporte import HAS_HTTP2, TIMEOUT_PADRAO, ControleAIMD, Requisitor, criar_sessao
+
+
+class Resposta:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class SessaoFalsa:
+    """Devolve as respostas na ordem; exceções são levantadas"""
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+        self.chamadas = []
+
+    def get(self, url, **kwargs):
+        self.chamadas.append(kwargs)
+        resposta = self.respostas.pop(0)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return resposta
+
+
+class TestRequisitor(unittest.TestCase):
+
+    def criar(self, *respostas):
+        self.sessao = SessaoFalsa(*respostas)
+        requisitor = Requisitor(self.sessao, ControleAIMD(inicial=2), tentativas=3, backoff_base=0)
+        self.vagas_na_pausa = []
+        requisitor.pausa = lambda tentativa, retry_after=None: self.vagas_na_pausa.append(
+            (requisitor.controle.em_uso, retry_after))
+        return requisitor
+
+    def test_timeout_padrao(self):
+        requisitor = self.criar(Resposta(200), Resposta(200))
+        requisitor.get('http://a/')
+        requisitor.get('http://a/', timeout=5)
+        self.assertEqual([c['timeout'] for c in self.sessao.chamadas], [TIMEOUT_PADRAO, 5])
+
+    def test_backoff_sem_vaga_ocupada(self):
+        requisitor = self.criar(requests.exceptions.ConnectionError('x'), Resposta(503), Resposta(200))
+        self.assertEqual(requisitor.get('http://a/').status_code, 200)
+        self.assertEqual([vagas for vagas, _ in self.vagas_na_pausa], [0, 0])
+        self.assertEqual(requisitor.controle.em_uso, 0)
+
+    def test_vaga_do_chamador_cedida_no_backoff(self):
+        requisitor = self.criar(Resposta(429, {'Retry-After': '7'}), Resposta(200))
+        with requisitor.vaga() as vaga:
+            self.assertEqual(requisitor.get('http://a/', vaga=vaga, stream=True).status_code, 200)
+            # A vaga volta ao chamador para a transferência
+            self.assertEqual(requisitor.controle.em_uso, 1)
+        self.assertEqual(self.vagas_na_pausa, [(0, 7.0)])
+        self.assertEqual(requisitor.controle.em_uso, 0)
+
+    def test_falha_de_rede_persistente(self):
+        requisitor = self.criar(*[requests.exceptions.Timeout('t')] * 3)
+        with self.assertRaises(requests.exceptions.Timeout):
+            requisitor.get('http://a/')
+        self.assertEqual(requisitor.controle.em_uso, 0)
+
+    def test_aimd(self):
+        controle = ControleAIMD(inicial=4, maximo=8, intervalo_reducao=0)
+        controle.sinalizar(False)
+        self.assertEqual(controle.limite, 2)
+        controle.sinalizar(True)
+        self.assertEqual(controle.limite, 2.5)
+
+
+class TestSessoes(unittest.TestCase):
+    """Reuso de conexões e a SessaoHTTP2 com a interface do requests, contra o servidor local"""
+
+    def setUp(self):
+        self.servidor = ServidorLocal(tamanho_pdf=4096).iniciar()
+        self.addCleanup(self.servidor.parar)
+
+    def test_pool_reaproveita_a_conexao(self):
+        sessao = criar_sessao(pool=4)
+        self.addCleanup(sessao.close)
+        for _ in range(5):
+            self.assertEqual(sessao.get(f"{self.servidor.url}/provas/", timeout=TIMEOUT_PADRAO).status_code, 200)
+        pool = sessao.get_adapter(self.servidor.url).poolmanager.connection_from_url(self.servidor.url)
+        self.assertEqual(pool.num_connections, 1)
+        self.assertEqual(pool.pool.maxsize, 4)
+
+    @unittest.skipUnless(HAS_HTTP2, "httpx[http2] não instalado")
+    def test_sessao_http2_com_interface_do_requests(self):
+        sessao = criar_sessao(pool=4, http2=True)
+        self.addCleanup(sessao.close)
+        corpo = self.servidor.pdf_sintetico('provas-1')
+
+        with sessao.get(f"{self.servidor.url}/provas/download/1", headers={'Range': 'bytes=100-', 'Connection': 'x'},
+                        stream=True, timeout=TIMEOUT_PADRAO) as response:
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(b''.join(response.iter_content(1024)), corpo[100:])
+
+        response = sessao.get(f"{self.servidor.url}/nada")
+        self.assertRaises(requests.exceptions.HTTPError, response.raise_for_status)
+
+    @unittest.skipUnless(HAS_HTTP2, "httpx[http2] não instalado")
+    def test_erros_do_httpx_viram_erros_do_requests(self):
+        sessao = criar_sessao(http2=True)
+        self.addCleanup(sessao.close)
+        url = self.servidor.url
+        self.servidor.parar()
+        self.assertRaises(requests.exceptions.ConnectionError, sessao.get, url)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import signal
+import threading
+import time
+import unittest
+
+from base import CasoComPasta, item, pdf_valido
+
+from validacao import ValidadorPDF, validar_pdf
+
+
+class TestValidarPDF(CasoComPasta):
+
+    def gravar(self, nome, conteudo):
+        with open(self.caminho(nome), 'wb') as f:
+            f.write(conteudo)
+        return self.caminho(nome)
+
+    def test_pdf_valido(self):
+        resultado = validar_pdf(self.gravar('a.pdf', pdf_valido()))
+        self.assertTrue(resultado['valido'], resultado['erro'])
+        self.assertEqual(resultado['paginas'], 1)
+
+    def test_pagina_html_salva_como_pdf(self):
+        resultado = validar_pdf(self.gravar('a.pdf', b'<html>erro 500</html>'))
+        self.assertFalse(resultado['valido'])
+        self.assertIn('%PDF-', resultado['erro'])
+
+    def test_truncado(self):
+        resultado = validar_pdf(self.gravar('a.pdf', pdf_valido()[:1000]))
+        self.assertFalse(resultado['valido'])
+
+
+class TestValidadorPDF(CasoComPasta):
+    """O pool de processos se recupera quando um processo morre"""
+
+    def setUp(self):
+        super().setUp()
+        self.resultados = {}
+        self.lock = threading.Lock()
+        self.validador = ValidadorPDF(self.registrar, processos=1)
+        self.addCleanup(self.validador.fechar)
+
+    def registrar(self, contexto, resultado):
+        with self.lock:
+            self.resultados[contexto] = resultado['valido']
+
+    def test_processo_morto_nao_invalida_os_pdfs_pendentes(self):
+        caminhos = []
+        for i in range(4):
+            caminho = self.caminho(f"{i}.pdf")
+            with open(caminho, 'wb') as f:
+                f.write(pdf_valido(str(i)))
+            caminhos.append(caminho)
+
+        # Ocupa o único processo e deixa os PDFs na fila para morrerem com ele
+        executor = self.validador._pool()
+        ocupado = executor.submit(time.sleep, 30)
+        for caminho in caminhos:
+            self.validador.agendar(caminho, caminho)
+        while not executor._processes:
+            time.sleep(0.05)
+        time.sleep(0.5)
+        os.kill(next(iter(executor._processes)), signal.SIGKILL)
+        self.assertIsNotNone(ocupado.exception(timeout=30))
+
+        self.assertTrue(self.validador.aguardar(timeout=60))
+        self.assertEqual(self.resultados, {caminho: True for caminho in caminhos})
+
+        # O pool foi recriado: novas validações seguem funcionando
+        self.validador.agendar(caminhos[0], 'depois')
+        self.assertTrue(self.validador.aguardar(timeout=60))
+        self.assertTrue(self.resultados['depois'])
+
+
+class TestPDFNaoValidado(CasoComPasta):
+
+    def test_falha_do_pool_nao_apaga_o_arquivo(self):
+        leecher = self.criar_leecher()
+        caminho = self.caminho('a.pdf')
+        with open(caminho, 'wb') as f:
+            f.write(pdf_valido())
+        prova = item('https://exemplo/a')
+        leecher.catalogo.marcar_baixado(prova, caminho, os.path.getsize(caminho), 'abc')
+        leecher._pdf_validado((prova, caminho, 'abc', self.pasta),
+                              {'valido': None, 'erro': 'não validado: BrokenProcessPool', 'paginas': None,
+                               'sha256': None, 'tamanho': None})
+        self.assertTrue(os.path.exists(caminho))
+        registro = leecher.catalogo.obter(prova['url'])
+        self.assertEqual(registro['status'], 'baixado')
+        self.assertIsNone(registro['valido'])
+
+
+if __name__ == '__main__':
+    unittest.main()
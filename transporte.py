@@ -0,0 +1,375 @@
+import logging
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    # O urllib3 só descomprime brotli se um destes pacotes estiver instalado
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        import brotlicffi  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+try:
+    import httpx
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Listagens HTML comprimem bem; os PDFs pedem 'identity' em _baixar_arquivo por causa do Range
+ACCEPT_ENCODING = 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+
+# (conexão, leitura) em segundos; sem timeout o requests espera para sempre por um servidor mudo
+TIMEOUT_PADRAO = (10, 60)
+
+
+class RitmoPorHost:
+    """Garante um intervalo mínimo entre requisições ao mesmo host"""
+
+    def __init__(self, intervalo=0.5):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._proximo = {}
+
+    def aguardar(self, url):
+        """Bloqueia até que o host da URL possa receber uma nova requisição"""
+        if self.intervalo <= 0:
+            return
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            agora = time.monotonic()
+            # Reserva o próximo horário livre do host antes de dormir,
+            # assim várias threads não disparam juntas no mesmo instante
+            inicio = max(agora, self._proximo.get(host, agora))
+            self._proximo[host] = inicio + self.intervalo
+
+        espera = inicio - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+
+
+class ControleAIMD:
+    """Limite de concorrência adaptativo: cresce aditivamente com respostas
+    saudáveis e cai multiplicativamente quando aparecem erros"""
+
+    def __init__(self, inicial=2, minimo=1, maximo=8, fator=0.5, intervalo_reducao=1.0):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.fator = fator
+        self.intervalo_reducao = intervalo_reducao
+        self.limite = float(max(minimo, min(inicial, maximo)))
+        self.em_uso = 0
+        self._ultima_reducao = 0.0
+        self._cond = threading.Condition()
+
+    def adquirir(self):
+        with self._cond:
+            while self.em_uso >= int(self.limite):
+                self._cond.wait()
+            self.em_uso += 1
+
+    def liberar(self):
+        with self._cond:
+            self.em_uso -= 1
+            self._cond.notify_all()
+
+    def sinalizar(self, sucesso):
+        """Ajusta o limite conforme o resultado de uma requisição"""
+        with self._cond:
+            if sucesso:
+                # +1 a cada "janela" completa de sucessos (≈ +1 por rodada)
+                self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+            else:
+                agora = time.monotonic()
+                # Vários erros da mesma rajada contam como uma única redução
+                if agora - self._ultima_reducao >= self.intervalo_reducao:
+                    self.limite = max(self.minimo, self.limite * self.fator)
+                    self._ultima_reducao = agora
+            self._cond.notify_all()
+
+
+class Vaga:
+    """Vaga de concorrência ocupada por Requisitor.vaga(), que pode ser cedida durante uma espera"""
+
+    def __init__(self, controle):
+        self.controle = controle
+
+    @contextmanager
+    def cedida(self):
+        """Devolve a vaga enquanto o bloco roda (ex.: backoff) e volta a ocupá-la no fim"""
+        self.controle.liberar()
+        try:
+            yield
+        finally:
+            self.controle.adquirir()
+
+
+class Requisitor:
+    """Camada de requisições compartilhada: novas tentativas com backoff
+    exponencial e jitter, respeito ao Retry-After e concorrência AIMD"""
+
+    STATUS_TRANSITORIOS = {408, 425, 429, 500, 502, 503, 504}
+
+    def __init__(self, session, controle=None, tentativas=5, backoff_base=0.5, backoff_max=60.0, metricas=None):
+        self.session = session
+        # Opcional (metricas.Metricas): conta respostas por status e mede as esperas do backoff
+        self.metricas = metricas
+        self.controle = controle or ControleAIMD()
+        self.tentativas = tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @contextmanager
+    def vaga(self):
+        """Ocupa uma vaga de concorrência; exceções dentro do bloco contam como erro.
+
+        Para ocupar a vaga durante uma transferência inteira (stream=True),
+        passe o objeto devolvido a get(vaga=...): ele não ocupa outra e
+        cede esta durante o backoff entre as tentativas.
+        """
+        self.controle.adquirir()
+        try:
+            yield Vaga(self.controle)
+        except requests.exceptions.HTTPError:
+            # O status da resposta já foi contabilizado por get()
+            raise
+        except Exception:
+            self.controle.sinalizar(False)
+            raise
+        finally:
+            self.controle.liberar()
+
+    def get(self, url, vaga=None, **kwargs):
+        """GET com novas tentativas para falhas transitórias.
+
+        Devolve a última resposta (mesmo com erro HTTP) para o chamador
+        decidir via raise_for_status; só levanta exceção em falhas de rede
+        depois de esgotar as tentativas.
+        """
+        kwargs.setdefault('timeout', TIMEOUT_PADRAO)
+        propria = vaga is None
+        for tentativa in range(self.tentativas):
+            ultima = tentativa == self.tentativas - 1
+            if propria:
+                self.controle.adquirir()
+            erro = None
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                erro = e
+            finally:
+                # Libera a vaga antes de qualquer backoff: quem dorme não ocupa concorrência
+                if propria:
+                    self.controle.liberar()
+
+            if erro is not None:
+                self.controle.sinalizar(False)
+                if self.metricas is not None:
+                    self.metricas.incrementar('respostas_http_total', status='falha_rede')
+                if ultima:
+                    raise erro
+                logging.warning(f"Falha de rede em {url} (tentativa {tentativa + 1}): {str(erro)}")
+                self._pausar(vaga, tentativa)
+                continue
+
+            if self.metricas is not None:
+                self.metricas.incrementar('respostas_http_total', status=response.status_code)
+            if response.status_code not in self.STATUS_TRANSITORIOS:
+                self.controle.sinalizar(True)
+                return response
+
+            self.controle.sinalizar(False)
+            if ultima:
+                return response
+            logging.warning(f"HTTP {response.status_code} em {url} (tentativa {tentativa + 1})")
+            retry_after = self._retry_after(response)
+            response.close()
+            self._pausar(vaga, tentativa, retry_after)
+
+    def _pausar(self, vaga, tentativa, retry_after=None):
+        if vaga is None:
+            self.pausa(tentativa, retry_after)
+            return
+        # Vaga do chamador (download em stream): cedida durante a espera
+        with vaga.cedida():
+            self.pausa(tentativa, retry_after)
+
+    def pausa(self, tentativa, retry_after=None):
+        """Dorme o backoff exponencial com jitter completo, ou o Retry-After se for maior"""
+        teto = min(self.backoff_max, self.backoff_base * (2 ** tentativa))
+        espera = random.uniform(0, teto)
+        if retry_after is not None:
+            espera = max(espera, min(retry_after, self.backoff_max))
+        if self.metricas is not None:
+            self.metricas.observar('fase_segundos', espera, fase='espera_backoff')
+        time.sleep(espera)
+
+    def _retry_after(self, response):
+        valor = response.headers.get('Retry-After')
+        if not valor:
+            return None
+        if valor.isdigit():
+            return float(valor)
+        try:
+            data = parsedate_to_datetime(valor)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptadorKeepAlive(HTTPAdapter):
+    """HTTPAdapter com TCP keep-alive, para conexões ociosas do pool não caírem entre páginas"""
+
+    def __init__(self, *args, keep_alive=True, **kwargs):
+        self.keep_alive = keep_alive
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keep_alive:
+            opcoes = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1), (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            # Sondas depois de 60 s ociosa, a cada 15 s (onde o sistema permite ajustar)
+            for nome, valor in (('TCP_KEEPIDLE', 60), ('TCP_KEEPINTVL', 15), ('TCP_KEEPCNT', 4)):
+                if hasattr(socket, nome):
+                    opcoes.append((socket.IPPROTO_TCP, getattr(socket, nome), valor))
+            kwargs['socket_options'] = opcoes
+        super().init_poolmanager(*args, **kwargs)
+
+
+def criar_sessao(pool=10, http2=False, keep_alive=True, headers=None):
+    """Sessão HTTP compartilhada: pool de `pool` conexões por host e respostas comprimidas.
+
+    Com http2=True usa httpx (pip install 'httpx[http2]'), que multiplexa as
+    requisições sobre uma única conexão por host quando o servidor aceita
+    HTTP/2; a interface é a mesma de requests.Session.
+    """
+    if http2:
+        if not HAS_HTTP2:
+            raise ImportError("HTTP/2 requer httpx com h2 (pip install 'httpx[http2]')")
+        return SessaoHTTP2(pool, keep_alive, headers)
+
+    session = requests.Session()
+    adapter = AdaptadorKeepAlive(pool_connections=pool, pool_maxsize=pool, keep_alive=keep_alive)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+# Cabeçalhos de conexão proibidos no HTTP/2
+CABECALHOS_HTTP1 = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+
+
+@contextmanager
+def _erros_requests():
+    """Traduz as exceções do httpx para as do requests, que o resto do código já trata"""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.Timeout(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+
+
+class RespostaHTTP2:
+    """Resposta do httpx com a interface de requests.Response usada pelo projeto"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+
+    @property
+    def content(self):
+        with _erros_requests():
+            return self._response.read()
+
+    @property
+    def text(self):
+        self.content
+        return self._response.text
+
+    @property
+    def encoding(self):
+        return self._response.charset_encoding
+
+    @property
+    def apparent_encoding(self):
+        return None
+
+    def json(self, **kwargs):
+        self.content
+        return self._response.json(**kwargs)
+
+    def iter_content(self, chunk_size=8192):
+        with _erros_requests():
+            yield from self._response.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessaoHTTP2:
+    """Subconjunto de requests.Session sobre httpx.Client com HTTP/2"""
+
+    def __init__(self, pool=10, keep_alive=True, headers=None):
+        limites = httpx.Limits(max_connections=pool, max_keepalive_connections=pool if keep_alive else 0)
+        self._cliente = httpx.Client(http2=True, limits=limites, follow_redirects=True, timeout=30.0)
+        self.headers = self._cliente.headers
+        self.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        if headers:
+            self.headers.update(self._filtrar(headers))
+
+    def _filtrar(self, headers):
+        return {k: v for k, v in (headers or {}).items() if k.lower() not in CABECALHOS_HTTP1}
+
+    def request(self, method, url, headers=None, stream=False, timeout=None, params=None, data=None, json=None,
+                **kwargs):
+        if isinstance(timeout, tuple):
+            # Formato do requests, (conexão, leitura)
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        extras = {'timeout': timeout} if timeout is not None else {}
+        with _erros_requests():
+            requisicao = self._cliente.build_request(method, url, headers=self._filtrar(headers), params=params,
+                                                     data=data, json=json, **extras)
+            response = self._cliente.send(requisicao, stream=stream)
+        return RespostaHTTP2(response)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self._cliente.close()
@@ -0,0 +1,212 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    try:
+        import fitz as pymupdf
+        HAS_PYMUPDF = True
+    except ImportError:
+        HAS_PYMUPDF = False
+
+try:
+    from pypdf import PdfReader
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+# O cabeçalho pode vir depois de lixo no início e o %%EOF antes de bytes finais; a norma tolera 1 KB
+JANELA_CABECALHO = 1024
+JANELA_TRAILER = 2048
+
+
+def parece_pdf(caminho):
+    """Checagem barata (duas leituras pequenas): cabeçalho %PDF- e trailer %%EOF"""
+    try:
+        with open(caminho, 'rb') as f:
+            inicio = f.read(JANELA_CABECALHO)
+            f.seek(max(0, os.fstat(f.fileno()).st_size - JANELA_TRAILER))
+            fim = f.read()
+    except OSError:
+        return False
+    return b'%PDF-' in inicio and b'%%EOF' in fim
+
+
+def validar_pdf(caminho, sha256_esperado=None):
+    """Roda no processo do pool: confere estrutura, conteúdo e hash do PDF.
+
+    Retorna {'valido', 'erro', 'paginas', 'sha256', 'tamanho'}. Sem
+    pymupdf nem pypdf, só cabeçalho, trailer e hash são conferidos e
+    paginas fica None.
+    """
+    resultado = {'valido': False, 'erro': None, 'paginas': None, 'sha256': None, 'tamanho': None}
+    sha256 = hashlib.sha256()
+    try:
+        with open(caminho, 'rb') as f:
+            inicio = f.read(JANELA_CABECALHO)
+            sha256.update(inicio)
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(bloco)
+            resultado['tamanho'] = f.tell()
+            f.seek(max(0, resultado['tamanho'] - JANELA_TRAILER))
+            fim = f.read()
+    except OSError as e:
+        resultado['erro'] = f"ilegível: {e}"
+        return resultado
+    resultado['sha256'] = sha256.hexdigest()
+
+    if b'%PDF-' not in inicio:
+        # Página de erro HTML salva como .pdf é o caso mais comum
+        amostra = inicio[:64].decode('latin-1').strip().replace('\n', ' ')
+        resultado['erro'] = f"sem cabeçalho %PDF- (começa com {amostra!r})"
+        return resultado
+    if b'%%EOF' not in fim:
+        resultado['erro'] = "sem trailer %%EOF (arquivo truncado)"
+        return resultado
+    if sha256_esperado and sha256_esperado != resultado['sha256']:
+        resultado['erro'] = "hash diferente do registrado no download"
+        return resultado
+
+    try:
+        if HAS_PYMUPDF:
+            with pymupdf.open(caminho) as documento:
+                resultado['paginas'] = documento.page_count
+                # Carregar a primeira página pega xref e streams corrompidos que a abertura tolera
+                if documento.page_count:
+                    documento.load_page(0).get_text()
+        elif HAS_PYPDF:
+            leitor = PdfReader(caminho, strict=False)
+            resultado['paginas'] = len(leitor.pages)
+            if resultado['paginas']:
+                leitor.pages[0].extract_text()
+    except Exception as e:
+        resultado['erro'] = f"não abre como PDF: {type(e).__name__}: {e}"
+        return resultado
+    if resultado['paginas'] == 0:
+        resultado['erro'] = "PDF sem páginas"
+        return resultado
+
+    resultado['valido'] = True
+    return resultado
+
+
+def _nao_validado(erro):
+    """Resultado de uma validação que não chegou a acontecer: não diz nada sobre o arquivo"""
+    return {'valido': None, 'erro': f"não validado: {type(erro).__name__}: {erro}", 'paginas': None,
+            'sha256': None, 'tamanho': None}
+
+
+class ValidadorPDF:
+    """Valida PDFs em um pool de processos, fora das threads de download.
+
+    ao_validar(contexto, resultado) é chamado ao fim de cada validação, numa
+    thread interna do pool; o contexto é o que foi passado em agendar().
+    Se um processo do pool morre, o pool é recriado e os PDFs que estavam
+    nele são reenviados; os que esgotam MAX_REENVIOS chegam com valido=None
+    (não validado), que não deve ser tratado como PDF inválido.
+    """
+
+    MAX_REENVIOS = 2
+
+    def __init__(self, ao_validar, processos=None, metricas=None):
+        self.ao_validar = ao_validar
+        self.processos = processos or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.metricas = metricas
+        self._executor = None
+        self._lock = threading.Lock()
+        self._ociosa = threading.Condition(self._lock)
+        self._em_andamento = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: o pool nasce com threads de download rodando, e fork copiaria locks presos
+                self._executor = ProcessPoolExecutor(self.processos,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _descartar_pool(self, executor):
+        """Tira de uso um pool quebrado; o próximo envio cria outro"""
+        with self._lock:
+            if self._executor is not executor:
+                # Outro job do mesmo pool já fez a troca
+                return
+            self._executor = None
+        executor.shutdown(wait=False)
+
+    def agendar(self, caminho, contexto=None, sha256_esperado=None):
+        with self._lock:
+            self._em_andamento += 1
+        try:
+            self._enviar(caminho, contexto, sha256_esperado, 0)
+        except Exception:
+            self._terminar()
+            raise
+
+    def _enviar(self, caminho, contexto, sha256_esperado, reenvios):
+        executor = self._pool()
+        try:
+            futuro = executor.submit(validar_pdf, caminho, sha256_esperado)
+        except BrokenProcessPool:
+            # O pool quebrou antes de algum callback perceber
+            self._descartar_pool(executor)
+            executor = self._pool()
+            futuro = executor.submit(validar_pdf, caminho, sha256_esperado)
+        futuro.add_done_callback(
+            lambda f: self._concluido(f, executor, caminho, contexto, sha256_esperado, reenvios))
+
+    def _concluido(self, futuro, executor, caminho, contexto, sha256_esperado, reenvios):
+        try:
+            resultado = futuro.result()
+        except BrokenProcessPool as e:
+            # Um processo morreu (ex.: PDF que derruba o parser) e levou junto todos os jobs do pool
+            self._descartar_pool(executor)
+            resultado = _nao_validado(e)
+            if reenvios < self.MAX_REENVIOS:
+                try:
+                    self._enviar(caminho, contexto, sha256_esperado, reenvios + 1)
+                    return
+                except Exception as erro:
+                    resultado = _nao_validado(erro)
+        except Exception as e:
+            resultado = _nao_validado(e)
+
+        try:
+            if self.metricas is not None:
+                situacao = {True: 'ok', False: 'invalido', None: 'nao_validado'}[resultado['valido']]
+                self.metricas.incrementar('pdfs_validados_total', resultado=situacao)
+            self.ao_validar(contexto, resultado)
+        except Exception as e:
+            logging.error(f"Erro ao tratar a validação de {caminho}: {str(e)}")
+        finally:
+            self._terminar()
+
+    def _terminar(self):
+        with self._lock:
+            self._em_andamento -= 1
+            if not self._em_andamento:
+                self._ociosa.notify_all()
+
+    @property
+    def pendentes(self):
+        with self._lock:
+            return self._em_andamento
+
+    def aguardar(self, timeout=None):
+        """Espera todas as validações agendadas; False se o timeout venceu antes"""
+        with self._lock:
+            return self._ociosa.wait_for(lambda: not self._em_andamento, timeout)
+
+    def fechar(self):
+        self.aguardar()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()